@@ -3,6 +3,7 @@ Sistema de Seguimiento de Órdenes de Compra (OC) para Reservas Hoteleras
 Aplicación principal FastAPI con interfaz web de administración
 """
 import asyncio
+import json
 from datetime import datetime
 from typing import List, Optional
 from pathlib import Path
@@ -11,6 +12,7 @@ from fastapi import FastAPI, Request, Depends, HTTPException, BackgroundTasks
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from loguru import logger
 import sys
@@ -20,6 +22,7 @@ from database import (
     init_db,
     get_db,
     Reserva,
+    HabitacionReserva,
     CorreoEnviado,
     OrdenCompra,
     ConfiguracionCliente,
@@ -28,8 +31,12 @@ from database import (
     crear_cliente_inicial
 )
 from src.email_monitor import ReservaMonitor, OCMonitor
+from src.imap_pool import imap_pool
+from src.io_pool import monitor_io_pool
 from src.scheduler import oc_scheduler
 from src.email_sender import email_sender
+from src.extraction_pool import pdf_extraction_pool, deferred_extraction_pool
+from src.metrics import metrics_registry
 
 # Configurar logging
 logger.remove()
@@ -96,6 +103,8 @@ async def startup_event():
         # Iniciar loops de monitoreo en background
         asyncio.create_task(reserva_monitor.monitor_loop())
         asyncio.create_task(oc_monitor.monitor_loop())
+        asyncio.create_task(reserva_monitor.deferred_loop())
+        asyncio.create_task(oc_monitor.deferred_loop())
         logger.info("✅ Monitores de correo iniciados")
 
         logger.info(f"🎉 Sistema iniciado correctamente en {settings.environment} mode")
@@ -118,8 +127,14 @@ async def shutdown_event():
             reserva_monitor.disconnect()
         if oc_monitor:
             oc_monitor.disconnect()
+        imap_pool.close_all()
+        monitor_io_pool.shutdown()
         logger.info("✅ Monitores desconectados")
 
+        pdf_extraction_pool.shutdown()
+        deferred_extraction_pool.shutdown()
+        logger.info("✅ Pool de extracción PDF detenido")
+
     except Exception as e:
         logger.error(f"Error al cerrar sistema: {e}")
 
@@ -210,6 +225,24 @@ async def get_stats():
     return oc_scheduler.get_stats()
 
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """
+    Métricas de extracción de PDF: duraciones por etapa (apertura,
+    extracción de texto, parseo, validación), aciertos por patrón de monto,
+    campos no encontrados, documentos más lentos y documentos diferidos
+    por exceder los límites de tamaño (con el largo actual de cada cola)
+    y estado de las conexiones IMAP del pool
+    """
+    snapshot = metrics_registry.snapshot()
+    snapshot["cola_diferida"] = {
+        "reservas": len(reserva_monitor.deferred) if reserva_monitor else 0,
+        "oc": len(oc_monitor.deferred) if oc_monitor else 0,
+    }
+    snapshot["conexiones_imap"] = imap_pool.stats()
+    return snapshot
+
+
 @app.get("/api/reservas")
 async def list_reservas(
     estado: Optional[str] = None,
@@ -280,6 +313,17 @@ async def get_reserva(reserva_id: int, db: Session = Depends(get_db)):
         "estado_oc": reserva.estado_oc.value,
         "dias_desde_creacion": reserva.dias_desde_creacion,
         "fecha_creacion": reserva.fecha_creacion.isoformat(),
+        "habitaciones": [
+            {
+                "numero": h.numero,
+                "categoria": h.categoria,
+                "adultos": h.adultos,
+                "ninos": h.ninos,
+                "plan_alimentacion": h.plan_alimentacion,
+                "huespedes": json.loads(h.huespedes) if h.huespedes else []
+            }
+            for h in reserva.habitaciones
+        ],
         "correos_enviados": [
             {
                 "tipo": c.tipo_correo.value,
@@ -292,11 +336,43 @@ async def get_reserva(reserva_id: int, db: Session = Depends(get_db)):
         "orden_compra": {
             "recibida": reserva.orden_compra is not None,
             "fecha_recepcion": reserva.orden_compra.fecha_creacion.isoformat() if reserva.orden_compra else None,
-            "numero_oc": reserva.orden_compra.numero_oc if reserva.orden_compra else None
+            "numero_oc": reserva.orden_compra.numero_oc if reserva.orden_compra else None,
+            "monto_oc": reserva.orden_compra.monto_oc if reserva.orden_compra else None,
+            "monto_coincide": reserva.orden_compra.monto_coincide if reserva.orden_compra else None
         } if reserva.orden_compra else None
     }
 
 
+@app.get("/api/habitaciones/resumen")
+async def resumen_habitaciones(db: Session = Depends(get_db)):
+    """Ocupación por categoría y por plan de alimentación (agregado en SQL)"""
+
+    def agrupar(columna):
+        filas = db.query(
+            columna,
+            func.count(HabitacionReserva.id),
+            func.count(func.distinct(HabitacionReserva.reserva_id)),
+            func.sum(HabitacionReserva.adultos),
+            func.sum(HabitacionReserva.ninos)
+        ).group_by(columna).order_by(func.count(HabitacionReserva.id).desc()).all()
+
+        return [
+            {
+                "nombre": nombre,
+                "habitaciones": habitaciones,
+                "reservas": reservas,
+                "adultos": adultos or 0,
+                "ninos": ninos or 0
+            }
+            for nombre, habitaciones, reservas, adultos, ninos in filas
+        ]
+
+    return {
+        "por_categoria": agrupar(HabitacionReserva.categoria),
+        "por_plan_alimentacion": agrupar(HabitacionReserva.plan_alimentacion)
+    }
+
+
 @app.post("/api/reservas/{reserva_id}/marcar-oc-recibida")
 async def marcar_oc_recibida(
     reserva_id: int,
@@ -33,6 +33,7 @@ class Settings(BaseSettings):
     azure_client_secret: str = Field(default="", env="AZURE_CLIENT_SECRET")
     azure_tenant_id: str = Field(default="", env="AZURE_TENANT_ID")
     graph_mailbox_email: str = Field(default="", env="GRAPH_MAILBOX_EMAIL")
+    graph_oc_mailbox_email: str = Field(default="", env="GRAPH_OC_MAILBOX_EMAIL")  # Buzón de OC; vacío = GRAPH_MAILBOX_EMAIL
     use_graph_api: bool = Field(default=True, env="USE_GRAPH_API")  # True para Graph API, False para IMAP
 
     # IMAP - Monitoreo de confirmaciones (DEPRECADO - usar Graph API)
@@ -43,6 +44,12 @@ class Settings(BaseSettings):
     imap_mailbox: str = Field(default="INBOX", env="IMAP_MAILBOX")
     imap_use_ssl: bool = Field(default=True, env="IMAP_USE_SSL")
     imap_check_interval: int = Field(default=300, env="IMAP_CHECK_INTERVAL")
+    imap_idle_enabled: bool = Field(default=True, env="IMAP_IDLE_ENABLED")  # Push con IDLE; sin soporte se usa polling
+    imap_idle_timeout: int = Field(default=1500, env="IMAP_IDLE_TIMEOUT")  # Segundos antes de renovar IDLE (< 29 min)
+    imap_fetch_batch_size: int = Field(default=20, env="IMAP_FETCH_BATCH_SIZE")  # Mensajes por comando UID FETCH
+    imap_health_check_interval: int = Field(default=60, env="IMAP_HEALTH_CHECK_INTERVAL")  # Segundos entre NOOP de conexiones inactivas
+    imap_reconnect_backoff_max: int = Field(default=300, env="IMAP_RECONNECT_BACKOFF_MAX")  # Espera máxima entre reconexiones
+    monitor_io_workers: int = Field(default=4, env="MONITOR_IO_WORKERS")  # Hilos para IMAP y BD fuera del event loop
 
     # SMTP - Envío de correos
     smtp_host: str = Field(env="SMTP_HOST")
@@ -65,6 +72,24 @@ class Settings(BaseSettings):
     oc_inbox_use_ssl: bool = Field(default=True, env="OC_INBOX_USE_SSL")
     oc_check_interval: int = Field(default=300, env="OC_CHECK_INTERVAL")
 
+    # Documentos de OC
+    oc_storage_path: str = Field(default="./data/oc_files", env="OC_STORAGE_PATH")  # Almacenamiento por SHA-256
+    oc_amount_tolerance_pct: float = Field(default=1.0, env="OC_AMOUNT_TOLERANCE_PCT")  # Diferencia aceptada vs. reserva
+
+    # Procesamiento de PDF
+    pdf_extraction_workers: int = Field(default=2, env="PDF_EXTRACTION_WORKERS")  # Procesos para parsear adjuntos
+    pdf_max_pages: int = Field(default=5, env="PDF_MAX_PAGES")  # 0 = sin límite
+    pdf_cache_enabled: bool = Field(default=True, env="PDF_CACHE_ENABLED")
+    pdf_cache_path: str = Field(default="./data/pdf_cache.db", env="PDF_CACHE_PATH")
+    pdf_cache_max_entries: int = Field(default=5000, env="PDF_CACHE_MAX_ENTRIES")
+
+    # Límites de tamaño: los documentos que los superan se procesan en la cola diferida
+    imap_max_message_bytes: int = Field(default=15_000_000, env="IMAP_MAX_MESSAGE_BYTES")  # 0 = sin límite
+    pdf_max_bytes: int = Field(default=8_000_000, env="PDF_MAX_BYTES")  # 0 = sin límite
+    pdf_max_page_count: int = Field(default=40, env="PDF_MAX_PAGE_COUNT")  # 0 = sin límite
+    pdf_deferred_interval: int = Field(default=120, env="PDF_DEFERRED_INTERVAL")  # Segundos entre documentos diferidos
+    pdf_deferred_queue_size: int = Field(default=50, env="PDF_DEFERRED_QUEUE_SIZE")
+
     # Scheduler
     scheduler_check_hour: int = Field(default=9, env="SCHEDULER_CHECK_HOUR")
     scheduler_check_minute: int = Field(default=0, env="SCHEDULER_CHECK_MINUTE")
@@ -93,6 +118,9 @@ class Settings(BaseSettings):
         env="ALLOWED_CONFIRMATION_SENDERS"
     )
 
+    # Remitentes cuyos PDF se procesan con extracción por layout (direcciones o dominios)
+    pdf_layout_senders: str = Field(default="", env="PDF_LAYOUT_SENDERS")
+
     # Clientes que requieren OC
     agencies_requiring_oc: str = Field(
         default="WALVIS S.A.",
@@ -145,6 +173,22 @@ class Settings(BaseSettings):
             if sender.strip()
         ]
 
+    @property
+    def layout_senders_list(self) -> List[str]:
+        """Retorna lista de remitentes/dominios que usan extracción por layout"""
+        return [
+            sender.strip().lower().lstrip("@")
+            for sender in self.pdf_layout_senders.split(",")
+            if sender.strip()
+        ]
+
+    def extraction_mode_for(self, sender_email: str) -> str:
+        """Retorna el modo de extracción de PDF ("text" o "layout") para un remitente"""
+        sender = sender_email.strip().lower()
+        domain = sender.rsplit("@", 1)[-1]
+        layout_senders = self.layout_senders_list
+        return "layout" if sender in layout_senders or domain in layout_senders else "text"
+
     def requires_oc(self, agency_name: str) -> bool:
         """Verifica si una agencia requiere seguimiento de OC"""
         return agency_name.strip() in self.agencies_list
@@ -163,8 +207,11 @@ def validate_config():
     """Valida que la configuración sea correcta"""
     errors = []
 
-    # Validar configuración IMAP
-    if not settings.imap_host or not settings.imap_username:
+    # Validar configuración del buzón (Graph API o IMAP)
+    if settings.use_graph_api:
+        if not settings.azure_client_id or not settings.azure_tenant_id or not settings.graph_mailbox_email:
+            errors.append("Configuración de Graph API incompleta")
+    elif not settings.imap_host or not settings.imap_username:
         errors.append("Configuración IMAP incompleta")
 
     # Validar configuración SMTP
@@ -187,7 +234,10 @@ if __name__ == "__main__":
     print(f"Aplicación: {settings.app_name} v{settings.app_version}")
     print(f"Entorno: {settings.environment}")
     print(f"Base de datos: {settings.database_url}")
-    print(f"IMAP Monitor: {settings.imap_host}:{settings.imap_port}")
+    if settings.use_graph_api:
+        print(f"Graph API Monitor: {settings.graph_mailbox_email}")
+    else:
+        print(f"IMAP Monitor: {settings.imap_host}:{settings.imap_port}")
     print(f"SMTP Envío: {settings.smtp_host}:{settings.smtp_port}")
     print(f"Agencias con OC: {', '.join(settings.agencies_list)}")
 
@@ -2,18 +2,23 @@
 Modelos de base de datos para el sistema de seguimiento de OC
 SQLAlchemy ORM con SQLite
 """
+import json
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 from sqlalchemy import (
     create_engine,
+    inspect,
+    text,
     Column,
     Integer,
+    BigInteger,
     String,
     Float,
     DateTime,
     Boolean,
     Text,
     ForeignKey,
+    Index,
     Enum as SQLEnum
 )
 from sqlalchemy.ext.declarative import declarative_base
@@ -81,6 +86,8 @@ class Reserva(Base):
     # Información financiera
     monto_total = Column(Float, nullable=False)
     moneda = Column(String(10), default="CLP")
+    # PARSER_VERSION con que se leyó el PDF (NULL: reserva anterior a esta columna)
+    version_parser = Column(String(10), nullable=True)
 
     # Detalles de habitaciones (JSON serializado)
     detalles_habitaciones = Column(Text, nullable=True)
@@ -109,6 +116,12 @@ class Reserva(Base):
     # Relaciones
     correos_enviados = relationship("CorreoEnviado", back_populates="reserva", cascade="all, delete-orphan")
     orden_compra = relationship("OrdenCompra", back_populates="reserva", uselist=False, cascade="all, delete-orphan")
+    habitaciones = relationship(
+        "HabitacionReserva",
+        back_populates="reserva",
+        cascade="all, delete-orphan",
+        order_by="HabitacionReserva.numero"
+    )
 
     def __repr__(self):
         return f"<Reserva {self.id_reserva} - {self.agencia} - {self.estado_oc.value}>"
@@ -197,6 +210,55 @@ class Reserva(Base):
         )
 
 
+class HabitacionReserva(Base):
+    """Habitaciones de una reserva extraídas del PDF (una fila por habitación)"""
+    __tablename__ = "habitaciones_reserva"
+    __table_args__ = (
+        Index("ix_habitaciones_categoria_reserva", "categoria", "reserva_id"),
+        Index("ix_habitaciones_plan_reserva", "plan_alimentacion", "reserva_id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    reserva_id = Column(Integer, ForeignKey("reservas.id"), nullable=False, index=True)
+
+    # Datos de la habitación
+    numero = Column(Integer, nullable=False)
+    categoria = Column(String(100), nullable=True)
+    adultos = Column(Integer, default=0, nullable=False)
+    ninos = Column(Integer, default=0, nullable=False)
+    plan_alimentacion = Column(String(200), nullable=True)
+
+    # Huéspedes (JSON serializado: lista de {tipo, nombre, apellidos})
+    huespedes = Column(Text, nullable=True)
+
+    # Relaciones
+    reserva = relationship("Reserva", back_populates="habitaciones")
+
+    def __repr__(self):
+        return f"<HabitacionReserva {self.numero} - {self.categoria} - Reserva {self.reserva_id}>"
+
+    @classmethod
+    def desde_detalles(cls, detalles_json: Optional[str]) -> List["HabitacionReserva"]:
+        """
+        Crea las filas de habitaciones a partir de detalles_habitaciones
+        (JSON producido por PDFProcessor._extract_room_details)
+        """
+        if not detalles_json:
+            return []
+
+        return [
+            cls(
+                numero=h['numero'],
+                categoria=h.get('categoria'),
+                adultos=h.get('adultos', 0),
+                ninos=h.get('ninos', 0),
+                plan_alimentacion=h.get('plan_alimentacion'),
+                huespedes=json.dumps(h.get('huespedes', []), ensure_ascii=False)
+            )
+            for h in json.loads(detalles_json)
+        ]
+
+
 class CorreoEnviado(Base):
     """Historial de correos enviados para cada reserva"""
     __tablename__ = "correos_enviados"
@@ -261,6 +323,10 @@ class OrdenCompra(Base):
     # Número de OC (si se puede extraer del PDF)
     numero_oc = Column(String(100), nullable=True)
 
+    # Monto extraído del PDF de OC y resultado del cruce con Reserva.monto_total
+    monto_oc = Column(Float, nullable=True)
+    monto_coincide = Column(Boolean, nullable=True)  # None = no se pudo comparar
+
     # Validación
     validada = Column(Boolean, default=False)
     fecha_validacion = Column(DateTime, nullable=True)
@@ -334,6 +400,65 @@ class LogSistema(Base):
         return f"<LogSistema {self.nivel} - {self.modulo}>"
 
 
+class SincronizacionBuzon(Base):
+    """Marca de agua de la sincronización IMAP por UID de cada buzón y monitor"""
+    __tablename__ = "sincronizacion_buzones"
+    __table_args__ = (
+        Index("ix_sincronizacion_buzon_monitor", "host", "usuario", "carpeta", "monitor", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    # Buzón
+    host = Column(String(200), nullable=False)
+    usuario = Column(String(200), nullable=False)
+    carpeta = Column(String(200), nullable=False)
+    # "reservas" u "oc": ambos monitores pueden leer el mismo buzón
+    monitor = Column(String(20), nullable=True)
+
+    # Estado IMAP: los UID solo son válidos mientras UIDVALIDITY no cambie
+    uidvalidity = Column(BigInteger, nullable=False)
+    ultimo_uid = Column(BigInteger, default=0, nullable=False)
+
+    # Metadatos
+    fecha_actualizacion = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SincronizacionBuzon {self.usuario}/{self.carpeta} ({self.monitor}) - UID {self.ultimo_uid}>"
+
+
+class SincronizacionGraph(Base):
+    """Estado de la sincronización delta de Graph API de cada buzón y monitor"""
+    __tablename__ = "sincronizacion_graph"
+    __table_args__ = (
+        Index("ix_sincronizacion_graph_monitor", "buzon", "carpeta", "monitor", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    # Buzón
+    buzon = Column(String(200), nullable=False)
+    carpeta = Column(String(200), nullable=False)
+    monitor = Column(String(20), nullable=True)
+
+    # @odata.deltaLink de la última ronda completa
+    delta_link = Column(Text, nullable=False)
+    # Fecha de recepción más reciente vista y mensajes ya entregados desde
+    # poco antes de ella (JSON id -> receivedDateTime), para distinguir
+    # mensajes nuevos de cambios en mensajes ya procesados
+    ultima_recepcion = Column(DateTime, nullable=True)
+    mensajes_recientes = Column(Text, nullable=True)
+    # Mensajes de rondas ya guardadas que el monitor aún no termina de
+    # descargar (reintentos y cola diferida), en JSON
+    mensajes_pendientes = Column(Text, nullable=True)
+
+    # Metadatos
+    fecha_actualizacion = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SincronizacionGraph {self.buzon}/{self.carpeta} ({self.monitor})>"
+
+
 # Motor de base de datos y sesión
 engine = None
 SessionLocal = None
@@ -351,15 +476,21 @@ def init_db(database_url: Optional[str] = None):
     if database_url.startswith("sqlite"):
         connect_args = {"check_same_thread": False}
 
+    # Una sola conexión compartida solo para SQLite en memoria; con archivo,
+    # cada sesión usa su propia conexión: los monitores escriben desde hilos
+    # (monitor_io_pool) mientras el dashboard consulta en el event loop, y el
+    # rollback al cerrar una sesión no debe afectar la transacción de otra
+    in_memory = database_url == "sqlite://" or database_url.startswith("sqlite:///:memory:")
     engine = create_engine(
         database_url,
         connect_args=connect_args,
         echo=settings.debug,
-        poolclass=StaticPool if database_url.startswith("sqlite") else None
+        poolclass=StaticPool if in_memory else None
     )
 
     # Crear todas las tablas
     Base.metadata.create_all(bind=engine)
+    _agregar_columnas_faltantes(engine)
 
     # Crear sesión
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -367,6 +498,25 @@ def init_db(database_url: Optional[str] = None):
     return engine
 
 
+def _agregar_columnas_faltantes(engine):
+    """
+    Agrega a tablas existentes las columnas nuevas del modelo
+
+    create_all() no modifica tablas que ya existen; las columnas nullable
+    añadidas después (ej: ordenes_compra.monto_oc) se crean aquí con
+    ALTER TABLE para no exigir recrear la base de datos.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existentes = {c['name'] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existentes or not column.nullable:
+                    continue
+                tipo = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {tipo}'))
+
+
 def get_db() -> Session:
     """Obtiene una sesión de base de datos"""
     if SessionLocal is None:
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Carga masiva de PDFs de confirmación históricos
+Recorre un directorio, extrae los PDFs en paralelo con el pool de extracción
+e inserta las reservas por lotes (un commit por lote). El avance se guarda en
+un archivo de checkpoint para poder reanudar tras una interrupción.
+
+Uso:
+    PYTHONPATH=. python scripts/database/backfill_pdfs.py /ruta/archivo_pdfs
+    PYTHONPATH=. python scripts/database/backfill_pdfs.py /ruta/archivo_pdfs --lote 200 --workers 4
+    PYTHONPATH=. python scripts/database/backfill_pdfs.py /ruta/archivo_pdfs --reiniciar
+"""
+import sys
+import os
+import json
+import time
+import asyncio
+from pathlib import Path
+from typing import List, Dict, Any, Set, Optional
+
+# Agregar raíz del proyecto al path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, project_root)
+os.chdir(project_root)
+
+from loguru import logger
+from sqlalchemy.exc import IntegrityError
+
+from config import settings
+from database import init_db, get_db, Reserva, HabitacionReserva, ConfiguracionCliente, EstadoOC
+from src.extraction_pool import PDFExtractionPool
+from src.pdf_processor import pdf_processor, PARSER_VERSION
+from src.extraction_profiles import extraction_profiles
+
+CHECKPOINT_DEFAULT = Path("data") / "backfill_checkpoint.json"
+
+
+def cargar_checkpoint(path: Path) -> Dict[str, List[str]]:
+    """Lee el checkpoint; retorna uno vacío si no existe"""
+    if path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {"procesados": [], "fallidos": []}
+
+
+def guardar_checkpoint(path: Path, checkpoint: Dict[str, List[str]]):
+    """Escribe el checkpoint de forma atómica (archivo temporal + rename)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def crear_reserva(pdf_data: Dict[str, Any], pdf_path: Path, requiere_oc: bool, con_seguimiento: bool) -> Reserva:
+    """Construye la Reserva a partir de los datos extraídos del PDF"""
+    # Sin seguimiento, las reservas históricas no deben disparar solicitudes de OC
+    seguimiento = requiere_oc and con_seguimiento
+
+    return Reserva(
+        id_reserva=pdf_data.get('id_reserva'),
+        loc_interno=pdf_data.get('loc_interno'),
+        localizador=pdf_data.get('localizador'),
+        agencia=pdf_data.get('agencia'),
+        nombre_hotel=pdf_data.get('nombre_hotel'),
+        direccion_hotel=pdf_data.get('direccion_hotel'),
+        telefono_hotel=pdf_data.get('telefono_hotel'),
+        fecha_checkin=pdf_data.get('fecha_checkin'),
+        fecha_checkout=pdf_data.get('fecha_checkout'),
+        hora_llegada=pdf_data.get('hora_llegada'),
+        hora_salida=pdf_data.get('hora_salida'),
+        numero_noches=pdf_data.get('numero_noches'),
+        numero_habitaciones=pdf_data.get('numero_habitaciones'),
+        monto_total=pdf_data.get('monto_total'),
+        moneda=pdf_data.get('moneda', 'CLP'),
+        version_parser=PARSER_VERSION,
+        detalles_habitaciones=pdf_data.get('detalles_habitaciones'),
+        habitaciones=HabitacionReserva.desde_detalles(pdf_data.get('detalles_habitaciones')),
+        fecha_limite_cancelacion=pdf_data.get('fecha_limite_cancelacion'),
+        observaciones_hotel=pdf_data.get('observaciones_hotel'),
+        notas_asesor=pdf_data.get('notas_asesor'),
+        fecha_emision=pdf_data.get('fecha_emision'),
+        estado_oc=EstadoOC.PENDIENTE if seguimiento else EstadoOC.NO_REQUIERE_OC,
+        requiere_oc=seguimiento,
+        pdf_filename=pdf_path.name
+    )
+
+
+def insertar_lote(db, reservas: List[Reserva]) -> int:
+    """
+    Inserta un lote de reservas en una sola transacción
+
+    Si el lote falla por una restricción de unicidad (ej: otro proceso insertó
+    la misma reserva), se reintenta fila por fila para no perder el resto.
+
+    Returns:
+        Número de reservas insertadas
+    """
+    if not reservas:
+        return 0
+
+    try:
+        db.add_all(reservas)
+        db.commit()
+        return len(reservas)
+    except IntegrityError:
+        db.rollback()
+        logger.warning("Conflicto de unicidad en el lote, reintentando fila por fila")
+
+    insertadas = 0
+    for reserva in reservas:
+        try:
+            db.add(reserva)
+            db.commit()
+            insertadas += 1
+        except IntegrityError:
+            db.rollback()
+            logger.warning(f"Reserva {reserva.id_reserva} ya existe en la base de datos")
+    return insertadas
+
+
+def backfill(
+    directorio: str,
+    checkpoint_path: Path,
+    tamano_lote: int,
+    workers: Optional[int],
+    modo: str,
+    perfil: str,
+    con_seguimiento: bool
+) -> bool:
+    """Procesa todos los PDFs del directorio que no estén en el checkpoint"""
+
+    print("\n" + "=" * 70)
+    print("  📥 CARGA MASIVA DE PDFs HISTÓRICOS")
+    print("=" * 70 + "\n")
+
+    raiz = Path(directorio)
+    if not raiz.is_dir():
+        print(f"❌ Directorio no encontrado: {directorio}")
+        return False
+
+    checkpoint = cargar_checkpoint(checkpoint_path)
+    ya_procesados: Set[str] = set(checkpoint["procesados"])
+
+    todos = sorted(p for p in raiz.rglob("*") if p.suffix.lower() == ".pdf")
+    pendientes = [p for p in todos if str(p.relative_to(raiz)) not in ya_procesados]
+
+    print(f"📁 Directorio:            {raiz}")
+    print(f"📄 PDFs encontrados:      {len(todos)}")
+    print(f"⏭️  Ya procesados:         {len(todos) - len(pendientes)}")
+    print(f"⏳ Pendientes:            {len(pendientes)}")
+    print(f"🧩 Perfil / modo:         {perfil} / {modo}")
+    print(f"💾 Checkpoint:            {checkpoint_path}\n")
+
+    if not pendientes:
+        print("✅ No hay PDFs pendientes")
+        return True
+
+    init_db()
+    db = next(get_db())
+
+    # Configuración de clientes: una sola consulta para todo el proceso
+    clientes = {
+        c.nombre_agencia: c.requiere_oc
+        for c in db.query(ConfiguracionCliente).filter_by(activo=True).all()
+    }
+
+    pool = PDFExtractionPool(max_workers=workers)
+
+    insertadas = 0
+    duplicadas = 0
+    fallidas = 0
+    procesadas = 0
+    inicio = time.perf_counter()
+
+    try:
+        for offset in range(0, len(pendientes), tamano_lote):
+            lote = pendientes[offset:offset + tamano_lote]
+            adjuntos = [{'content': p.read_bytes(), 'filename': p.name} for p in lote]
+
+            resultados = asyncio.run(
+                pool.extract_many(adjuntos, [modo] * len(adjuntos), [perfil] * len(adjuntos))
+            )
+
+            # Reservas ya existentes: una consulta por lote en lugar de una por PDF
+            ids = [r['id_reserva'] for r in resultados if r and r.get('id_reserva')]
+            existentes = {
+                fila[0] for fila in db.query(Reserva.id_reserva).filter(Reserva.id_reserva.in_(ids)).all()
+            } if ids else set()
+
+            reservas = []
+            for pdf_path, pdf_data in zip(lote, resultados):
+                relativo = str(pdf_path.relative_to(raiz))
+
+                is_valid, errors = pdf_processor.validate_data(pdf_data) if pdf_data else (False, ["sin datos"])
+                if not is_valid:
+                    logger.error(f"Datos inválidos en {relativo}: {errors}")
+                    checkpoint["fallidos"].append(relativo)
+                    fallidas += 1
+                    continue
+
+                id_reserva = pdf_data['id_reserva']
+                if id_reserva in existentes:
+                    duplicadas += 1
+                    continue
+
+                existentes.add(id_reserva)
+                requiere_oc = clientes.get(pdf_data.get('agencia', ''), False)
+                reservas.append(crear_reserva(pdf_data, pdf_path, requiere_oc, con_seguimiento))
+
+            nuevas = insertar_lote(db, reservas)
+            insertadas += nuevas
+            duplicadas += len(reservas) - nuevas
+
+            # Solo se marca el lote como procesado después del commit
+            checkpoint["procesados"].extend(str(p.relative_to(raiz)) for p in lote)
+            guardar_checkpoint(checkpoint_path, checkpoint)
+
+            procesadas += len(lote)
+            transcurrido = time.perf_counter() - inicio
+            velocidad = procesadas / transcurrido if transcurrido else 0.0
+            restante = (len(pendientes) - procesadas) / velocidad if velocidad else 0.0
+            print(
+                f"  [{procesadas:>6}/{len(pendientes)}] "
+                f"{procesadas / len(pendientes) * 100:5.1f}% | "
+                f"{velocidad:6.1f} PDFs/s | "
+                f"✨ {insertadas} nuevas, ⏭️  {duplicadas} duplicadas, ❌ {fallidas} fallidas | "
+                f"ETA {restante:5.0f}s"
+            )
+
+    except KeyboardInterrupt:
+        print("\n⚠️  Interrumpido: el avance quedó guardado en el checkpoint")
+        return False
+
+    finally:
+        pool.shutdown()
+        db.close()
+
+    duracion = time.perf_counter() - inicio
+
+    print("\n📊 RESUMEN DE CARGA")
+    print("-" * 70)
+    print(f"  ✨ Reservas insertadas:       {insertadas}")
+    print(f"  ⏭️  Reservas duplicadas:       {duplicadas}")
+    print(f"  ❌ PDFs fallidos:             {fallidas}")
+    print(f"  📋 PDFs procesados:           {procesadas}")
+    print(f"  ⏱️  Duración:                  {duracion:.1f}s ({procesadas / duracion:.1f} PDFs/s)")
+    print("-" * 70 + "\n")
+
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Carga masiva de PDFs de confirmación históricos')
+    parser.add_argument('directorio', type=str, help='Directorio con los PDFs (se recorre recursivamente)')
+    parser.add_argument('--checkpoint', type=str, default=str(CHECKPOINT_DEFAULT), help='Archivo de checkpoint')
+    parser.add_argument('--lote', type=int, default=100, help='PDFs por lote (un commit por lote)')
+    parser.add_argument('--workers', type=int, default=settings.pdf_extraction_workers, help='Procesos de extracción')
+    parser.add_argument('--modo', choices=['text', 'layout'], default='text', help='Modo de extracción')
+    parser.add_argument('--perfil', choices=extraction_profiles.names(), default=extraction_profiles.default.name,
+                        help='Perfil de patrones del proveedor de los PDFs')
+    parser.add_argument('--con-seguimiento', action='store_true',
+                        help='Activar seguimiento de OC para clientes que lo requieren (por defecto desactivado)')
+    parser.add_argument('--reiniciar', action='store_true', help='Ignorar el checkpoint y procesar todo de nuevo')
+
+    args = parser.parse_args()
+
+    # Silenciar logs por documento para no saturar la barra de progreso
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    checkpoint_path = Path(args.checkpoint)
+    if args.reiniciar and checkpoint_path.exists():
+        checkpoint_path.unlink()
+
+    try:
+        exito = backfill(
+            args.directorio,
+            checkpoint_path,
+            args.lote,
+            args.workers,
+            args.modo,
+            args.perfil,
+            args.con_seguimiento
+        )
+        exit(0 if exito else 1)
+    except Exception as e:
+        logger.error(f"Error en carga masiva: {e}")
+        exit(1)
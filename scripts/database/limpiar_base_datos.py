@@ -10,7 +10,7 @@ project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 sys.path.insert(0, project_root)
 os.chdir(project_root)
 
-from database import init_db, get_db, Reserva, CorreoEnviado, OrdenCompra, ConfiguracionCliente, EstadoOC
+from database import init_db, get_db, Reserva, HabitacionReserva, CorreoEnviado, OrdenCompra, ConfiguracionCliente, EstadoOC
 from sqlalchemy import func
 
 def mostrar_estadisticas(db):
@@ -126,6 +126,8 @@ def eliminar_todas_reservas(db):
         count_oc = db.query(OrdenCompra).count()
 
         # Eliminar en orden (las relaciones cascade se encargan del resto)
+        # El delete masivo no aplica el cascade del ORM: habitaciones primero
+        db.query(HabitacionReserva).delete()
         db.query(Reserva).delete()
         db.commit()
 
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Migra detalles_habitaciones (JSON) a la tabla habitaciones_reserva
+Para reservas creadas antes de que existiera la tabla de habitaciones.
+Las reservas que ya tienen filas de habitaciones se omiten.
+
+Uso:
+    PYTHONPATH=. python scripts/database/migrar_habitaciones.py
+    PYTHONPATH=. python scripts/database/migrar_habitaciones.py --lote 1000
+"""
+import sys
+import os
+
+# Agregar raíz del proyecto al path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, project_root)
+os.chdir(project_root)
+
+from loguru import logger
+
+from database import init_db, get_db, Reserva, HabitacionReserva
+
+
+def migrar_habitaciones(tamano_lote: int) -> bool:
+    """Crea las filas de habitaciones faltantes, con un commit por lote"""
+
+    print("\n" + "=" * 70)
+    print("  🛏️  MIGRACIÓN DE HABITACIONES A TABLA PROPIA")
+    print("=" * 70 + "\n")
+
+    init_db()
+    db = next(get_db())
+
+    con_habitaciones = db.query(HabitacionReserva.reserva_id).distinct()
+    pendientes = db.query(Reserva.id, Reserva.detalles_habitaciones).filter(
+        Reserva.detalles_habitaciones.isnot(None),
+        Reserva.id.notin_(con_habitaciones)
+    ).all()
+
+    print(f"📊 Reservas a migrar: {len(pendientes)}\n")
+
+    migradas = 0
+    habitaciones = 0
+    errores = 0
+
+    for offset in range(0, len(pendientes), tamano_lote):
+        lote = pendientes[offset:offset + tamano_lote]
+        for reserva_id, detalles in lote:
+            try:
+                filas = HabitacionReserva.desde_detalles(detalles)
+            except (ValueError, KeyError, TypeError) as e:
+                errores += 1
+                logger.error(f"detalles_habitaciones inválido en reserva {reserva_id}: {e}")
+                continue
+
+            for fila in filas:
+                fila.reserva_id = reserva_id
+            db.add_all(filas)
+            habitaciones += len(filas)
+            migradas += 1
+
+        db.commit()
+        print(f"  [{min(offset + tamano_lote, len(pendientes)):>6}/{len(pendientes)}] reservas procesadas")
+
+    print("\n📊 RESUMEN DE MIGRACIÓN")
+    print("-" * 70)
+    print(f"  ✅ Reservas migradas:         {migradas}")
+    print(f"  🛏️  Habitaciones creadas:      {habitaciones}")
+    print(f"  ❌ Errores:                    {errores}")
+    print("-" * 70 + "\n")
+
+    db.close()
+    return errores == 0
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Migra detalles_habitaciones a la tabla habitaciones_reserva')
+    parser.add_argument('--lote', type=int, default=500, help='Reservas por commit')
+
+    args = parser.parse_args()
+
+    try:
+        exito = migrar_habitaciones(args.lote)
+        exit(0 if exito else 1)
+    except Exception as e:
+        logger.error(f"Error en migración: {e}")
+        exit(1)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Reinicia la sincronización incremental de los monitores
+Por IMAP, los monitores descargan solo los correos con UID mayor al último
+registrado en sincronizacion_buzones (un registro por buzón y monitor); por
+Graph API, solo los cambios desde el deltaLink de sincronizacion_graph.
+Para reprocesar correos antiguos (ej: después de marcarlos como no leídos
+con scripts/utils/marcar_no_leido.py) se elimina el estado: en el siguiente
+ciclo el monitor procesa todos los no leídos y vuelve a sincronizar desde ahí.
+
+El sistema debe estar detenido: los monitores mantienen el estado en memoria.
+
+Uso:
+    PYTHONPATH=. python scripts/database/reiniciar_sincronizacion.py --listar
+    PYTHONPATH=. python scripts/database/reiniciar_sincronizacion.py
+    PYTHONPATH=. python scripts/database/reiniciar_sincronizacion.py --usuario reservas@empresa.cl
+    PYTHONPATH=. python scripts/database/reiniciar_sincronizacion.py --monitor oc
+"""
+import sys
+import os
+import json
+from typing import Optional
+
+# Agregar raíz del proyecto al path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, project_root)
+os.chdir(project_root)
+
+from loguru import logger
+
+from database import init_db, get_db, SincronizacionBuzon, SincronizacionGraph
+
+
+def listar_estado():
+    """Muestra el último UID (IMAP) o el estado delta (Graph) por buzón"""
+    init_db()
+    db = next(get_db())
+
+    estados = db.query(SincronizacionBuzon).order_by(SincronizacionBuzon.usuario).all()
+    estados_graph = db.query(SincronizacionGraph).order_by(SincronizacionGraph.buzon).all()
+    if not estados and not estados_graph:
+        print("📭 No hay estado de sincronización registrado")
+        return
+
+    if estados:
+        print(f"\n{'Usuario':35} {'Carpeta':12} {'Monitor':10} {'UIDVALIDITY':>12} {'Último UID':>11}  Actualizado")
+        print("-" * 111)
+        for e in estados:
+            monitor = e.monitor or '-'
+            print(f"{e.usuario:35} {e.carpeta:12} {monitor:10} {e.uidvalidity:>12} {e.ultimo_uid:>11}  {e.fecha_actualizacion}")
+
+    if estados_graph:
+        print(f"\n{'Buzón (Graph)':35} {'Carpeta':12} {'Monitor':10} {'Recientes':>9} {'Última recepción':>20}  Actualizado")
+        print("-" * 117)
+        for e in estados_graph:
+            monitor = e.monitor or '-'
+            recientes = len(json.loads(e.mensajes_recientes or '{}'))
+            recepcion = str(e.ultima_recepcion or '-')
+            print(f"{e.buzon:35} {e.carpeta:12} {monitor:10} {recientes:>9} {recepcion:>20}  {e.fecha_actualizacion}")
+    print()
+
+
+def reiniciar(usuario: Optional[str], monitor: Optional[str] = None) -> int:
+    """
+    Elimina el estado de sincronización
+
+    Returns:
+        Número de buzones reiniciados
+    """
+    init_db()
+    db = next(get_db())
+
+    query = db.query(SincronizacionBuzon)
+    query_graph = db.query(SincronizacionGraph)
+    if usuario:
+        query = query.filter_by(usuario=usuario)
+        query_graph = query_graph.filter_by(buzon=usuario)
+    if monitor:
+        query = query.filter_by(monitor=monitor)
+        query_graph = query_graph.filter_by(monitor=monitor)
+
+    eliminados = query.delete(synchronize_session=False)
+    eliminados += query_graph.delete(synchronize_session=False)
+    db.commit()
+
+    print(f"✅ Sincronización reiniciada en {eliminados} buzón(es)")
+    print("   El próximo ciclo de cada monitor procesará los correos no leídos")
+    return eliminados
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Reinicia la sincronización incremental (IMAP y Graph API)')
+    parser.add_argument('--usuario', type=str, default=None, help='Solo el buzón de este usuario (IMAP o Graph)')
+    parser.add_argument('--monitor', type=str, default=None, choices=['reservas', 'oc'],
+                        help='Solo el estado de este monitor')
+    parser.add_argument('--listar', action='store_true', help='Mostrar el estado actual sin modificarlo')
+
+    args = parser.parse_args()
+
+    try:
+        if args.listar:
+            listar_estado()
+        else:
+            reiniciar(args.usuario, args.monitor)
+        exit(0)
+    except Exception as e:
+        logger.error(f"Error reiniciando sincronización: {e}")
+        exit(1)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Benchmark de regresión y rendimiento sobre un corpus sintético
+Genera PDFs de confirmación estilo hotelsales (tests/corpus_sintetico.py) con
+distintos formatos de monto, varias páginas y campos ausentes, los procesa con
+extract_from_bytes y reporta:
+  - Documentos/segundo, latencia p50/p99 y RSS máximo del proceso
+  - Precisión por campo contra la verdad de referencia del generador
+
+Con --min-precision el script termina con código 1 si algún campo queda bajo
+el umbral, para usarlo como control antes de optimizar el parser.
+
+Uso:
+    PYTHONPATH=. python scripts/testing/benchmark_corpus.py
+    PYTHONPATH=. python scripts/testing/benchmark_corpus.py --documentos 2000 --modo layout
+    PYTHONPATH=. python scripts/testing/benchmark_corpus.py --min-precision 100 --omitir-campo nombre_hotel
+    PYTHONPATH=. python scripts/testing/benchmark_corpus.py --guardar data/corpus_sintetico
+"""
+import sys
+import os
+import json
+import math
+import time
+from pathlib import Path
+from collections import defaultdict
+from typing import List, Dict, Optional
+
+# Agregar raíz del proyecto al path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, project_root)
+os.chdir(project_root)
+
+from loguru import logger
+from src.pdf_processor import PDFProcessor
+from src.extraction_profiles import extraction_profiles
+from tests.corpus_sintetico import generar_corpus, comparar, CAMPOS_VERIFICADOS
+
+
+def rss_maximo_mb() -> Optional[float]:
+    """RSS máximo del proceso en MB (None si la plataforma no lo expone)"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB, macOS reporta bytes
+    return maximo / (1024 * 1024) if sys.platform == "darwin" else maximo / 1024
+
+
+def percentil(valores_ordenados: List[float], q: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    indice = min(len(valores_ordenados) - 1, max(0, math.ceil(q * len(valores_ordenados)) - 1))
+    return valores_ordenados[indice]
+
+
+def guardar_corpus(corpus, destino: Path):
+    """Escribe los PDFs y la verdad de referencia (verdad_referencia.json)"""
+    destino.mkdir(parents=True, exist_ok=True)
+    verdad = {}
+    for nombre, pdf_bytes, esperado in corpus:
+        (destino / nombre).write_bytes(pdf_bytes)
+        verdad[nombre] = esperado
+
+    with open(destino / "verdad_referencia.json", 'w', encoding='utf-8') as f:
+        json.dump(verdad, f, ensure_ascii=False, indent=2, default=str)
+    print(f"💾 Corpus guardado en {destino} ({len(corpus)} PDFs)\n")
+
+
+def ejecutar(
+    corpus,
+    processor: PDFProcessor,
+    modo: str,
+    perfil: str,
+    omitidos: List[str]
+) -> Dict[str, Dict[str, int]]:
+    """
+    Procesa el corpus e imprime rendimiento y precisión
+
+    Los campos en `omitidos` se reportan pero no cuentan para el resumen por variante.
+
+    Returns:
+        Campo -> {'correctos', 'total'}
+    """
+    # Calentamiento (imports perezosos de pdfminer, caches de fuentes)
+    processor.extract_from_bytes(corpus[0][1], corpus[0][0], modo, perfil)
+
+    latencias = []
+    aciertos = defaultdict(lambda: {"correctos": 0, "total": 0})
+    por_variante = defaultdict(lambda: {"correctos": 0, "total": 0})
+    fallidos = 0
+
+    inicio = time.perf_counter()
+    for nombre, pdf_bytes, esperado in corpus:
+        t0 = time.perf_counter()
+        data = processor.extract_from_bytes(pdf_bytes, nombre, modo, perfil)
+        latencias.append(time.perf_counter() - t0)
+
+        if not data:
+            fallidos += 1
+
+        resultado = comparar(esperado, data)
+        # sintetico_00012_<formato>_<páginas>p.pdf
+        formato, paginas = nombre[len("sintetico_00000_"):-len(".pdf")].rsplit("_", 1)
+        for campo, correcto in resultado.items():
+            aciertos[campo]["total"] += 1
+            aciertos[campo]["correctos"] += correcto
+        for variante in (f"monto {formato}", f"{paginas[:-1]} página(s)"):
+            por_variante[variante]["total"] += 1
+            por_variante[variante]["correctos"] += all(
+                correcto for campo, correcto in resultado.items() if campo not in omitidos
+            )
+    duracion = time.perf_counter() - inicio
+
+    latencias.sort()
+    print(f"⚙️  Modo {modo} - perfil {perfil}")
+    print("-" * 60)
+    print(f"  {'Documentos':28}: {len(corpus)} ({fallidos} sin datos)")
+    print(f"  {'Rendimiento':28}: {len(corpus) / duracion:8.1f} docs/s")
+    print(f"  {'Latencia p50':28}: {percentil(latencias, 0.50) * 1000:8.2f} ms")
+    print(f"  {'Latencia p99':28}: {percentil(latencias, 0.99) * 1000:8.2f} ms")
+    print(f"  {'Latencia máxima':28}: {latencias[-1] * 1000:8.2f} ms")
+    rss = rss_maximo_mb()
+    if rss is not None:
+        print(f"  {'RSS máximo del proceso':28}: {rss:8.1f} MB")
+
+    print("\n  Precisión por campo:")
+    for campo in CAMPOS_VERIFICADOS:
+        a = aciertos[campo]
+        marca = "✅" if a["correctos"] == a["total"] else "⚠️ "
+        print(f"    {marca} {campo:26}: {a['correctos'] / a['total'] * 100:6.1f}% ({a['correctos']}/{a['total']})")
+
+    print("\n  Documentos con todos los campos correctos, por variante:")
+    for variante in sorted(por_variante):
+        v = por_variante[variante]
+        print(f"    {variante:29}: {v['correctos']}/{v['total']}")
+    print()
+
+    return aciertos
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark de extracción sobre un corpus sintético')
+    parser.add_argument('--documentos', type=int, default=500, help='Cantidad de PDFs a generar')
+    parser.add_argument('--semilla', type=int, default=42, help='Semilla del generador (corpus reproducible)')
+    parser.add_argument('--modo', choices=['text', 'layout', 'ambos'], default='text', help='Modo de extracción')
+    parser.add_argument('--perfil', choices=extraction_profiles.names(), default='hotelsales',
+                        help='Perfil de patrones a usar')
+    parser.add_argument('--min-precision', type=float, default=None,
+                        help='Porcentaje mínimo por campo; bajo el umbral el script termina con código 1')
+    parser.add_argument('--omitir-campo', action='append', default=[],
+                        help='Campo a excluir de --min-precision y del resumen por variante (repetible)')
+    parser.add_argument('--guardar', type=str, default=None,
+                        help='Directorio donde guardar los PDFs y la verdad de referencia')
+
+    args = parser.parse_args()
+
+    # Silenciar logs por documento para no distorsionar la medición
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+
+    print("=" * 60)
+    print(f"📊 Benchmark corpus sintético: {args.documentos} PDFs (semilla {args.semilla})")
+    print("=" * 60)
+
+    inicio = time.perf_counter()
+    corpus = generar_corpus(args.documentos, args.semilla)
+    print(f"  Generación: {time.perf_counter() - inicio:.2f}s, "
+          f"{sum(len(b) for _, b, _ in corpus) / 1024:.0f} KB en total")
+    rss = rss_maximo_mb()
+    if rss is not None:
+        print(f"  RSS máximo tras generar el corpus: {rss:.1f} MB")
+    print()
+
+    if args.guardar:
+        guardar_corpus(corpus, Path(args.guardar))
+
+    # Sin caché: se mide siempre la extracción completa
+    processor = PDFProcessor()
+    modos = ['text', 'layout'] if args.modo == 'ambos' else [args.modo]
+
+    bajo_umbral = []
+    for modo in modos:
+        aciertos = ejecutar(corpus, processor, modo, args.perfil, args.omitir_campo)
+        if args.min_precision is not None:
+            bajo_umbral += [
+                f"{modo}/{campo}" for campo, a in aciertos.items()
+                if campo not in args.omitir_campo and a["correctos"] / a["total"] * 100 < args.min_precision
+            ]
+
+    if bajo_umbral:
+        print(f"❌ Campos bajo {args.min_precision}%: {', '.join(bajo_umbral)}")
+        sys.exit(1)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latencia del dashboard durante la ingesta de correos
+Mide la latencia de un endpoint del dashboard (por defecto /api/stats,
+atendido por la app FastAPI real en el mismo event loop) primero en reposo y
+luego mientras ReservaMonitor procesa un lote de correos de confirmación con
+PDF del corpus sintético.
+
+La descarga IMAP se simula con una pausa bloqueante por mensaje (el tiempo de
+red de imaplib); la extracción en el pool de procesos y las escrituras en una
+base SQLite temporal son las reales. Con --modo bloqueante el trabajo de E/S
+se ejecuta directamente en el event loop, como antes de monitor_io_pool,
+para comparar.
+
+Con --max-aumento-p99 el script termina con código 1 si el p99 durante la
+ingesta (modo executor) supera al de reposo en más de esos milisegundos.
+
+Uso:
+    PYTHONPATH=. python scripts/testing/benchmark_ingesta.py
+    PYTHONPATH=. python scripts/testing/benchmark_ingesta.py --correos 50 --modo ambos
+    PYTHONPATH=. python scripts/testing/benchmark_ingesta.py --latencia-imap 0.05 --max-aumento-p99 50
+    PYTHONPATH=. python scripts/testing/benchmark_ingesta.py --ruta /api/reservas
+"""
+import sys
+import os
+import time
+import asyncio
+import tempfile
+from email.utils import formatdate
+from typing import List, Dict, Any, Optional
+
+# Agregar raíz del proyecto al path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, project_root)
+os.chdir(project_root)
+
+import httpx
+from loguru import logger
+
+import database
+from config import settings
+from app import app
+from src.email_monitor import ReservaMonitor
+from src.extraction_pool import pdf_extraction_pool
+from src.io_pool import monitor_io_pool
+from tests.corpus_sintetico import generar_corpus
+from scripts.testing.benchmark_corpus import percentil
+
+
+def generar_correos(cantidad: int) -> List[Dict[str, Any]]:
+    """Correos de confirmación (formato de EmailMonitor._fetch_email) con un PDF cada uno"""
+    remitente = settings.allowed_senders_list[0] if settings.allowed_senders_list else "reservasonline@hotelsales.cl"
+    correos = []
+    for uid, (nombre, pdf_bytes, _) in enumerate(generar_corpus(cantidad), start=1):
+        correos.append({
+            'uid': uid,
+            'subject': f"Confirmación de reserva {uid}",
+            'from': f"Hotel Sales <{remitente}>",
+            'date': formatdate(),
+            'body_text': '',
+            'attachments': [{'filename': nombre, 'content': pdf_bytes, 'size': len(pdf_bytes)}],
+        })
+    return correos
+
+
+def crear_monitor(correos: List[Dict[str, Any]], latencia_imap: float) -> ReservaMonitor:
+    """ReservaMonitor cuya descarga IMAP es una pausa bloqueante por mensaje"""
+    monitor = ReservaMonitor()
+
+    def check_new_emails() -> List[Dict[str, Any]]:
+        for _ in correos:
+            time.sleep(latencia_imap)
+        return correos
+
+    monitor.check_new_emails = check_new_emails
+    monitor.mark_many_as_read = lambda uids: time.sleep(latencia_imap * len(uids))
+    return monitor
+
+
+async def medir_dashboard(client: httpx.AsyncClient, ruta: str, hasta: asyncio.Event, pausa: float) -> List[float]:
+    """
+    Pide GET ruta cada `pausa` segundos hasta que se active `hasta`
+
+    La latencia se cuenta desde el instante programado de cada petición, no
+    desde que se envía: si el event loop estuvo bloqueado, las peticiones que
+    debieron salir durante el bloqueo registran esa espera.
+
+    Returns:
+        Latencias en ms
+    """
+    latencias = []
+    programada = time.perf_counter()
+    while not hasta.is_set():
+        espera = programada - time.perf_counter()
+        if espera > 0:
+            await asyncio.sleep(espera)
+        respuesta = await client.get(ruta)
+        latencias.append((time.perf_counter() - programada) * 1000)
+        if respuesta.status_code != 200:
+            raise RuntimeError(f"Dashboard respondió {respuesta.status_code}")
+        programada += pausa
+    return latencias
+
+
+def resumen(etiqueta: str, latencias: List[float]) -> Dict[str, float]:
+    valores = sorted(latencias)
+    stats = {
+        'p50': percentil(valores, 0.50),
+        'p99': percentil(valores, 0.99),
+        'max': valores[-1],
+    }
+    print(
+        f"   {etiqueta:10} {len(valores):5} peticiones   p50 {stats['p50']:7.1f} ms   "
+        f"p99 {stats['p99']:7.1f} ms   máx {stats['max']:7.1f} ms"
+    )
+    return stats
+
+
+async def ejecutar(modo: str, correos: List[Dict[str, Any]], ruta: str, latencia_imap: float, reposo: float,
+                   pausa: float):
+    """
+    Mide el dashboard en reposo y durante la ingesta de los correos
+
+    Returns:
+        (estadísticas en reposo, estadísticas durante la ingesta, reservas creadas)
+    """
+    run_original = monitor_io_pool.run
+    if modo == "bloqueante":
+        async def en_event_loop(func, *args, **kwargs):
+            return func(*args, **kwargs)
+        monitor_io_pool.run = en_event_loop
+
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            # Reposo
+            hasta = asyncio.Event()
+            tarea = asyncio.create_task(medir_dashboard(client, ruta, hasta, pausa))
+            await asyncio.sleep(reposo)
+            hasta.set()
+            en_reposo = await tarea
+
+            # Ingesta
+            monitor = crear_monitor(correos, latencia_imap)
+            db = next(database.get_db())
+            hasta = asyncio.Event()
+            tarea = asyncio.create_task(medir_dashboard(client, ruta, hasta, pausa))
+            inicio = time.perf_counter()
+            creadas = await monitor.process_new_reservations(db)
+            duracion = time.perf_counter() - inicio
+            hasta.set()
+            en_ingesta = await tarea
+            db.close()
+    finally:
+        monitor_io_pool.run = run_original
+
+    print(f"\n📊 Modo {modo}: {creadas} reservas creadas en {duracion:.1f}s")
+    return resumen("reposo", en_reposo), resumen("ingesta", en_ingesta), creadas
+
+
+def main(correos_total: int, modo: str, ruta: str, latencia_imap: float, reposo: float, pausa: float,
+         max_aumento_p99: Optional[float]) -> int:
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+
+    correos = generar_correos(correos_total)
+    print(f"📬 {len(correos)} correos sintéticos, latencia IMAP simulada {latencia_imap * 1000:.0f} ms por mensaje")
+    print(f"⏱️  Latencia medida: GET {ruta}")
+
+    modos = ["bloqueante", "executor"] if modo == "ambos" else [modo]
+    resultados = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        for m in modos:
+            # Base nueva por modo para que las reservas no queden como duplicadas
+            database.init_db(f"sqlite:///{directorio}/benchmark_{m}.db")
+            resultados[m] = asyncio.run(ejecutar(m, correos, ruta, latencia_imap, reposo, pausa))
+            database.engine.dispose()
+
+    pdf_extraction_pool.shutdown()
+    monitor_io_pool.shutdown()
+
+    if max_aumento_p99 is not None and "executor" in resultados:
+        en_reposo, en_ingesta, _ = resultados["executor"]
+        aumento = en_ingesta['p99'] - en_reposo['p99']
+        if aumento > max_aumento_p99:
+            print(f"\n❌ El p99 aumentó {aumento:.1f} ms durante la ingesta (máximo {max_aumento_p99:.1f} ms)")
+            return 1
+        print(f"\n✅ El p99 aumentó {aumento:.1f} ms durante la ingesta (máximo {max_aumento_p99:.1f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Latencia del dashboard durante la ingesta de correos')
+    parser.add_argument('--correos', type=int, default=50, help='Correos del lote (default: 50)')
+    parser.add_argument('--modo', choices=['executor', 'bloqueante', 'ambos'], default='ambos',
+                        help='E/S en monitor_io_pool, en el event loop, o ambos para comparar')
+    parser.add_argument('--ruta', default='/api/stats', help='Endpoint del dashboard a medir (default: /api/stats)')
+    parser.add_argument('--latencia-imap', type=float, default=0.02,
+                        help='Segundos de descarga IMAP simulada por mensaje (default: 0.02)')
+    parser.add_argument('--reposo', type=float, default=3.0, help='Segundos de medición en reposo (default: 3)')
+    parser.add_argument('--pausa', type=float, default=0.05, help='Segundos entre peticiones (default: 0.05)')
+    parser.add_argument('--max-aumento-p99', type=float, default=None,
+                        help='Falla si el p99 durante la ingesta supera al de reposo en más de estos ms')
+
+    args = parser.parse_args()
+    sys.exit(main(args.correos, args.modo, args.ruta, args.latencia_imap, args.reposo, args.pausa, args.max_aumento_p99))
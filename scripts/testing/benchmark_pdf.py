@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Benchmark de extracción de PDF desde bytes
+Compara el camino anterior (archivo temporal + extract_from_file) con la
+extracción en memoria de extract_from_bytes, midiendo PDFs/segundo.
+Con --solo-parseo mide únicamente el tiempo de _parse_text por documento y perfil.
+Con --comparar-modos compara los modos de extracción "text" y "layout"
+sobre todos los PDF de un directorio (--corpus). Las iteraciones de ambos
+modos se alternan y se reporta la mediana, para que el orden de ejecución y
+la variación de la máquina no favorezcan a ninguno. Ambos modos pasan casi
+todo el tiempo interpretando la página con pdfminer (trabajo común a los
+dos): layout no es más rápido, su ventaja es leer por posición los pares
+etiqueta/valor de los resúmenes a dos columnas.
+
+Uso:
+    PYTHONPATH=. python scripts/testing/benchmark_pdf.py
+    PYTHONPATH=. python scripts/testing/benchmark_pdf.py --iteraciones 200 --pdf ruta/al/archivo.pdf
+    PYTHONPATH=. python scripts/testing/benchmark_pdf.py --solo-parseo --iteraciones 5000
+    PYTHONPATH=. python scripts/testing/benchmark_pdf.py --comparar-modos --corpus data/ --iteraciones 20
+"""
+import sys
+import os
+import time
+import statistics
+import tempfile
+from pathlib import Path
+
+import pdfplumber
+
+# Agregar raíz del proyecto al path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, project_root)
+os.chdir(project_root)
+
+from loguru import logger
+from src.pdf_processor import PDFProcessor
+from src.extraction_profiles import extraction_profiles
+
+PDF_EJEMPLO = Path("data") / "resumen del servicio.pdf"
+
+
+def extraer_con_temporal(processor: PDFProcessor, pdf_bytes: bytes):
+    """Camino anterior: escribe el adjunto a disco y lo reabre"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+        tmp.write(pdf_bytes)
+        tmp_path = tmp.name
+
+    try:
+        return processor.extract_from_file(tmp_path)
+    finally:
+        Path(tmp_path).unlink()
+
+
+def extraer_en_memoria(processor: PDFProcessor, pdf_bytes: bytes):
+    """Camino actual: extracción directa desde BytesIO"""
+    return processor.extract_from_bytes(pdf_bytes, "benchmark.pdf")
+
+
+def medir(nombre: str, funcion, processor: PDFProcessor, pdf_bytes: bytes, iteraciones: int) -> float:
+    """Ejecuta la función N veces y retorna PDFs/segundo"""
+    # Calentamiento (imports perezosos de pdfminer, caches de fuentes)
+    funcion(processor, pdf_bytes)
+
+    inicio = time.perf_counter()
+    for _ in range(iteraciones):
+        funcion(processor, pdf_bytes)
+    duracion = time.perf_counter() - inicio
+
+    pdfs_por_segundo = iteraciones / duracion
+    print(f"  {nombre:28}: {pdfs_por_segundo:8.1f} PDFs/s  ({duracion / iteraciones * 1000:.2f} ms/PDF)")
+    return pdfs_por_segundo
+
+
+def medir_parseo(processor: PDFProcessor, pdf_path: str, iteraciones: int):
+    """Mide el tiempo de _parse_text sobre el texto ya extraído del PDF, por perfil"""
+    with pdfplumber.open(pdf_path) as pdf:
+        texto = "".join((page.extract_text() or "") + "\n" for page in pdf.pages)
+
+    for nombre in extraction_profiles.names():
+        perfil = extraction_profiles.get(nombre)
+        processor._parse_text(texto, perfil)
+
+        inicio = time.perf_counter()
+        for _ in range(iteraciones):
+            processor._parse_text(texto, perfil)
+        duracion = time.perf_counter() - inicio
+
+        print(f"  {'Parseo (perfil ' + nombre + ')':28}: {duracion / iteraciones * 1_000_000:8.1f} µs/documento")
+
+
+def comparar_modos(processor: PDFProcessor, corpus: str, iteraciones: int):
+    """Compara tiempo por documento y campos extraídos entre modo texto y layout"""
+    pdfs = sorted(Path(corpus).glob("*.pdf"))
+    if not pdfs:
+        print(f"❌ No hay PDFs en {corpus}")
+        return
+
+    tiempos = {"text": 0.0, "layout": 0.0}
+    campos_totales = 0
+    campos_distintos = 0
+
+    for pdf_path in pdfs:
+        pdf_bytes = pdf_path.read_bytes()
+        resultados = {}
+        muestras = {modo: [] for modo in tiempos}
+
+        # Calentamiento y campos extraídos por cada modo
+        for modo in tiempos:
+            resultados[modo] = processor.extract_from_bytes(pdf_bytes, pdf_path.name, modo) or {}
+
+        # Iteraciones alternadas (text, layout, layout, text, ...): mediana por modo
+        for i in range(iteraciones):
+            for modo in (list(tiempos) if i % 2 == 0 else list(tiempos)[::-1]):
+                inicio = time.perf_counter()
+                processor.extract_from_bytes(pdf_bytes, pdf_path.name, modo)
+                muestras[modo].append(time.perf_counter() - inicio)
+
+        for modo in tiempos:
+            tiempos[modo] += statistics.median(muestras[modo])
+
+        texto, layout = resultados["text"], resultados["layout"]
+        distintos = [k for k in set(texto) | set(layout) if texto.get(k) != layout.get(k)]
+        campos_totales += len(set(texto) | set(layout))
+        campos_distintos += len(distintos)
+        if distintos:
+            print(f"  ⚠️  {pdf_path.name}: campos distintos entre modos: {', '.join(sorted(distintos))}")
+
+    for modo, total in tiempos.items():
+        print(f"  {'Modo ' + modo + ' (mediana)':28}: {total / len(pdfs) * 1000:8.2f} ms/PDF")
+    diferencia = (tiempos["layout"] - tiempos["text"]) / tiempos["text"] * 100
+    print(f"  {'Layout vs. texto':28}: {diferencia:+8.1f} %")
+    print(f"  {'Concordancia de campos':28}: {campos_totales - campos_distintos}/{campos_totales}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark de extracción de PDF desde bytes')
+    parser.add_argument('--pdf', type=str, default=str(PDF_EJEMPLO), help='PDF a procesar')
+    parser.add_argument('--iteraciones', type=int, default=50, help='Número de extracciones por modo')
+    parser.add_argument('--solo-parseo', action='store_true', help='Medir solo _parse_text (sin pdfplumber)')
+    parser.add_argument('--comparar-modos', action='store_true', help='Comparar extracción por texto vs. layout')
+    parser.add_argument('--corpus', type=str, default="data", help='Directorio de PDFs para --comparar-modos')
+
+    args = parser.parse_args()
+
+    # Silenciar logs por documento para no distorsionar la medición
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    pdf_bytes = Path(args.pdf).read_bytes()
+    processor = PDFProcessor()
+
+    print("=" * 60)
+    print(f"📊 Benchmark extracción PDF: {args.pdf}")
+    print(f"   Tamaño: {len(pdf_bytes):,} bytes - Iteraciones: {args.iteraciones}")
+    print("=" * 60)
+
+    if args.solo_parseo:
+        medir_parseo(processor, args.pdf, args.iteraciones)
+        sys.exit(0)
+
+    if args.comparar_modos:
+        comparar_modos(processor, args.corpus, args.iteraciones)
+        sys.exit(0)
+
+    antes = medir("Archivo temporal (anterior)", extraer_con_temporal, processor, pdf_bytes, args.iteraciones)
+    despues = medir("En memoria (BytesIO)", extraer_en_memoria, processor, pdf_bytes, args.iteraciones)
+
+    print("-" * 60)
+    print(f"  Mejora: {despues / antes:.2f}x")
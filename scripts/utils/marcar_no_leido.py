@@ -32,7 +32,7 @@ def marcar_como_no_leido(subject_contains: str):
 
     try:
         # Buscar TODOS los emails (leídos y no leídos)
-        status, messages = client.client.search(None, 'ALL')
+        status, messages = client.client.uid('SEARCH', None, 'ALL')
 
         if status != 'OK':
             print(f"❌ Error en búsqueda: {status}")
@@ -52,7 +52,7 @@ def marcar_como_no_leido(subject_contains: str):
                 print(f"   De: {email_data['from']}")
 
                 # Marcar como NO LEÍDO (remover flag \Seen)
-                client.client.store(mid, '-FLAGS', '\\Seen')
+                client.client.uid('STORE', mid, '-FLAGS', '\\Seen')
                 print(f"✅ Email marcado como NO LEÍDO")
                 return True
 
@@ -0,0 +1,50 @@
+"""
+Conversión de montos escritos en documentos a float
+Distingue separador de miles y decimal: "528.701" y "528.701,00" son
+528701 (formato chileno), "1,234,567.89" es 1234567.89 (formato US).
+"""
+from typing import Optional
+
+
+def parse_amount(monto_str: str) -> Optional[float]:
+    """
+    Convierte un monto con separadores a float
+
+    Reglas:
+        - Con punto y coma, el que aparece último es el decimal
+        - Con un solo tipo de separador repetido, es de miles
+        - Con un único separador seguido de exactamente 3 dígitos, es de miles
+        - En otro caso el separador único es decimal
+
+    Returns:
+        Monto o None si el texto no es un número
+    """
+    # Puntuación final de la oración: "Total: CLP 528.701,00."
+    monto_str = monto_str.strip().lstrip('$').strip().rstrip('.,')
+    if not monto_str:
+        return None
+
+    ultimo_punto = monto_str.rfind('.')
+    ultima_coma = monto_str.rfind(',')
+
+    if ultimo_punto >= 0 and ultima_coma >= 0:
+        decimal = '.' if ultimo_punto > ultima_coma else ','
+    elif ultimo_punto >= 0 or ultima_coma >= 0:
+        separador = '.' if ultimo_punto >= 0 else ','
+        posicion = max(ultimo_punto, ultima_coma)
+        if monto_str.count(separador) > 1 or len(monto_str) - posicion - 1 == 3:
+            decimal = None
+        else:
+            decimal = separador
+    else:
+        decimal = None
+
+    miles = {'.', ','} - {decimal}
+    normalizado = "".join(c for c in monto_str if c not in miles)
+    if decimal:
+        normalizado = normalizado.replace(decimal, '.')
+
+    try:
+        return float(normalizado)
+    except ValueError:
+        return None
@@ -0,0 +1,77 @@
+"""
+Conversión de fechas en español a datetime
+Tabla de meses precalculada a nivel de módulo y memo acotado de resultados:
+los resúmenes repiten pocas fechas distintas (check-in, check-out, límite
+de cancelación), por lo que en cargas masivas la mayoría son aciertos.
+"""
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, List, Optional, Dict
+
+from loguru import logger
+
+# Cantidad máxima de textos de fecha distintos que se memorizan
+MEMO_SIZE = 4096
+
+MESES: Dict[str, int] = {
+    'ene': 1, 'enero': 1,
+    'feb': 2, 'febrero': 2,
+    'mar': 3, 'marzo': 3,
+    'abr': 4, 'abril': 4,
+    'may': 5, 'mayo': 5,
+    'jun': 6, 'junio': 6,
+    'jul': 7, 'julio': 7,
+    'ago': 8, 'agosto': 8,
+    'sep': 9, 'septiembre': 9,
+    'oct': 10, 'octubre': 10,
+    'nov': 11, 'noviembre': 11,
+    'dic': 12, 'diciembre': 12
+}
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def parse_spanish_date(fecha_str: str) -> Optional[datetime]:
+    """
+    Convierte fecha en español a datetime
+    Ej: "27 nov. 2025" -> datetime
+
+    Returns:
+        datetime o None si el texto no es una fecha válida
+    """
+    try:
+        # Normalizar y extraer partes
+        parts = fecha_str.lower().replace('.', '').split()
+        if len(parts) >= 3:
+            dia = int(parts[0])
+            anio = int(parts[2])
+
+            mes = MESES.get(parts[1])
+            if mes:
+                return datetime(anio, mes, dia)
+
+    except Exception as e:
+        logger.bind(module="DateParser").warning(f"Error parseando fecha '{fecha_str}': {e}")
+
+    return None
+
+
+def parse_spanish_dates(fechas: Iterable[str]) -> List[Optional[datetime]]:
+    """
+    Convierte muchas fechas en español de una vez (cargas masivas, reportes)
+
+    Cada texto distinto se parsea una sola vez; los repetidos reutilizan
+    el resultado.
+
+    Args:
+        fechas: Textos de fecha
+
+    Returns:
+        Lista de datetime (o None) en el mismo orden que la entrada
+    """
+    resueltas: Dict[str, Optional[datetime]] = {}
+    resultado = []
+    for fecha_str in fechas:
+        if fecha_str not in resueltas:
+            resueltas[fecha_str] = parse_spanish_date(fecha_str)
+        resultado.append(resueltas[fecha_str])
+    return resultado
@@ -1,6 +1,7 @@
 """
-Monitor de correos IMAP para detectar nuevas reservas y OC recibidas
-Monitorea casillas de correo y procesa archivos adjuntos PDF
+Monitor de correos para detectar nuevas reservas y OC recibidas
+Monitorea casillas de correo (Graph API o IMAP, según USE_GRAPH_API) y
+procesa archivos adjuntos PDF
 """
 import time
 import email
@@ -9,21 +10,33 @@ from email import policy
 from email.parser import BytesParser
 from email.utils import parsedate_to_datetime, parseaddr
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Deque, Tuple
+from collections import deque
 from pathlib import Path
 import asyncio
+from abc import ABC, abstractmethod
 
 from loguru import logger
 from sqlalchemy.orm import Session
 
 from config import settings
-from database import Reserva, OrdenCompra, EstadoOC, ConfiguracionCliente, get_db
-from src.pdf_processor import pdf_processor
-from src.imap_wrapper import SimpleIMAPClient
+from database import (
+    Reserva, HabitacionReserva, OrdenCompra, EstadoOC, ConfiguracionCliente, get_db
+)
+from src.pdf_processor import pdf_processor, amount_is_reliable, PARSER_VERSION
+from src.extraction_pool import pdf_extraction_pool, deferred_extraction_pool, DeferredExtraction
+from src.metrics import metrics_registry
+from src.extraction_profiles import extraction_profiles
+from src.oc_processor import oc_processor
+from src.io_pool import monitor_io_pool
+from src.mailbox_backend import MailboxBackend, GraphBackend, IMAPBackend
 
 
-class EmailMonitor:
-    """Monitor de correos IMAP"""
+class EmailMonitor(ABC):
+    """Monitor de correos sobre un buzón de Graph API o IMAP"""
+
+    # Identifica el estado de sincronización: dos monitores pueden leer el mismo buzón
+    MONITOR_NAME = "correo"
 
     def __init__(
         self,
@@ -32,140 +45,161 @@ class EmailMonitor:
         username: str,
         password: str,
         mailbox: str = "INBOX",
-        use_ssl: bool = True
+        use_ssl: bool = True,
+        graph_mailbox: str = ""
     ):
-        self.host = host
-        self.port = port
-        self.username = username
-        self.password = password
-        self.mailbox = mailbox
-        self.use_ssl = use_ssl
-        self.logger = logger.bind(module="EmailMonitor", account=username)
-        self.client: Optional[SimpleIMAPClient] = None
-        self.processed_uids = set()
+        """
+        Args:
+            host, port, username, password, mailbox, use_ssl: Cuenta IMAP (USE_GRAPH_API=false)
+            graph_mailbox: Buzón de Office 365 (USE_GRAPH_API=true)
+        """
+        # Correos con documentos que exceden los límites: (id, motivo)
+        self.deferred: Deque[tuple] = deque()
+
+        self.backend: MailboxBackend
+        if settings.use_graph_api:
+            self.backend = GraphBackend(self, graph_mailbox)
+            account = graph_mailbox
+        else:
+            self.backend = IMAPBackend(self, host, port, username, password, mailbox, use_ssl)
+            account = username
+        self.logger = logger.bind(module="EmailMonitor", account=account)
 
     def connect(self) -> bool:
-        """Conecta al servidor IMAP"""
-        try:
-            self.logger.info(f"Conectando a {self.host}:{self.port}")
-
-            # Usar wrapper simple compatible con Python 3.14+
-            self.client = SimpleIMAPClient(
-                host=self.host,
-                port=self.port,
-                use_ssl=self.use_ssl
-            )
-
-            if not self.client.connect(self.username, self.password):
-                return False
-
-            if not self.client.select_folder(self.mailbox):
-                return False
-
-            self.logger.info("✅ Conexión IMAP establecida")
-            return True
-
-        except Exception as e:
-            self.logger.error(f"❌ Error conectando a IMAP: {e}")
-            import traceback
-            self.logger.debug(traceback.format_exc())
-            return False
+        """Conecta el buzón (Graph API o conexión IMAP del pool)"""
+        return self.backend.connect()
 
     def disconnect(self):
-        """Cierra la conexión IMAP"""
-        if self.client:
-            try:
-                self.client.disconnect()
-                self.logger.info("Desconectado de IMAP")
-            except Exception as e:
-                self.logger.error(f"Error al desconectar: {e}")
+        """Desconecta el buzón"""
+        self.backend.disconnect()
 
     def check_new_emails(self) -> List[Dict[str, Any]]:
         """
-        Verifica si hay correos nuevos no procesados
+        Obtiene los correos llegados desde el último ciclo (bloqueante)
 
         Returns:
             Lista de diccionarios con información de correos nuevos
         """
-        if not self.client:
-            if not self.connect():
-                return []
+        return self.backend.check_new_emails()
 
-        try:
-            # Buscar correos no leídos
-            messages = self.client.search_unseen()
+    def is_candidate(self, subject: str, from_address: str) -> bool:
+        """
+        Filtro por asunto y remitente antes de descargar el contenido
+
+        Cada monitor lo redefine con los mismos criterios que aplica al
+        procesar; por defecto se descargan todos los correos.
+        """
+        return True
 
-            self.logger.info(f"Encontrados {len(messages)} correos no leídos")
+    async def fetch_new_emails(self) -> List[Dict[str, Any]]:
+        """
+        check_new_emails() en monitor_io_pool, sin bloquear el event loop
 
-            emails_data = []
-            for uid in messages:
-                if uid not in self.processed_uids:
-                    email_data = self._fetch_email(uid)
-                    if email_data:
-                        emails_data.append(email_data)
-                        self.processed_uids.add(uid)
+        Toma el lock del buzón para no competir con la cola diferida por la conexión.
+        """
+        async with self.backend.lock:
+            return await monitor_io_pool.run(self.check_new_emails)
 
-            return emails_data
+    def mark_as_read(self, uid: Any):
+        """Marca un correo como leído"""
+        self.backend.mark_as_read(uid)
 
+    def mark_many_as_read(self, uids: List[Any]):
+        """Marca varios correos como leídos (con Graph API, en lotes de $batch)"""
+        try:
+            self.backend.mark_many_as_read(uids)
         except Exception as e:
-            self.logger.error(f"Error verificando correos: {e}")
-            return []
+            self.logger.error(f"Error marcando {len(uids)} correos como leídos: {e}")
+
+    async def wait_for_mail(self, interval: int):
+        """Espera correo nuevo (IDLE en IMAP) o hasta el próximo ciclo"""
+        await self.backend.wait_for_mail(interval)
 
-    def _fetch_email(self, uid: int) -> Optional[Dict[str, Any]]:
+    def defer(self, uid: Any, reason: str) -> bool:
         """
-        Obtiene los datos completos de un correo
+        Envía un correo a la cola diferida
 
         Args:
-            uid: UID del mensaje
+            uid: UID IMAP o id de Graph del mensaje
+            reason: "mensaje" (excede IMAP_MAX_MESSAGE_BYTES), "tamano" o "paginas"
 
         Returns:
-            Diccionario con datos del correo y adjuntos
+            False si la cola está llena: el correo no queda registrado y quien
+            lo difiere debe dejarlo pendiente en el buzón (backend.requeue()
+            si check_new_emails() ya lo entregó)
         """
-        try:
-            # Usar el wrapper simple
-            email_data = self.client.fetch_message(uid)
-
-            if not email_data:
-                return None
-
-            subject = email_data['subject']
-            from_address = email_data['from']
-
-            self.logger.info(f"Procesando correo: {subject} de {from_address}")
-
-            # Filtrar solo adjuntos PDF
-            pdf_attachments = []
-            for att in email_data.get('attachments', []):
-                if att['filename'].lower().endswith('.pdf'):
-                    pdf_attachments.append(att)
-                    self.logger.info(f"  📎 Adjunto PDF: {att['filename']} ({att['size']} bytes)")
-
-            return {
-                'uid': uid,
-                'subject': subject,
-                'from': from_address,
-                'to': email_data.get('to', ''),
-                'date': email_data.get('date'),
-                'body_text': email_data.get('body_text', ''),
-                'body_html': email_data.get('body_html', ''),
-                'attachments': pdf_attachments
-            }
+        if any(queued_uid == uid for queued_uid, _ in self.deferred):
+            return True
 
-        except Exception as e:
-            self.logger.error(f"Error obteniendo correo UID {uid}: {e}")
-            return None
+        if len(self.deferred) >= settings.pdf_deferred_queue_size:
+            metrics_registry.increment("documentos_diferidos", "cola_llena")
+            self.logger.warning(f"Cola diferida llena, correo {uid} se reintentará más tarde")
+            return False
 
-    def mark_as_read(self, uid: int):
-        """Marca un correo como leído"""
-        try:
-            self.client.mark_as_read(uid)
-        except Exception as e:
-            self.logger.error(f"Error marcando correo {uid} como leído: {e}")
+        self.deferred.append((uid, reason))
+        metrics_registry.increment("documentos_diferidos", reason)
+        self.logger.info(f"⏳ Correo {uid} enviado a la cola diferida ({reason}), pendientes: {len(self.deferred)}")
+        return True
+
+    def _fetch_deferred(self, uid: Any) -> Optional[Dict[str, Any]]:
+        """Descarga los PDF de un correo de la cola diferida (bloqueante)"""
+        return self.backend.fetch_deferred(uid)
+
+    @abstractmethod
+    async def _process_deferred(self, db: Session, email_data: Dict[str, Any]):
+        """Procesa un correo de la cola diferida (implementado por cada monitor)"""
+
+    async def deferred_loop(self):
+        """
+        Procesa la cola diferida de a un correo, sin límites de tamaño
+
+        Los PDF del correo se descargan recién aquí (solo esos adjuntos o
+        secciones, sin el resto del mensaje) y se parsean en el pool
+        diferido (un proceso de baja prioridad), de modo que los documentos
+        grandes no bloquean el ciclo normal.
+        """
+        while True:
+            await asyncio.sleep(settings.pdf_deferred_interval)
+
+            if not self.deferred or not self.backend.connected:
+                continue
+
+            uid, reason = self.deferred.popleft()
+            try:
+                # Sacar al monitor de IDLE para usar la conexión
+                self.backend.interrupt_wait()
+                async with self.backend.lock:
+                    email_data = await monitor_io_pool.run(self._fetch_deferred, uid)
+                if not email_data:
+                    metrics_registry.increment("diferidos_procesados", "error")
+                    continue
+
+                db = next(get_db())
+                try:
+                    await self._process_deferred(db, email_data)
+                finally:
+                    db.close()
+                metrics_registry.increment("diferidos_procesados", "ok")
+                self.logger.info(f"✅ Correo diferido {uid} procesado ({reason})")
+
+            except Exception as e:
+                metrics_registry.increment("diferidos_procesados", "error")
+                self.logger.error(f"Error procesando correo diferido {uid}: {e}")
 
 
 class ReservaMonitor(EmailMonitor):
     """Monitor especializado para correos de confirmación de reservas"""
 
+    MONITOR_NAME = "reservas"
+
+    # Palabras clave del asunto que indican que es una reserva
+    KEYWORDS_RESERVA = [
+        'confirmación', 'confirmacion', 'confirmation',
+        'resumen', 'reserva', 'reservation', 'booking',
+        'hotel', 'hospedaje', 'alojamiento',
+        'servicio', 'service'
+    ]
+
     def __init__(self):
         super().__init__(
             host=settings.imap_host,
@@ -173,192 +207,257 @@ class ReservaMonitor(EmailMonitor):
             username=settings.imap_username,
             password=settings.imap_password,
             mailbox=settings.imap_mailbox,
-            use_ssl=settings.imap_use_ssl
+            use_ssl=settings.imap_use_ssl,
+            graph_mailbox=settings.graph_mailbox_email
         )
         self.logger = logger.bind(module="ReservaMonitor")
 
-    def process_new_reservations(self, db: Session) -> int:
+    def is_candidate(self, subject: str, from_address: str) -> bool:
+        """
+        Asunto con palabra clave de reserva y remitente autorizado
+
+        Es el mismo filtro antes de descargar (encabezados) y al procesar.
+        """
+        if not any(keyword in subject.lower() for keyword in self.KEYWORDS_RESERVA):
+            return False
+
+        # Validar que el remitente esté autorizado
+        # Extraer solo el email del campo From (ignorando el nombre)
+        _, from_email = parseaddr(from_address)
+        if not settings.is_sender_allowed(from_email):
+            self.logger.warning(
+                f"Remitente NO autorizado: {from_email} ({from_address}). "
+                f"Correo ignorado: {subject}"
+            )
+            return False
+        return True
+
+    async def process_new_reservations(
+        self,
+        db: Session,
+        emails: Optional[List[Dict[str, Any]]] = None,
+        deferred: bool = False
+    ) -> int:
         """
         Procesa correos nuevos buscando confirmaciones de reservas
 
+        Los adjuntos PDF de todos los correos válidos se parsean en lote
+        en el pool de procesos; los resultados vuelven en el mismo orden.
+        Los PDF que exceden PDF_MAX_BYTES / PDF_MAX_PAGE_COUNT no se parsean
+        y su correo pasa a la cola diferida. La descarga del buzón y el guardado
+        en la base de datos corren en monitor_io_pool, fuera del event loop.
+
+        Args:
+            db: Sesión de base de datos
+            emails: Correos a procesar; por defecto los no leídos del buzón
+            deferred: Procesar en el pool diferido y sin límites (cola diferida)
+
         Returns:
             Número de reservas procesadas
         """
-        emails = self.check_new_emails()
-        processed_count = 0
-
-        for email_data in emails:
-            # Filtrar correos relacionados con reservas (múltiples palabras clave)
-            subject = email_data['subject'].lower()
-
-            # Lista de palabras clave que indican que es una reserva
-            keywords_reserva = [
-                'confirmación', 'confirmacion', 'confirmation',
-                'resumen', 'reserva', 'reservation', 'booking',
-                'hotel', 'hospedaje', 'alojamiento',
-                'servicio', 'service'
-            ]
+        if emails is None:
+            emails = await self.fetch_new_emails()
 
-            # Verificar si el asunto contiene alguna palabra clave
-            is_reserva = any(keyword in subject for keyword in keywords_reserva)
+        # Adjuntos a procesar: (correo, adjunto), con modo y perfil de extracción de cada uno
+        candidatos = []
+        modos = []
+        perfiles = []
 
-            if not is_reserva:
+        for email_data in emails:
+            # Palabras clave de reserva en el asunto y remitente autorizado
+            if not self.is_candidate(email_data['subject'], email_data['from']):
                 self.logger.debug(f"Correo no parece ser de reserva: {email_data['subject']}")
                 continue
 
             self.logger.info(f"✅ Correo identificado como reserva: {email_data['subject']}")
-
-            # Validar que el remitente esté autorizado
-            # Extraer solo el email del campo From (ignorando el nombre)
-            from_name, from_email = parseaddr(email_data['from'])
-            if not settings.is_sender_allowed(from_email):
-                self.logger.warning(
-                    f"Remitente NO autorizado: {from_email} ({email_data['from']}). "
-                    f"Correo ignorado: {email_data['subject']}"
-                )
-                continue
+            _, from_email = parseaddr(email_data['from'])
 
             # Verificar que tenga adjuntos PDF
             if not email_data['attachments']:
                 self.logger.debug(f"Correo sin adjuntos PDF: {email_data['subject']}")
                 continue
 
-            # Procesar cada adjunto PDF
+            # Perfil de patrones según el sistema que envía el PDF
+            perfil, modo = extraction_profiles.resolve(from_email)
             for attachment in email_data['attachments']:
-                try:
-                    # Extraer datos del PDF
-                    pdf_data = pdf_processor.extract_from_bytes(
-                        attachment['content'],
-                        attachment['filename']
-                    )
+                candidatos.append((email_data, attachment))
+                modos.append(modo)
+                perfiles.append(perfil.name)
+
+        # Extraer datos de todos los PDF en paralelo
+        pool = deferred_extraction_pool if deferred else pdf_extraction_pool
+        resultados = await pool.extract_many(
+            [attachment for _, attachment in candidatos],
+            modos,
+            perfiles,
+            enforce_limits=not deferred
+        )
 
-                    if not pdf_data:
-                        self.logger.warning(f"No se pudieron extraer datos de {attachment['filename']}")
-                        continue
+        return await monitor_io_pool.run(self._save_reservations, db, candidatos, resultados)
 
-                    # Validar datos
-                    is_valid, errors = pdf_processor.validate_data(pdf_data)
-                    if not is_valid:
-                        self.logger.error(f"Datos inválidos en {attachment['filename']}: {errors}")
-                        continue
+    def _save_reservations(
+        self,
+        db: Session,
+        candidatos: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+        resultados: List[Any]
+    ) -> int:
+        """
+        Crea las reservas extraídas y marca sus correos como leídos (bloqueante)
 
-                    # Verificar si la agencia requiere seguimiento de OC
-                    agencia = pdf_data.get('agencia', '')
-
-                    # Consultar configuración del cliente en la BD
-                    config_cliente = db.query(ConfiguracionCliente).filter_by(
-                        nombre_agencia=agencia,
-                        activo=True
-                    ).first()
-
-                    if config_cliente:
-                        requiere_oc = config_cliente.requiere_oc
-                        self.logger.info(
-                            f"🔍 Cliente {agencia}: requiere_oc={requiere_oc} "
-                            f"(según configuración en BD)"
-                        )
-                    else:
-                        # Cliente no existe en BD: NO requiere OC por defecto
-                        requiere_oc = False
-                        self.logger.warning(
-                            f"⚠️ Cliente {agencia} no encontrado en configuracion_clientes. "
-                            f"Se asume requiere_oc=False"
-                        )
-
-                    # Verificar si ya existe la reserva
-                    id_reserva = pdf_data.get('id_reserva')
-                    existing = db.query(Reserva).filter_by(id_reserva=id_reserva).first()
-
-                    if existing:
-                        self.logger.warning(f"Reserva {id_reserva} ya existe en la base de datos")
-                        continue
+        Returns:
+            Número de reservas creadas
+        """
+        processed_count = 0
+        leidos = []
 
-                    # Crear nueva reserva
-                    reserva = Reserva(
-                        id_reserva=pdf_data.get('id_reserva'),
-                        loc_interno=pdf_data.get('loc_interno'),
-                        localizador=pdf_data.get('localizador'),
-                        agencia=agencia,
-                        nombre_hotel=pdf_data.get('nombre_hotel'),
-                        direccion_hotel=pdf_data.get('direccion_hotel'),
-                        telefono_hotel=pdf_data.get('telefono_hotel'),
-                        fecha_checkin=pdf_data.get('fecha_checkin'),
-                        fecha_checkout=pdf_data.get('fecha_checkout'),
-                        hora_llegada=pdf_data.get('hora_llegada'),
-                        hora_salida=pdf_data.get('hora_salida'),
-                        numero_noches=pdf_data.get('numero_noches'),
-                        numero_habitaciones=pdf_data.get('numero_habitaciones'),
-                        monto_total=pdf_data.get('monto_total'),
-                        moneda=pdf_data.get('moneda', 'CLP'),
-                        detalles_habitaciones=pdf_data.get('detalles_habitaciones'),
-                        fecha_limite_cancelacion=pdf_data.get('fecha_limite_cancelacion'),
-                        observaciones_hotel=pdf_data.get('observaciones_hotel'),
-                        notas_asesor=pdf_data.get('notas_asesor'),
-                        fecha_emision=pdf_data.get('fecha_emision'),
-                        estado_oc=EstadoOC.PENDIENTE if requiere_oc else EstadoOC.NO_REQUIERE_OC,
-                        requiere_oc=requiere_oc,
-                        email_origen_id=str(email_data['uid']),
-                        email_origen_fecha=parsedate_to_datetime(email_data['date']) if email_data.get('date') else datetime.now(),
-                        pdf_filename=attachment['filename']
+        # Procesar cada adjunto PDF
+        for (email_data, attachment), pdf_data in zip(candidatos, resultados):
+            try:
+                if isinstance(pdf_data, DeferredExtraction):
+                    self.logger.warning(f"{attachment['filename']} excede el límite de {pdf_data.reason}")
+                    if not self.defer(email_data['uid'], pdf_data.reason):
+                        # La marca del buzón ya pasó este correo: se devuelve para el próximo ciclo
+                        self.backend.requeue(email_data['uid'])
+                    continue
+
+                if not pdf_data:
+                    self.logger.warning(f"No se pudieron extraer datos de {attachment['filename']}")
+                    continue
+
+                # Validar datos
+                is_valid, errors = pdf_processor.validate_data(pdf_data)
+                if not is_valid:
+                    self.logger.error(f"Datos inválidos en {attachment['filename']}: {errors}")
+                    continue
+
+                # Verificar si la agencia requiere seguimiento de OC
+                agencia = pdf_data.get('agencia', '')
+
+                # Consultar configuración del cliente en la BD
+                config_cliente = db.query(ConfiguracionCliente).filter_by(
+                    nombre_agencia=agencia,
+                    activo=True
+                ).first()
+
+                if config_cliente:
+                    requiere_oc = config_cliente.requiere_oc
+                    self.logger.info(
+                        f"🔍 Cliente {agencia}: requiere_oc={requiere_oc} "
+                        f"(según configuración en BD)"
+                    )
+                else:
+                    # Cliente no existe en BD: NO requiere OC por defecto
+                    requiere_oc = False
+                    self.logger.warning(
+                        f"⚠️ Cliente {agencia} no encontrado en configuracion_clientes. "
+                        f"Se asume requiere_oc=False"
                     )
 
-                    db.add(reserva)
-                    db.commit()
+                # Verificar si ya existe la reserva
+                id_reserva = pdf_data.get('id_reserva')
+                existing = db.query(Reserva).filter_by(id_reserva=id_reserva).first()
+
+                if existing:
+                    self.logger.warning(f"Reserva {id_reserva} ya existe en la base de datos")
+                    continue
+
+                # Crear nueva reserva
+                reserva = Reserva(
+                    id_reserva=pdf_data.get('id_reserva'),
+                    loc_interno=pdf_data.get('loc_interno'),
+                    localizador=pdf_data.get('localizador'),
+                    agencia=agencia,
+                    nombre_hotel=pdf_data.get('nombre_hotel'),
+                    direccion_hotel=pdf_data.get('direccion_hotel'),
+                    telefono_hotel=pdf_data.get('telefono_hotel'),
+                    fecha_checkin=pdf_data.get('fecha_checkin'),
+                    fecha_checkout=pdf_data.get('fecha_checkout'),
+                    hora_llegada=pdf_data.get('hora_llegada'),
+                    hora_salida=pdf_data.get('hora_salida'),
+                    numero_noches=pdf_data.get('numero_noches'),
+                    numero_habitaciones=pdf_data.get('numero_habitaciones'),
+                    monto_total=pdf_data.get('monto_total'),
+                    moneda=pdf_data.get('moneda', 'CLP'),
+                    version_parser=PARSER_VERSION,
+                    detalles_habitaciones=pdf_data.get('detalles_habitaciones'),
+                    habitaciones=HabitacionReserva.desde_detalles(pdf_data.get('detalles_habitaciones')),
+                    fecha_limite_cancelacion=pdf_data.get('fecha_limite_cancelacion'),
+                    observaciones_hotel=pdf_data.get('observaciones_hotel'),
+                    notas_asesor=pdf_data.get('notas_asesor'),
+                    fecha_emision=pdf_data.get('fecha_emision'),
+                    estado_oc=EstadoOC.PENDIENTE if requiere_oc else EstadoOC.NO_REQUIERE_OC,
+                    requiere_oc=requiere_oc,
+                    email_origen_id=str(email_data['uid']),
+                    email_origen_fecha=parsedate_to_datetime(email_data['date']) if email_data.get('date') else datetime.now(),
+                    pdf_filename=attachment['filename']
+                )
 
-                    self.logger.info(
-                        f"✅ Reserva creada: {id_reserva} - {agencia} - "
-                        f"Requiere OC: {'Sí' if requiere_oc else 'No'}"
-                    )
+                db.add(reserva)
+                db.commit()
+
+                self.logger.info(
+                    f"✅ Reserva creada: {id_reserva} - {agencia} - "
+                    f"Requiere OC: {'Sí' if requiere_oc else 'No'}"
+                )
 
-                    processed_count += 1
+                processed_count += 1
+                leidos.append(email_data['uid'])
 
-                    # Marcar correo como leído
-                    self.mark_as_read(email_data['uid'])
+            except Exception as e:
+                self.logger.error(f"Error procesando adjunto {attachment['filename']}: {e}")
+                db.rollback()
 
-                except Exception as e:
-                    self.logger.error(f"Error procesando adjunto {attachment['filename']}: {e}")
-                    db.rollback()
+        # Marcar los correos como leídos (con Graph API, en lotes de $batch)
+        if leidos:
+            self.mark_many_as_read(list(dict.fromkeys(leidos)))
 
         return processed_count
 
+    async def _process_deferred(self, db: Session, email_data: Dict[str, Any]):
+        await self.process_new_reservations(db, [email_data], deferred=True)
+
     async def monitor_loop(self):
         """Loop de monitoreo continuo"""
         self.logger.info("🔄 Iniciando monitoreo de reservas...")
 
         # Conectar inicialmente
-        if not self.connect():
+        if not await monitor_io_pool.run(self.connect):
             self.logger.error("❌ No se pudo conectar inicialmente, reintentando en 60s...")
             await asyncio.sleep(60)
 
         while True:
             try:
                 # Verificar conexión antes de procesar
-                if not self.client:
+                if not self.backend.connected:
                     self.logger.warning("⚠️ Cliente no conectado, reconectando...")
-                    if not self.connect():
+                    if not await monitor_io_pool.run(self.connect):
                         self.logger.error("❌ Reconexión fallida, esperando 60s...")
                         await asyncio.sleep(60)
                         continue
 
                 db = next(get_db())
-                count = self.process_new_reservations(db)
+                count = await self.process_new_reservations(db)
 
                 if count > 0:
                     self.logger.info(f"✅ Procesadas {count} reservas nuevas")
 
-                # Esperar antes del próximo check
-                await asyncio.sleep(settings.imap_check_interval)
+                # Esperar correo nuevo (IDLE) o el próximo check
+                await self.wait_for_mail(settings.imap_check_interval)
 
             except Exception as e:
                 self.logger.error(f"Error en loop de monitoreo: {e}")
-                # Desconectar para forzar reconexión en el siguiente ciclo
-                self.disconnect()
+                # La conexión del pool se recupera sola (reconexión con backoff)
                 await asyncio.sleep(60)  # Esperar 1 minuto en caso de error
 
 
 class OCMonitor(EmailMonitor):
     """Monitor especializado para correos con órdenes de compra"""
 
+    MONITOR_NAME = "oc"
+
+    # Palabras clave del asunto que indican una orden de compra
+    KEYWORDS_OC = ['orden de compra', 'oc', 'purchase order', 'orden compra']
+
     def __init__(self):
         super().__init__(
             host=settings.oc_inbox_host,
@@ -366,24 +465,69 @@ class OCMonitor(EmailMonitor):
             username=settings.oc_inbox_username,
             password=settings.oc_inbox_password,
             mailbox=settings.oc_inbox_mailbox,
-            use_ssl=settings.oc_inbox_use_ssl
+            use_ssl=settings.oc_inbox_use_ssl,
+            graph_mailbox=settings.graph_oc_mailbox_email or settings.graph_mailbox_email
         )
         self.logger = logger.bind(module="OCMonitor")
 
-    def process_oc_emails(self, db: Session) -> int:
+    def is_candidate(self, subject: str, from_address: str) -> bool:
+        """Asunto con palabra clave de orden de compra (antes de descargar y al procesar)"""
+        return any(keyword in subject.lower() for keyword in self.KEYWORDS_OC)
+
+    async def process_oc_emails(
+        self,
+        db: Session,
+        emails: Optional[List[Dict[str, Any]]] = None,
+        deferred: bool = False
+    ) -> int:
         """
         Procesa correos nuevos buscando órdenes de compra
 
+        El almacenamiento del PDF y la extracción de número y monto de OC
+        se ejecutan en el pool de procesos, sin bloquear el event loop; la
+        descarga del buzón y las consultas a la base de datos, en monitor_io_pool.
+        La extracción de OC lee solo las primeras páginas, por lo que aquí
+        únicamente aplica el límite de tamaño de mensaje (IMAP_MAX_MESSAGE_BYTES).
+
+        Args:
+            db: Sesión de base de datos
+            emails: Correos a procesar; por defecto los no leídos del buzón
+            deferred: Procesar en el pool diferido (cola diferida)
+
         Returns:
             Número de OC procesadas
         """
-        emails = self.check_new_emails()
-        processed_count = 0
+        if emails is None:
+            emails = await self.fetch_new_emails()
+
+        candidatos = await monitor_io_pool.run(self._select_oc_candidates, db, emails)
+
+        # Guardar y extraer datos de todos los PDF de OC en paralelo
+        pool = deferred_extraction_pool if deferred else pdf_extraction_pool
+        resultados = await pool.process_oc_many(
+            [attachment for _, _, attachment in candidatos]
+        )
+
+        return await monitor_io_pool.run(self._save_ocs, db, candidatos, resultados)
+
+    def _select_oc_candidates(
+        self,
+        db: Session,
+        emails: List[Dict[str, Any]]
+    ) -> List[Tuple[Dict[str, Any], Reserva, Dict[str, Any]]]:
+        """
+        Asocia cada correo de OC con su reserva pendiente (bloqueante)
+
+        Returns:
+            Lista de (correo, reserva, adjunto PDF) a procesar
+        """
+        # OC a procesar: (correo, reserva, adjunto)
+        candidatos = []
+        reservas_en_lote = set()
 
         for email_data in emails:
             # Filtrar solo correos de órdenes de compra
-            subject = email_data['subject'].lower()
-            if not any(keyword in subject for keyword in ['orden de compra', 'oc', 'purchase order', 'orden compra']):
+            if not self.is_candidate(email_data['subject'], email_data['from']):
                 self.logger.debug(f"Correo no es orden de compra: {email_data['subject']}")
                 continue
 
@@ -401,50 +545,104 @@ class OCMonitor(EmailMonitor):
                 continue
 
             # Verificar que no tenga ya una OC
-            if reserva.orden_compra:
+            if reserva.orden_compra or reserva.id in reservas_en_lote:
                 self.logger.warning(f"Reserva {reserva.id_reserva} ya tiene una OC registrada")
                 continue
 
-            # Procesar adjuntos
-            for attachment in email_data['attachments']:
-                try:
-                    # Crear registro de OC
-                    oc = OrdenCompra(
-                        reserva_id=reserva.id,
-                        email_remitente=email_data['from'],
-                        email_asunto=email_data['subject'],
-                        email_fecha=parsedate_to_datetime(email_data['date']) if email_data.get('date') else datetime.now(),
-                        email_id=str(email_data['uid']),
-                        archivo_nombre=attachment['filename'],
-                        archivo_tamano=attachment['size'],
-                        # TODO: Guardar archivo en disco o GCS
-                        archivo_ruta=f"./oc_files/{reserva.id_reserva}_{attachment['filename']}"
-                    )
+            # Solo procesar el primer PDF
+            reservas_en_lote.add(reserva.id)
+            candidatos.append((email_data, reserva, email_data['attachments'][0]))
 
-                    db.add(oc)
+        return candidatos
+
+    def _save_ocs(
+        self,
+        db: Session,
+        candidatos: List[Tuple[Dict[str, Any], Reserva, Dict[str, Any]]],
+        resultados: List[Optional[Dict[str, Any]]]
+    ) -> int:
+        """
+        Registra las OC extraídas y marca sus correos como leídos (bloqueante)
 
-                    # Actualizar estado de reserva
-                    reserva.estado_oc = EstadoOC.RECIBIDA
+        Returns:
+            Número de OC registradas
+        """
+        processed_count = 0
+        leidos = []
 
-                    db.commit()
+        for (email_data, reserva, attachment), oc_data in zip(candidatos, resultados):
+            try:
+                oc_data = oc_data or {}
+                monto_oc = oc_data.get('monto_oc')
 
+                # Reservas leídas antes de MONTO_PARSER_VERSION pueden tener el
+                # monto mal convertido: no se cruzan (monto_coincide queda NULL)
+                monto_reserva = reserva.monto_total
+                if not amount_is_reliable(reserva.version_parser):
                     self.logger.info(
-                        f"✅ OC recibida para reserva {reserva.id_reserva} - {reserva.agencia}"
+                        f"Reserva {reserva.id_reserva} leída con un parser anterior: "
+                        f"no se compara su monto con el de la OC"
+                    )
+                    monto_reserva = None
+
+                monto_coincide = oc_processor.amounts_match(
+                    monto_oc,
+                    monto_reserva,
+                    settings.oc_amount_tolerance_pct
+                )
+
+                observaciones = None
+                if monto_coincide is False:
+                    observaciones = (
+                        f"Monto de OC ({monto_oc:,.0f}) difiere del monto de la reserva "
+                        f"({reserva.monto_total:,.0f})"
                     )
+                    self.logger.warning(f"⚠️ Reserva {reserva.id_reserva}: {observaciones}")
+
+                # Crear registro de OC
+                oc = OrdenCompra(
+                    reserva_id=reserva.id,
+                    email_remitente=email_data['from'],
+                    email_asunto=email_data['subject'],
+                    email_fecha=parsedate_to_datetime(email_data['date']) if email_data.get('date') else datetime.now(),
+                    email_id=str(email_data['uid']),
+                    archivo_nombre=attachment['filename'],
+                    archivo_tamano=attachment['size'],
+                    archivo_ruta=oc_data.get('archivo_ruta'),
+                    numero_oc=oc_data.get('numero_oc'),
+                    monto_oc=monto_oc,
+                    monto_coincide=monto_coincide,
+                    observaciones=observaciones
+                )
+
+                db.add(oc)
+
+                # Actualizar estado de reserva
+                reserva.estado_oc = EstadoOC.RECIBIDA
 
-                    processed_count += 1
+                db.commit()
 
-                    # Marcar correo como leído
-                    self.mark_as_read(email_data['uid'])
+                self.logger.info(
+                    f"✅ OC recibida para reserva {reserva.id_reserva} - {reserva.agencia} "
+                    f"(N° OC: {oc.numero_oc or 'no detectado'})"
+                )
+
+                processed_count += 1
+                leidos.append(email_data['uid'])
 
-                    break  # Solo procesar el primer PDF
+            except Exception as e:
+                self.logger.error(f"Error procesando OC: {e}")
+                db.rollback()
 
-                except Exception as e:
-                    self.logger.error(f"Error procesando OC: {e}")
-                    db.rollback()
+        # Marcar los correos como leídos (con Graph API, en lotes de $batch)
+        if leidos:
+            self.mark_many_as_read(list(dict.fromkeys(leidos)))
 
         return processed_count
 
+    async def _process_deferred(self, db: Session, email_data: Dict[str, Any]):
+        await self.process_oc_emails(db, [email_data], deferred=True)
+
     def _find_reserva_from_email(self, email_data: Dict[str, Any], db: Session) -> Optional[Reserva]:
         """
         Intenta encontrar la reserva asociada al correo de OC
@@ -517,33 +715,32 @@ class OCMonitor(EmailMonitor):
         self.logger.info("🔄 Iniciando monitoreo de órdenes de compra...")
 
         # Conectar inicialmente
-        if not self.connect():
+        if not await monitor_io_pool.run(self.connect):
             self.logger.error("❌ No se pudo conectar inicialmente, reintentando en 60s...")
             await asyncio.sleep(60)
 
         while True:
             try:
                 # Verificar conexión antes de procesar
-                if not self.client:
+                if not self.backend.connected:
                     self.logger.warning("⚠️ Cliente no conectado, reconectando...")
-                    if not self.connect():
+                    if not await monitor_io_pool.run(self.connect):
                         self.logger.error("❌ Reconexión fallida, esperando 60s...")
                         await asyncio.sleep(60)
                         continue
 
                 db = next(get_db())
-                count = self.process_oc_emails(db)
+                count = await self.process_oc_emails(db)
 
                 if count > 0:
                     self.logger.info(f"✅ Procesadas {count} órdenes de compra")
 
-                # Esperar antes del próximo check
-                await asyncio.sleep(settings.oc_check_interval)
+                # Esperar correo nuevo (IDLE) o el próximo check
+                await self.wait_for_mail(settings.oc_check_interval)
 
             except Exception as e:
                 self.logger.error(f"Error en loop de monitoreo OC: {e}")
-                # Desconectar para forzar reconexión
-                self.disconnect()
+                # La conexión del pool se recupera sola (reconexión con backoff)
                 await asyncio.sleep(60)
 
 
@@ -556,6 +753,6 @@ if __name__ == "__main__":
     monitor = ReservaMonitor()
     if monitor.connect():
         db = next(get_db())
-        count = monitor.process_new_reservations(db)
+        count = asyncio.run(monitor.process_new_reservations(db))
         print(f"Procesadas {count} reservas")
         monitor.disconnect()
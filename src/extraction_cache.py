@@ -0,0 +1,138 @@
+"""
+Caché persistente de resultados de extracción de PDF
+Indexada por SHA-256 del contenido del adjunto, con expulsión LRU acotada
+por tamaño y etiqueta de versión del parser para invalidar resultados
+obtenidos con reglas de extracción anteriores
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+from loguru import logger
+
+
+def _encode(value: Any) -> Any:
+    """Serializa datetimes para almacenarlos como JSON"""
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Tipo no serializable: {type(value)}")
+
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    """Reconstruye datetimes serializados por _encode"""
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+class ExtractionCache:
+    """Caché SQLite de resultados de _parse_text, compartible entre procesos"""
+
+    def __init__(self, path: str, max_entries: int = 5000, parser_version: str = "1"):
+        """
+        Args:
+            path: Ruta del archivo SQLite de la caché
+            max_entries: Número máximo de resultados almacenados
+            parser_version: Versión de las reglas de extracción; las entradas
+                            de otras versiones se descartan
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.parser_version = parser_version
+        self.logger = logger.bind(module="ExtractionCache")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    @staticmethod
+    def key_for(pdf_bytes: bytes) -> str:
+        """Clave de caché: SHA-256 del contenido del PDF"""
+        return hashlib.sha256(pdf_bytes).hexdigest()
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Abre la conexión en el proceso actual
+
+        Las conexiones SQLite no deben compartirse tras un fork, por lo que
+        cada proceso del pool de extracción abre la suya.
+        """
+        if self._conn is None or self._pid != os.getpid():
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=5)
+            self._pid = os.getpid()
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS extracciones (
+                    clave TEXT PRIMARY KEY,
+                    version_parser TEXT NOT NULL,
+                    datos TEXT NOT NULL,
+                    ultimo_acceso REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_extracciones_acceso ON extracciones (ultimo_acceso)"
+            )
+            # Invalidar resultados de versiones anteriores del parser
+            self._conn.execute(
+                "DELETE FROM extracciones WHERE version_parser != ?",
+                (self.parser_version,)
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Retorna el resultado cacheado para la clave, o None"""
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT datos FROM extracciones WHERE clave = ? AND version_parser = ?",
+                (key, self.parser_version)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            conn.execute(
+                "UPDATE extracciones SET ultimo_acceso = ? WHERE clave = ?",
+                (time.time(), key)
+            )
+            conn.commit()
+            return json.loads(row[0], object_hook=_decode)
+
+        except Exception as e:
+            self.logger.warning(f"Error leyendo caché de extracción: {e}")
+            return None
+
+    def put(self, key: str, data: Dict[str, Any]):
+        """Almacena un resultado y expulsa los menos usados si se excede el límite"""
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO extracciones (clave, version_parser, datos, ultimo_acceso) "
+                "VALUES (?, ?, ?, ?)",
+                (key, self.parser_version, json.dumps(data, default=_encode, ensure_ascii=False), time.time())
+            )
+            conn.execute(
+                "DELETE FROM extracciones WHERE clave NOT IN ("
+                "SELECT clave FROM extracciones ORDER BY ultimo_acceso DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+            conn.commit()
+
+        except Exception as e:
+            self.logger.warning(f"Error escribiendo caché de extracción: {e}")
+
+    def clear(self):
+        """Elimina todas las entradas"""
+        conn = self._connection()
+        conn.execute("DELETE FROM extracciones")
+        conn.commit()
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM extracciones").fetchone()[0]
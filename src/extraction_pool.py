@@ -0,0 +1,187 @@
+"""
+Pool de procesos para extracción de datos desde PDFs
+Paraleliza el parseo de adjuntos (trabajo CPU-bound de pdfplumber) en varios
+núcleos, fuera del event loop que también atiende a FastAPI
+"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Dict, Any, Tuple
+
+from loguru import logger
+
+from config import settings
+from src.pdf_processor import pdf_processor
+from src.oc_processor import oc_processor
+from src.metrics import metrics_registry
+
+
+class DeferredExtraction:
+    """Resultado de un adjunto que excede los límites y no se parseó"""
+
+    def __init__(self, reason: str):
+        self.reason = reason
+
+    def __repr__(self):
+        return f"<DeferredExtraction {self.reason}>"
+
+
+def _init_worker(niceness: int):
+    """
+    Inicializador de los procesos hijos
+
+    Con fork el hijo hereda el registro de métricas del padre; se vacía para
+    que drain() no devuelva al padre sus propios contadores duplicados.
+    También reduce la prioridad de CPU si se pidió.
+    """
+    metrics_registry.reset()
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
+
+
+def _extract_worker(
+    pdf_bytes: bytes,
+    filename: str,
+    mode: str,
+    profile: Optional[str],
+    enforce_limits: bool = False
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Punto de entrada en el proceso hijo: usa la instancia global del procesador
+
+    Con enforce_limits, un documento que excede tamaño o páginas no se
+    parsea y retorna DeferredExtraction con el motivo.
+
+    Returns:
+        (datos extraídos, métricas acumuladas en el proceso hijo durante la extracción)
+    """
+    if enforce_limits:
+        reason = pdf_processor.check_limits(pdf_bytes)
+        if reason:
+            return DeferredExtraction(reason), metrics_registry.drain()
+
+    result = pdf_processor.extract_from_bytes(pdf_bytes, filename, mode, profile)
+    return result, metrics_registry.drain()
+
+
+def _oc_worker(pdf_bytes: bytes, filename: str) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+    """Punto de entrada en el proceso hijo para documentos de OC (ver _extract_worker)"""
+    result = oc_processor.process(pdf_bytes, filename)
+    return result, metrics_registry.drain()
+
+
+class PDFExtractionPool:
+    """Servicio de extracción de PDF respaldado por un ProcessPoolExecutor"""
+
+    def __init__(self, max_workers: Optional[int] = None, niceness: int = 0):
+        """
+        Args:
+            max_workers: Número de procesos; por defecto uno por núcleo
+            niceness: Incremento de nice de los procesos (0 = prioridad normal)
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.niceness = niceness
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.logger = logger.bind(module="PDFExtractionPool")
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Crea el pool de procesos la primera vez que se necesita"""
+        if self._executor is None:
+            self.logger.info(f"Iniciando pool de extracción PDF con {self.max_workers} procesos")
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(self.niceness,)
+            )
+        return self._executor
+
+    async def extract_many(
+        self,
+        attachments: List[Dict[str, Any]],
+        modes: Optional[List[str]] = None,
+        profiles: Optional[List[Optional[str]]] = None,
+        enforce_limits: bool = False
+    ) -> List[Any]:
+        """
+        Extrae datos de varios adjuntos PDF en paralelo
+
+        Args:
+            attachments: Adjuntos con claves 'content' y 'filename'
+                         (formato de EmailMonitor._fetch_email)
+            modes: Modo de extracción por adjunto ("text" por defecto)
+            profiles: Nombre del perfil de extracción por adjunto (genérico por defecto)
+            enforce_limits: Verificar PDF_MAX_BYTES / PDF_MAX_PAGE_COUNT antes de parsear
+
+        Returns:
+            Lista de resultados en el mismo orden que los adjuntos;
+            None para los que no se pudieron procesar y DeferredExtraction
+            para los que exceden los límites
+        """
+        if not attachments:
+            return []
+
+        if modes is None:
+            modes = ["text"] * len(attachments)
+        if profiles is None:
+            profiles = [None] * len(attachments)
+
+        return await self._run_many(
+            attachments,
+            [
+                (_extract_worker, att['content'], att['filename'], mode, profile, enforce_limits)
+                for att, mode, profile in zip(attachments, modes, profiles)
+            ]
+        )
+
+    async def process_oc_many(self, attachments: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Almacena y extrae número/monto de varios PDF de OC en paralelo
+
+        Returns:
+            Resultados de OCProcessor.process en el mismo orden que los adjuntos
+        """
+        if not attachments:
+            return []
+
+        return await self._run_many(
+            attachments,
+            [(_oc_worker, att['content'], att['filename']) for att in attachments]
+        )
+
+    async def _run_many(self, attachments: List[Dict[str, Any]], calls: List[Tuple]) -> List[Optional[Dict[str, Any]]]:
+        """Ejecuta (worker, *args) en el pool y recoge resultados y métricas"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+
+        futures = [loop.run_in_executor(executor, *call) for call in calls]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+
+        extracted = []
+        for att, result in zip(attachments, results):
+            if isinstance(result, BaseException):
+                self.logger.error(f"Error en proceso de extracción para {att['filename']}: {result}")
+                if isinstance(result, BrokenProcessPool):
+                    # Un proceso hijo murió: descartar el pool para recrearlo en el próximo lote
+                    self.shutdown()
+                extracted.append(None)
+            else:
+                data, worker_metrics = result
+                # Las métricas del proceso hijo se incorporan al registro principal
+                metrics_registry.merge(worker_metrics)
+                extracted.append(data)
+
+        return extracted
+
+    def shutdown(self):
+        """Detiene los procesos del pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self.logger.info("Pool de extracción PDF detenido")
+
+
+# Instancias globales: la cola diferida usa un único proceso de baja
+# prioridad para que los documentos grandes no ocupen el pool principal
+pdf_extraction_pool = PDFExtractionPool(max_workers=settings.pdf_extraction_workers)
+deferred_extraction_pool = PDFExtractionPool(max_workers=1, niceness=10)
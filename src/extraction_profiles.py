@@ -0,0 +1,110 @@
+"""
+Registro de perfiles de extracción de PDF por remitente
+Cada perfil agrupa los patrones compilados que corresponden al sistema que
+genera el PDF (ej: hotelsales.cl), de modo que el parseo aplica solo esos
+patrones en lugar de la cascada genérica completa. Los perfiles se
+registran en src/pdf_processor.py, junto a los patrones base.
+"""
+from typing import Dict, List, Optional, Iterable, Any, Pattern, Tuple
+
+from config import settings
+
+
+class ExtractionProfile:
+    """Patrones compilados y modo de extracción para un proveedor de PDFs"""
+
+    def __init__(
+        self,
+        name: str,
+        patterns: Dict[str, Any],
+        domains: Iterable[str] = (),
+        mode: str = "text"
+    ):
+        """
+        Args:
+            name: Identificador del perfil (se usa en la clave de caché)
+            patterns: Campo -> patrón compilado; 'monto_total' es una lista
+                      ordenada por prioridad y 'monto_fallback' puede ser None
+            domains: Dominios o direcciones de remitente que usan este perfil
+            mode: Modo de extracción por defecto ("text" o "layout")
+        """
+        self.name = name
+        self.patterns = patterns
+        self.domains = tuple(d.strip().lower().lstrip("@") for d in domains)
+        self.mode = mode
+
+    def derive(
+        self,
+        name: str,
+        domains: Iterable[str] = (),
+        mode: Optional[str] = None,
+        **overrides: Any
+    ) -> "ExtractionProfile":
+        """Crea un perfil nuevo que reemplaza solo algunos patrones de este"""
+        patterns = dict(self.patterns)
+        patterns.update(overrides)
+        return ExtractionProfile(name, patterns, domains, mode or self.mode)
+
+    @property
+    def required_patterns(self) -> Dict[str, List[Pattern]]:
+        """Patrones que producen los campos obligatorios (ver PDFProcessor._collect_text)"""
+        monto = list(self.patterns['monto_total'])
+        if self.patterns.get('monto_fallback') is not None:
+            monto.append(self.patterns['monto_fallback'])
+
+        return {
+            'id_reserva': [self.patterns['id_reserva']],
+            'loc_interno': [self.patterns['loc_interno']],
+            'agencia': [self.patterns['agencia']],
+            'monto_total': monto,
+        }
+
+    def __repr__(self):
+        return f"<ExtractionProfile {self.name} - {', '.join(self.domains) or 'genérico'}>"
+
+
+class ExtractionProfileRegistry:
+    """Perfiles indexados por nombre y por dominio/dirección de remitente"""
+
+    def __init__(self):
+        self._profiles: Dict[str, ExtractionProfile] = {}
+        self._by_sender: Dict[str, ExtractionProfile] = {}
+        self.default: Optional[ExtractionProfile] = None
+
+    def register(self, profile: ExtractionProfile, default: bool = False):
+        """Registra un perfil; default=True lo usa para remitentes desconocidos"""
+        self._profiles[profile.name] = profile
+        for domain in profile.domains:
+            self._by_sender[domain] = profile
+        if default or self.default is None:
+            self.default = profile
+
+    def get(self, name: Optional[str]) -> ExtractionProfile:
+        """Retorna el perfil por nombre, o el perfil por defecto"""
+        if name is None:
+            return self.default
+        return self._profiles.get(name, self.default)
+
+    def for_sender(self, sender_email: str) -> ExtractionProfile:
+        """Retorna el perfil del remitente: dirección exacta, luego dominio"""
+        sender = sender_email.strip().lower()
+        domain = sender.rsplit("@", 1)[-1]
+        return self._by_sender.get(sender) or self._by_sender.get(domain) or self.default
+
+    def resolve(self, sender_email: str) -> Tuple[ExtractionProfile, str]:
+        """
+        Perfil y modo de extracción para un remitente
+
+        PDF_LAYOUT_SENDERS fuerza el modo layout aunque el perfil use texto.
+        """
+        profile = self.for_sender(sender_email)
+        if settings.extraction_mode_for(sender_email) == "layout":
+            return profile, "layout"
+        return profile, profile.mode
+
+    def names(self) -> List[str]:
+        return list(self._profiles)
+
+
+# Instancia global
+extraction_profiles = ExtractionProfileRegistry()
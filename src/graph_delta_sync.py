@@ -0,0 +1,211 @@
+"""
+Sincronización incremental de Graph API con messages/delta
+Cada ronda pide solo los cambios desde el deltaLink anterior, recorre todas
+sus páginas (@odata.nextLink) y entrega únicamente los mensajes nuevos. El
+deltaLink se guarda en sincronizacion_graph al completar la ronda, de modo
+que cada consulta es proporcional a lo que cambió y no al tamaño del buzón.
+"""
+import json
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterator, Optional, Callable
+
+from loguru import logger
+
+from database import get_db, SincronizacionGraph
+from src.graph_email_client import GraphEmailClient, GraphAPIError
+from src.metrics import metrics_registry
+
+
+def _received(message: Dict[str, Any]) -> Optional[datetime]:
+    """receivedDateTime del mensaje como datetime UTC sin zona"""
+    value = message.get('receivedDateTime')
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+class GraphDeltaSync:
+    """Mensajes nuevos de una carpeta de Graph API, ronda a ronda"""
+
+    # Delta también trae los mensajes modificados (ej: al marcarlos como
+    # leídos). Los recibidos dentro de esta ventana se deduplican por id; los
+    # anteriores a ella no son nuevos y se ignoran
+    VENTANA_DUPLICADOS = timedelta(days=1)
+
+    def __init__(
+        self,
+        client: GraphEmailClient,
+        folder: str = "inbox",
+        monitor: Optional[str] = None,
+        page_size: int = 50,
+        pending: Optional[Callable[[], Dict[str, Any]]] = None
+    ):
+        """
+        Args:
+            client: Cliente de Graph conectado
+            folder: Carpeta a sincronizar
+            monitor: Nombre del monitor dueño del estado ("reservas", "oc")
+            page_size: Mensajes por página de delta
+            pending: Estado (serializable en JSON) de los mensajes que el
+                     consumidor aún no termina; se guarda junto con cada deltaLink
+        """
+        self.client = client
+        self.folder = folder
+        self.monitor = monitor
+        self.page_size = page_size
+
+        self.delta_link: Optional[str] = None
+        self.ultima_recepcion: Optional[datetime] = None
+        # id -> receivedDateTime (ISO) de los mensajes ya vistos en la ventana
+        self.recientes: Dict[str, str] = {}
+        self.pending = pending
+        # Último estado pendiente guardado (al cargar: el de antes del reinicio)
+        self.pendientes: Dict[str, Any] = {}
+        self._loaded = False
+        self.logger = logger.bind(module="GraphDeltaSync")
+
+    def new_messages(self) -> Iterator[Dict[str, Any]]:
+        """
+        Mensajes nuevos desde la ronda anterior
+
+        Sin estado previo (primera ronda) se entregan los no leídos, igual
+        que el primer ciclo por IMAP. El estado se guarda solo cuando el
+        iterador se consume completo: si la ronda se interrumpe, la
+        siguiente vuelve a pedir los mismos cambios.
+
+        Yields:
+            Mensajes con los campos de MESSAGE_FIELDS (id, subject, from, ...)
+        """
+        if not self._loaded:
+            self._load_state()
+
+        try:
+            yield from self._round(self.delta_link)
+        except GraphAPIError as e:
+            # 410 Gone: el deltaLink expiró (syncStateNotFound)
+            if e.status_code != 410 or self.delta_link is None:
+                raise
+            self.logger.warning("⚠️ deltaLink expirado, se reinicia la sincronización completa de la carpeta")
+            metrics_registry.increment("graph_delta", "resincronizacion")
+            yield from self._round(None)
+
+    def saved_pending(self) -> Dict[str, Any]:
+        """Mensajes pendientes guardados por el consumidor antes de un reinicio"""
+        if not self._loaded:
+            self._load_state()
+        return self.pendientes
+
+    def save_pending(self):
+        """
+        Guarda el estado pendiente del consumidor sin esperar la próxima ronda
+
+        Sin deltaLink guardado no hace nada: la próxima ronda vuelve a
+        entregar los mismos mensajes.
+        """
+        if self.pending is None or self.delta_link is None:
+            return
+        pendientes = self.pending()
+        if pendientes == self.pendientes:
+            return
+
+        db = next(get_db())
+        try:
+            estado = db.query(SincronizacionGraph).filter_by(
+                buzon=self.client.mailbox_email, carpeta=self.folder, monitor=self.monitor
+            ).first()
+            if estado:
+                estado.mensajes_pendientes = json.dumps(pendientes)
+                db.commit()
+                self.pendientes = pendientes
+        finally:
+            db.close()
+
+    def _round(self, delta_link: Optional[str]) -> Iterator[Dict[str, Any]]:
+        """Una ronda de delta; guarda el nuevo deltaLink al terminar"""
+        sin_estado = self.ultima_recepcion is None
+        corte = None if sin_estado else self.ultima_recepcion - self.VENTANA_DUPLICADOS
+        vistos = dict(self.recientes)
+        ultima_recepcion = self.ultima_recepcion
+        nuevo_delta_link = None
+        cambios = nuevos = 0
+
+        for page, page_delta_link in self.client.iter_message_delta(self.folder, delta_link, self.page_size):
+            for message in page:
+                cambios += 1
+                recibido = _received(message)
+                if '@removed' in message or recibido is None:
+                    continue
+                if corte and recibido < corte:
+                    continue
+                if message['id'] in vistos:
+                    continue
+
+                vistos[message['id']] = recibido.isoformat()
+                if ultima_recepcion is None or recibido > ultima_recepcion:
+                    ultima_recepcion = recibido
+                if sin_estado and message.get('isRead'):
+                    continue
+
+                nuevos += 1
+                yield message
+
+            if page_delta_link:
+                nuevo_delta_link = page_delta_link
+
+        metrics_registry.increment("graph_delta", "cambios", cambios)
+        metrics_registry.increment("graph_delta", "nuevos", nuevos)
+        self.logger.info(f"🔄 Delta de {self.folder}: {cambios} cambios, {nuevos} mensajes nuevos")
+
+        if nuevo_delta_link:
+            self._save_state(nuevo_delta_link, ultima_recepcion, vistos)
+
+    def _load_state(self):
+        """Carga deltaLink y mensajes recientes desde la base de datos"""
+        db = next(get_db())
+        try:
+            estado = db.query(SincronizacionGraph).filter_by(
+                buzon=self.client.mailbox_email, carpeta=self.folder, monitor=self.monitor
+            ).first()
+            if estado:
+                self.delta_link = estado.delta_link
+                self.ultima_recepcion = estado.ultima_recepcion
+                self.recientes = json.loads(estado.mensajes_recientes or '{}')
+                self.pendientes = json.loads(estado.mensajes_pendientes or '{}')
+                self.logger.info(f"Sincronización delta retomada ({len(self.recientes)} mensajes recientes)")
+            self._loaded = True
+        finally:
+            db.close()
+
+    def _save_state(self, delta_link: str, ultima_recepcion: Optional[datetime], vistos: Dict[str, str]):
+        """Guarda el deltaLink, los mensajes vistos dentro de la ventana y los pendientes del consumidor"""
+        if ultima_recepcion:
+            corte = (ultima_recepcion - self.VENTANA_DUPLICADOS).isoformat()
+            vistos = {message_id: recibido for message_id, recibido in vistos.items() if recibido >= corte}
+
+        self.delta_link = delta_link
+        self.ultima_recepcion = ultima_recepcion
+        self.recientes = vistos
+
+        db = next(get_db())
+        try:
+            estado = db.query(SincronizacionGraph).filter_by(
+                buzon=self.client.mailbox_email, carpeta=self.folder, monitor=self.monitor
+            ).first()
+            if estado is None:
+                estado = SincronizacionGraph(
+                    buzon=self.client.mailbox_email, carpeta=self.folder, monitor=self.monitor
+                )
+                db.add(estado)
+
+            estado.delta_link = delta_link
+            estado.ultima_recepcion = ultima_recepcion
+            estado.mensajes_recientes = json.dumps(vistos)
+            if self.pending is not None:
+                self.pendientes = self.pending()
+                estado.mensajes_pendientes = json.dumps(self.pendientes)
+            db.commit()
+        finally:
+            db.close()
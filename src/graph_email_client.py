@@ -3,16 +3,102 @@ Cliente de Microsoft Graph API para acceso a correos de Office 365
 Reemplaza IMAP para lectura de correos con autenticación moderna OAuth 2.0
 """
 import base64
-from datetime import datetime
-from typing import List, Optional, Dict, Any
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 from email import message_from_bytes
 from email.header import decode_header
+from email.utils import parsedate_to_datetime
 
-from msal import ConfidentialClientApplication
-from msgraph_core import GraphClient
+import requests
 from azure.identity import ClientSecretCredential
 from loguru import logger
 
+GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
+GRAPH_SCOPE = "https://graph.microsoft.com/.default"
+
+# Campos de mensaje que se piden en listados y en delta
+MESSAGE_FIELDS = "id,subject,from,receivedDateTime,hasAttachments,internetMessageId,isRead"
+
+# Metadatos de adjuntos sin contentBytes: el contenido se baja aparte con $value
+ATTACHMENT_FIELDS = "id,name,contentType,size"
+
+# Límite de sub-solicitudes por llamada a $batch (JSON batching)
+BATCH_MAX_REQUESTS = 20
+
+
+def _retry_after_seconds(value: Any, default: float = 1.0) -> float:
+    """
+    Segundos de espera según Retry-After
+
+    Acepta segundos ("5") o una fecha HTTP ("Wed, 21 Oct 2026 07:28:00 GMT");
+    si el valor falta o no se puede interpretar, espera `default`.
+    """
+    if value is None:
+        return default
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        fecha = parsedate_to_datetime(str(value))
+    except (TypeError, ValueError):
+        return default
+    if fecha is None:
+        return default
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=timezone.utc)
+    return max(0.0, (fecha - datetime.now(timezone.utc)).total_seconds())
+
+
+class GraphAPIError(Exception):
+    """Respuesta de error de Graph API"""
+
+    def __init__(self, status_code: int, message: str = ""):
+        super().__init__(f"Graph API respondió {status_code}: {message}")
+        self.status_code = status_code
+
+
+class GraphSession:
+    """
+    Sesión HTTP autenticada contra Graph API
+
+    Reemplaza a msgraph_core.GraphClient (removido en msgraph-core 1.x):
+    misma interfaz get/post/patch sobre rutas relativas ("/users/...") o
+    URLs absolutas como @odata.nextLink y @odata.deltaLink.
+    """
+
+    def __init__(self, credential: Any, base_url: str = GRAPH_BASE_URL, timeout: int = 30):
+        self.credential = credential
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    def _url(self, endpoint: str) -> str:
+        if endpoint.startswith(("http://", "https://")):
+            return endpoint
+        return f"{self.base_url}{endpoint}"
+
+    def request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
+        # azure-identity guarda el token en caché y lo renueva al expirar
+        token = self.credential.get_token(GRAPH_SCOPE).token
+        headers = {"Authorization": f"Bearer {token}", **kwargs.pop("headers", {})}
+        return self._session.request(
+            method, self._url(endpoint), headers=headers, timeout=self.timeout, **kwargs
+        )
+
+    def get(self, endpoint: str, **kwargs) -> requests.Response:
+        return self.request("GET", endpoint, **kwargs)
+
+    def post(self, endpoint: str, **kwargs) -> requests.Response:
+        return self.request("POST", endpoint, **kwargs)
+
+    def patch(self, endpoint: str, **kwargs) -> requests.Response:
+        return self.request("PATCH", endpoint, **kwargs)
+
+    def close(self):
+        self._session.close()
+
 
 class GraphEmailClient:
     """
@@ -30,7 +116,9 @@ class GraphEmailClient:
         client_id: str,
         client_secret: str,
         tenant_id: str,
-        mailbox_email: str
+        mailbox_email: str,
+        base_url: str = GRAPH_BASE_URL,
+        credential: Optional[Any] = None
     ):
         """
         Inicializa el cliente de Graph API
@@ -40,15 +128,18 @@ class GraphEmailClient:
             client_secret: Client secret value de Azure AD
             tenant_id: Directory (tenant) ID de Azure AD
             mailbox_email: Email del mailbox a acceder (ej: recordatorio.oc@hotelsales.cl)
+            base_url: URL base de Graph API (v1.0)
+            credential: Credencial con get_token(); por defecto ClientSecretCredential
         """
         self.client_id = client_id
         self.client_secret = client_secret
         self.tenant_id = tenant_id
         self.mailbox_email = mailbox_email
+        self.base_url = base_url
 
         self.logger = logger.bind(module="GraphEmailClient")
-        self._graph_client: Optional[GraphClient] = None
-        self._credential: Optional[ClientSecretCredential] = None
+        self._graph_client: Optional[GraphSession] = None
+        self._credential = credential
 
     def connect(self):
         """Establece conexión con Microsoft Graph API usando OAuth 2.0"""
@@ -56,14 +147,15 @@ class GraphEmailClient:
             self.logger.info(f"Conectando a Microsoft Graph API para {self.mailbox_email}...")
 
             # Crear credencial OAuth
-            self._credential = ClientSecretCredential(
-                tenant_id=self.tenant_id,
-                client_id=self.client_id,
-                client_secret=self.client_secret
-            )
+            if self._credential is None:
+                self._credential = ClientSecretCredential(
+                    tenant_id=self.tenant_id,
+                    client_id=self.client_id,
+                    client_secret=self.client_secret
+                )
 
             # Crear cliente de Graph
-            self._graph_client = GraphClient(credential=self._credential)
+            self._graph_client = GraphSession(self._credential, base_url=self.base_url)
 
             # Verificar acceso obteniendo el mailbox
             self._test_connection()
@@ -114,7 +206,7 @@ class GraphEmailClient:
                 "$filter": "isRead eq false",
                 "$top": top,
                 "$orderby": "receivedDateTime desc",
-                "$select": "id,subject,from,receivedDateTime,hasAttachments,internetMessageId"
+                "$select": MESSAGE_FIELDS
             }
 
             response = self._graph_client.get(endpoint, params=params)
@@ -123,6 +215,11 @@ class GraphEmailClient:
                 data = response.json()
                 messages = data.get('value', [])
                 self.logger.info(f"Encontrados {len(messages)} mensajes no leídos")
+                if data.get('@odata.nextLink'):
+                    self.logger.warning(
+                        f"Hay más de {top} mensajes no leídos; para leerlos todos usar "
+                        f"GraphDeltaSync (src/graph_delta_sync.py)"
+                    )
                 return messages
             else:
                 self.logger.error(f"Error obteniendo mensajes: {response.status_code}")
@@ -132,6 +229,51 @@ class GraphEmailClient:
             self.logger.error(f"Error obteniendo mensajes no leídos: {e}")
             return []
 
+    def iter_message_delta(
+        self,
+        folder: str = "inbox",
+        delta_link: Optional[str] = None,
+        page_size: int = 50
+    ) -> Iterator[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        """
+        Recorre los cambios de una carpeta con messages/delta
+
+        Sin delta_link parte una sincronización inicial (todos los mensajes
+        de la carpeta); con él, solo lo creado, modificado o eliminado desde
+        la ronda que lo generó. Sigue @odata.nextLink hasta la última página,
+        que trae el @odata.deltaLink de la próxima ronda.
+
+        Args:
+            folder: Carpeta a sincronizar
+            delta_link: @odata.deltaLink de la ronda anterior
+            page_size: Mensajes por página (Prefer: odata.maxpagesize)
+
+        Yields:
+            (mensajes de la página, deltaLink o None si quedan páginas);
+            los eliminados o movidos fuera de la carpeta traen "@removed"
+
+        Raises:
+            GraphAPIError: Respuesta distinta de 200 (410 = deltaLink expirado)
+        """
+        if delta_link:
+            url, params = delta_link, None
+        else:
+            url = f"/users/{self.mailbox_email}/mailFolders/{folder}/messages/delta"
+            params = {"$select": MESSAGE_FIELDS}
+        headers = {"Prefer": f"odata.maxpagesize={page_size}"}
+
+        while url:
+            response = self._graph_client.get(url, params=params, headers=headers)
+            if response.status_code != 200:
+                raise GraphAPIError(response.status_code, response.text[:200])
+
+            data = response.json()
+            next_link = data.get('@odata.nextLink')
+            yield data.get('value', []), None if next_link else data.get('@odata.deltaLink')
+
+            # nextLink ya incluye los parámetros de la consulta
+            url, params = next_link, None
+
     def get_message_content(self, message_id: str) -> Optional[bytes]:
         """
         Obtiene el contenido completo (MIME) del mensaje
@@ -249,11 +391,207 @@ class GraphEmailClient:
             self.logger.error(f"Error obteniendo detalles: {e}")
             return None
 
+    def batch(self, subrequests: List[Dict[str, Any]], max_retries: int = 3) -> List[Dict[str, Any]]:
+        """
+        Ejecuta varias solicitudes con JSON batching ($batch)
+
+        Agrupa hasta BATCH_MAX_REQUESTS sub-solicitudes por llamada y
+        devuelve las respuestas en el orden de entrada (Graph las responde
+        en cualquier orden). Las sub-solicitudes limitadas (429/503/504) se
+        reenvían en el siguiente lote tras esperar su Retry-After.
+
+        Args:
+            subrequests: {'method', 'url' (relativa a la versión, ej:
+                         "/users/x/messages/id"), 'body' y 'headers' opcionales}
+            max_retries: Reintentos de una sub-solicitud limitada
+
+        Returns:
+            {'status', 'headers', 'body'} por sub-solicitud; status 0 si la
+            llamada $batch completa falló
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(subrequests)
+        pending = list(range(len(subrequests)))
+        attempts = 0
+
+        while pending:
+            retry, wait = [], 0.0
+            for start in range(0, len(pending), BATCH_MAX_REQUESTS):
+                chunk = pending[start:start + BATCH_MAX_REQUESTS]
+                for index, response in zip(chunk, self._send_batch([subrequests[i] for i in chunk])):
+                    results[index] = response
+                    if response['status'] in (429, 503, 504) and attempts < max_retries:
+                        retry.append(index)
+                        wait = max(wait, _retry_after_seconds((response['headers'] or {}).get('Retry-After')))
+
+            pending = retry
+            attempts += 1
+            if pending:
+                self.logger.warning(f"⏳ Graph limitó {len(pending)} solicitudes del lote, reintento en {wait:.0f}s")
+                time.sleep(wait)
+
+        return results
+
+    def _send_batch(self, subrequests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Una llamada a $batch (máximo BATCH_MAX_REQUESTS); respuestas en orden"""
+        payload = []
+        for request_id, subrequest in enumerate(subrequests):
+            item = {'id': str(request_id), 'method': subrequest['method'], 'url': subrequest['url']}
+            headers = dict(subrequest.get('headers') or {})
+            if subrequest.get('body') is not None:
+                item['body'] = subrequest['body']
+                headers['Content-Type'] = 'application/json'
+            if headers:
+                item['headers'] = headers
+            payload.append(item)
+
+        try:
+            response = self._graph_client.post("/$batch", json={'requests': payload})
+            if response.status_code != 200:
+                self.logger.error(f"Error en llamada $batch: {response.status_code}")
+                return [{'status': response.status_code, 'headers': {}, 'body': None}] * len(subrequests)
+            by_id = {item.get('id'): item for item in response.json().get('responses', [])}
+        except Exception as e:
+            self.logger.error(f"Error en llamada $batch: {e}")
+            return [{'status': 0, 'headers': {}, 'body': None}] * len(subrequests)
+
+        results = []
+        for request_id in range(len(subrequests)):
+            item = by_id.get(str(request_id), {})
+            results.append({
+                'status': item.get('status', 0),
+                'headers': item.get('headers') or {},
+                'body': item.get('body'),
+            })
+        return results
+
+    def mark_many_as_read(self, message_ids: List[str]) -> Dict[str, bool]:
+        """
+        Marca varios mensajes como leídos en lotes de $batch
+
+        Returns:
+            message_id -> True si se marcó correctamente
+        """
+        responses = self.batch([
+            {'method': 'PATCH', 'url': f"/users/{self.mailbox_email}/messages/{message_id}", 'body': {'isRead': True}}
+            for message_id in message_ids
+        ])
+        marked = {message_id: r['status'] in (200, 204) for message_id, r in zip(message_ids, responses)}
+        failed = [message_id for message_id, ok in marked.items() if not ok]
+        if failed:
+            self.logger.error(f"No se pudieron marcar como leídos {len(failed)} de {len(message_ids)} mensajes")
+        return marked
+
+    def get_many_attachments(self, message_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Obtiene los adjuntos de varios mensajes en lotes de $batch
+
+        Returns:
+            message_id -> lista de adjuntos (vacía si la solicitud falló)
+        """
+        responses = self.batch([
+            {'method': 'GET', 'url': f"/users/{self.mailbox_email}/messages/{message_id}/attachments"}
+            for message_id in message_ids
+        ])
+        attachments = {}
+        for message_id, response in zip(message_ids, responses):
+            if response['status'] == 200 and isinstance(response['body'], dict):
+                attachments[message_id] = response['body'].get('value', [])
+            else:
+                self.logger.error(f"Error obteniendo adjuntos de {message_id}: {response['status']}")
+                attachments[message_id] = []
+        return attachments
+
+    def get_many_message_details(self, message_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Obtiene detalles de varios mensajes (con adjuntos) en lotes de $batch
+
+        Returns:
+            message_id -> detalles del mensaje, o None si la solicitud falló
+        """
+        responses = self.batch([
+            {'method': 'GET', 'url': f"/users/{self.mailbox_email}/messages/{message_id}?$expand=attachments"}
+            for message_id in message_ids
+        ])
+        details = {}
+        for message_id, response in zip(message_ids, responses):
+            if response['status'] == 200 and isinstance(response['body'], dict):
+                details[message_id] = response['body']
+            else:
+                self.logger.error(f"Error obteniendo detalles de {message_id}: {response['status']}")
+                details[message_id] = None
+        return details
+
+    def get_many_messages(self, message_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Obtiene varios mensajes con cuerpo en texto plano y metadatos de
+        adjuntos (ATTACHMENT_FIELDS, sin contenido) en lotes de $batch
+
+        Returns:
+            message_id -> mensaje, o None si la solicitud falló
+        """
+        responses = self.batch([
+            {
+                'method': 'GET',
+                'url': (
+                    f"/users/{self.mailbox_email}/messages/{message_id}"
+                    f"?$select={MESSAGE_FIELDS},toRecipients,body"
+                    f"&$expand=attachments($select={ATTACHMENT_FIELDS})"
+                ),
+                'headers': {'Prefer': 'outlook.body-content-type="text"'},
+            }
+            for message_id in message_ids
+        ])
+        messages = {}
+        for message_id, response in zip(message_ids, responses):
+            if response['status'] == 200 and isinstance(response['body'], dict):
+                messages[message_id] = response['body']
+            else:
+                self.logger.error(f"Error obteniendo mensaje {message_id}: {response['status']}")
+                messages[message_id] = None
+        return messages
+
+    def get_many_attachment_contents(
+        self,
+        attachments: List[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], Optional[bytes]]:
+        """
+        Descarga el contenido de varios adjuntos con /attachments/{id}/$value
+        en lotes de $batch
+
+        Solo viajan los bytes de cada adjunto, no el mensaje MIME completo.
+        Dentro de $batch los cuerpos binarios llegan en base64.
+
+        Args:
+            attachments: (message_id, attachment_id) de cada adjunto
+
+        Returns:
+            (message_id, attachment_id) -> contenido, o None si falló
+        """
+        responses = self.batch([
+            {
+                'method': 'GET',
+                'url': f"/users/{self.mailbox_email}/messages/{message_id}/attachments/{attachment_id}/$value"
+            }
+            for message_id, attachment_id in attachments
+        ])
+        contents = {}
+        for key, response in zip(attachments, responses):
+            contents[key] = None
+            if response['status'] == 200 and isinstance(response['body'], str):
+                try:
+                    contents[key] = base64.b64decode(response['body'])
+                except ValueError:
+                    self.logger.error(f"Contenido inválido del adjunto {key[1]} de {key[0]}")
+            else:
+                self.logger.error(f"Error descargando adjunto {key[1]} de {key[0]}: {response['status']}")
+        return contents
+
     def disconnect(self):
         """Cierra la conexión (no es necesario con Graph API, pero mantenemos la interfaz)"""
-        self.logger.debug("Desconectando de Graph API (no requiere acción)")
+        self.logger.debug("Desconectando de Graph API")
+        if self._graph_client:
+            self._graph_client.close()
         self._graph_client = None
-        self._credential = None
 
     @staticmethod
     def decode_attachment_content(content_bytes: str) -> bytes:
@@ -0,0 +1,232 @@
+"""
+Parser de respuestas FETCH de IMAP (RFC 3501)
+Convierte la salida de imaplib (líneas y tuplas con literales) en
+diccionarios por UID, e interpreta ENVELOPE y BODYSTRUCTURE.
+"""
+import re
+from email.header import decode_header, make_header
+from typing import List, Optional, Dict, Any, Iterator, Union
+
+_LITERAL_RE = re.compile(rb'\{(\d+)\}$')
+
+
+# Token de literal (contenido de {n}) para distinguirlo de un átomo
+class _Literal(bytes):
+    pass
+
+
+def _tokenize(data: List[Union[bytes, tuple]]) -> Iterator[Any]:
+    """
+    Tokens de una respuesta FETCH de imaplib
+
+    Cada elemento es una línea (bytes) o una tupla (línea terminada en {n},
+    literal). Produce '(' y ')', bytes para átomos y strings, None para NIL.
+    """
+    for item in data:
+        if isinstance(item, tuple):
+            line, literal = item[0], item[1]
+            line = _LITERAL_RE.sub(b'', line.rstrip())
+            yield from _tokenize_line(line)
+            yield _Literal(literal)
+        elif isinstance(item, bytes):
+            yield from _tokenize_line(item)
+
+
+def _tokenize_line(line: bytes) -> Iterator[Any]:
+    i = 0
+    n = len(line)
+    while i < n:
+        c = line[i:i + 1]
+        if c in (b' ', b'\r', b'\n'):
+            i += 1
+        elif c in (b'(', b')'):
+            yield c.decode()
+            i += 1
+        elif c == b'"':
+            i += 1
+            value = bytearray()
+            while i < n and line[i:i + 1] != b'"':
+                if line[i:i + 1] == b'\\':
+                    i += 1
+                value += line[i:i + 1]
+                i += 1
+            i += 1
+            yield bytes(value)
+        else:
+            # Átomo; BODY[HEADER.FIELDS (SUBJECT)] incluye espacios dentro de []
+            start = i
+            depth = 0
+            while i < n:
+                c = line[i:i + 1]
+                if c == b'[':
+                    depth += 1
+                elif c == b']':
+                    depth -= 1
+                elif depth == 0 and c in (b' ', b'(', b')', b'\r', b'\n'):
+                    break
+                i += 1
+            atom = line[start:i]
+            yield None if atom.upper() == b'NIL' else atom
+
+
+def _parse_list(tokens: Iterator[Any]) -> list:
+    """Lista parentizada (el '(' inicial ya fue consumido)"""
+    items = []
+    for token in tokens:
+        if token == '(':
+            items.append(_parse_list(tokens))
+        elif token == ')':
+            return items
+        else:
+            items.append(token)
+    raise ValueError("lista IMAP sin cerrar")
+
+
+def parse_fetch_response(data: List[Union[bytes, tuple]]) -> Dict[int, Dict[str, Any]]:
+    """
+    Interpreta la respuesta de un UID FETCH de varios mensajes
+
+    Returns:
+        UID -> {ítem en mayúsculas: valor}; los literales quedan como bytes,
+        las listas como listas y UID / RFC822.SIZE como int
+    """
+    results = {}
+    tokens = _tokenize(data)
+    for token in tokens:
+        # "* n FETCH (...)": imaplib ya quitó "* " y "FETCH"; queda "n (...)"
+        if token != '(':
+            continue
+        items = _parse_list(tokens)
+        fields = {}
+        for key, value in zip(items[0::2], items[1::2]):
+            if isinstance(key, bytes):
+                fields[key.decode(errors='replace').upper()] = value
+
+        for numeric in ('UID', 'RFC822.SIZE'):
+            if numeric in fields:
+                try:
+                    fields[numeric] = int(fields[numeric])
+                except (TypeError, ValueError):
+                    fields[numeric] = None
+
+        # Un mismo UID puede venir en dos respuestas (ej: cambio de FLAGS no solicitado)
+        if fields.get('UID') is not None:
+            results.setdefault(fields['UID'], {}).update(fields)
+    return results
+
+
+def _text(value: Optional[bytes]) -> str:
+    """String de ENVELOPE decodificado (RFC 2047)"""
+    if not value:
+        return ''
+    text = value.decode('utf-8', errors='replace')
+    try:
+        return str(make_header(decode_header(text)))
+    except Exception:
+        return text
+
+
+def _addresses(value: Optional[list]) -> str:
+    """Lista de direcciones de ENVELOPE como "Nombre <buzon@host>, ..." """
+    if not isinstance(value, list):
+        return ''
+
+    formatted = []
+    for address in value:
+        if not isinstance(address, list) or len(address) < 4 or not address[2]:
+            continue  # Marcadores de grupo (RFC 2822)
+        name = _text(address[0])
+        email_address = f"{_text(address[2])}@{_text(address[3])}"
+        formatted.append(f"{name} <{email_address}>" if name else email_address)
+    return ", ".join(formatted)
+
+
+def parse_envelope(envelope: Optional[list]) -> Dict[str, str]:
+    """
+    Campos de un ENVELOPE
+
+    Returns:
+        {'date', 'subject', 'from', 'to'} como texto
+    """
+    if not isinstance(envelope, list) or len(envelope) < 6:
+        return {'date': '', 'subject': '', 'from': '', 'to': ''}
+
+    return {
+        'date': _text(envelope[0]),
+        'subject': _text(envelope[1]),
+        'from': _addresses(envelope[2]),
+        'to': _addresses(envelope[5]),
+    }
+
+
+def _params(value: Any) -> Dict[str, str]:
+    """Lista ("clave" "valor" ...) de BODYSTRUCTURE como diccionario"""
+    if not isinstance(value, list):
+        return {}
+    return {
+        _text(key).lower(): _text(val)
+        for key, val in zip(value[0::2], value[1::2])
+        if isinstance(key, bytes) and isinstance(val, bytes)
+    }
+
+
+def body_parts(structure: Optional[list], section: str = '') -> List[Dict[str, Any]]:
+    """
+    Partes hoja de un BODYSTRUCTURE con su número de sección
+
+    Returns:
+        Lista de {'section', 'type' ("application/pdf"), 'encoding', 'size',
+        'filename', 'disposition', 'charset'}
+    """
+    if not isinstance(structure, list) or not structure:
+        return []
+
+    # Multipart: las subpartes son listas al inicio, seguidas del subtipo
+    if isinstance(structure[0], list):
+        parts = []
+        for index, child in enumerate(structure, start=1):
+            if not isinstance(child, list):
+                break
+            parts += body_parts(child, f"{section}.{index}" if section else str(index))
+        return parts
+
+    section = section or '1'
+    main_type = _text(structure[0]).lower()
+    sub_type = _text(structure[1]).lower() if len(structure) > 1 else ''
+    params = _params(structure[2]) if len(structure) > 2 else {}
+
+    # Campos extra antes de la extensión: text/* trae líneas;
+    # message/rfc822 trae envelope, body y líneas
+    if main_type == 'message' and sub_type == 'rfc822' and len(structure) > 8:
+        inner = structure[8]
+        multipart = isinstance(inner, list) and inner and isinstance(inner[0], list)
+        return body_parts(inner, section if multipart else f"{section}.1")
+    extension = 8 if main_type == 'text' else 7
+
+    disposition = None
+    disposition_params = {}
+    if len(structure) > extension + 1 and isinstance(structure[extension + 1], list):
+        disposition_value = structure[extension + 1]
+        disposition = _text(disposition_value[0]).lower() if disposition_value else None
+        disposition_params = _params(disposition_value[1]) if len(disposition_value) > 1 else {}
+
+    try:
+        size = int(structure[6])
+    except (IndexError, TypeError, ValueError):
+        size = None
+
+    return [{
+        'section': section,
+        'type': f"{main_type}/{sub_type}",
+        'encoding': _text(structure[5]).lower() if len(structure) > 5 else '',
+        'size': size,
+        'filename': disposition_params.get('filename') or params.get('name') or None,
+        'disposition': disposition,
+        'charset': params.get('charset'),
+    }]
+
+
+def is_pdf_part(part: Dict[str, Any]) -> bool:
+    """Parte de BODYSTRUCTURE que es un adjunto PDF"""
+    filename = part.get('filename') or ''
+    return filename.lower().endswith('.pdf') or part.get('type') == 'application/pdf'
@@ -0,0 +1,126 @@
+"""
+Pool de conexiones IMAP persistentes
+Una conexión por (host, usuario, carpeta), compartida por los monitores que
+apuntan al mismo buzón. Un timer verifica las conexiones en segundo plano
+(NOOP solo si están inactivas) y las reconecta con backoff exponencial.
+"""
+import threading
+from typing import Dict, List, Optional, Any, Tuple
+
+from loguru import logger
+
+from config import settings
+from src.imap_wrapper import SimpleIMAPClient
+
+
+class IMAPConnectionPool:
+    """Conexiones IMAP compartidas por (host, usuario, carpeta)"""
+
+    def __init__(self, health_check_interval: int = 60, backoff_max: int = 300):
+        self.health_check_interval = health_check_interval
+        self.backoff_max = backoff_max
+        self._clients: Dict[Tuple[str, str, str], SimpleIMAPClient] = {}
+        self._refs: Dict[Tuple[str, str, str], int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.logger = logger.bind(module="IMAPConnectionPool")
+
+    def acquire(
+        self,
+        host: str,
+        port: int,
+        username: str,
+        password: str,
+        mailbox: str = "INBOX",
+        use_ssl: bool = True
+    ) -> SimpleIMAPClient:
+        """
+        Obtiene la conexión del buzón, creándola si no existe
+
+        El cliente se entrega aunque la conexión inicial falle: se reintenta
+        con backoff en el próximo comando o en el health check.
+        """
+        key = (host, username, mailbox)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = SimpleIMAPClient(host=host, port=port, use_ssl=use_ssl)
+                client.reconnect_backoff_max = self.backoff_max
+                self._clients[key] = client
+                self._refs[key] = 0
+            self._refs[key] += 1
+            refs = self._refs[key]
+            self._start_health_checks()
+
+        if refs > 1:
+            self.logger.info(f"♻️ Conexión a {username}/{mailbox} compartida ({refs} monitores)")
+        client.open(username, password, mailbox)
+        return client
+
+    def release(self, client: SimpleIMAPClient):
+        """Libera la conexión; se cierra cuando ningún monitor la usa"""
+        with self._lock:
+            key = next((k for k, c in self._clients.items() if c is client), None)
+            if key is None:
+                return
+            self._refs[key] -= 1
+            if self._refs[key] > 0:
+                return
+            del self._clients[key]
+            del self._refs[key]
+
+        client.disconnect()
+
+    def _start_health_checks(self):
+        """Inicia el timer de health checks (con self._lock tomado)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._health_loop, name="imap-health", daemon=True)
+        self._thread.start()
+
+    def _health_loop(self):
+        while not self._stop.wait(self.health_check_interval):
+            with self._lock:
+                clients = list(self._clients.items())
+
+            for (host, username, mailbox), client in clients:
+                try:
+                    if not client.health_check(self.health_check_interval):
+                        self.logger.warning(f"⚠️ Conexión a {username}/{mailbox} no disponible")
+                except Exception as e:
+                    self.logger.error(f"Error en health check de {username}/{mailbox}: {e}")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Estado de cada conexión (para /api/metrics)"""
+        with self._lock:
+            return [
+                {
+                    'host': host,
+                    'usuario': username,
+                    'carpeta': mailbox,
+                    'monitores': self._refs[(host, username, mailbox)],
+                    'conectado': client.connected,
+                    'reconexiones_fallidas': client.reconnect_failures,
+                }
+                for (host, username, mailbox), client in self._clients.items()
+            ]
+
+    def close_all(self):
+        """Detiene los health checks y cierra todas las conexiones"""
+        self._stop.set()
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._refs.clear()
+
+        for client in clients:
+            client.disconnect()
+
+
+# Instancia global
+imap_pool = IMAPConnectionPool(
+    health_check_interval=settings.imap_health_check_interval,
+    backoff_max=settings.imap_reconnect_backoff_max
+)
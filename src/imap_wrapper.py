@@ -2,17 +2,76 @@
 Wrapper alternativo para IMAP usando biblioteca estándar de Python
 Compatible con Python 3.14+
 """
+import re
+import time
+import random
+import functools
+import binascii
+import quopri
+import socket
 import imaplib
+import threading
 import email
 from email.parser import BytesParser
 from email import policy
-from typing import List, Optional, Dict, Any
+from contextlib import contextmanager
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 from loguru import logger
 
+from src.imap_parser import parse_fetch_response, parse_envelope, body_parts
+
+_RFC822_SIZE_RE = re.compile(rb'RFC822\.SIZE\s+(\d+)')
+# Respuestas no etiquetadas que indican correo nuevo durante IDLE
+_IDLE_NEW_MAIL_RE = re.compile(rb'^\* \d+ (EXISTS|RECENT)', re.IGNORECASE)
+# IDLE terminado para ceder la conexión a un comando de otro hilo
+_IDLE_YIELDED = object()
+
+
+def _decode_part(data: Any, encoding: str) -> Optional[bytes]:
+    """Contenido de una sección BODY[n] según su Content-Transfer-Encoding"""
+    if not isinstance(data, bytes):
+        return None
+    try:
+        if encoding == 'base64':
+            return binascii.a2b_base64(data)
+        if encoding == 'quoted-printable':
+            return quopri.decodestring(data)
+    except (binascii.Error, ValueError):
+        return None
+    return data
+
+
+def _locked(method):
+    """Ejecuta el método con la conexión tomada (ver SimpleIMAPClient._exclusive)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._exclusive():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _uid_set(uids: List[int]) -> str:
+    """Conjunto de UIDs compacto para FETCH: [1, 2, 3, 7] -> "1:3,7" """
+    ranges = []
+    for uid in sorted(set(uids)):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ",".join(str(a) if a == b else f"{a}:{b}" for a, b in ranges)
+
 
 class SimpleIMAPClient:
     """Cliente IMAP simple usando biblioteca estándar de Python"""
 
+    # Mensajes por comando UID FETCH: contenido completo / solo encabezados
+    FETCH_BATCH_SIZE = 20
+    ENVELOPE_BATCH_SIZE = 500
+    # Tamaño máximo de la parte text/plain que se descarga junto a los PDF
+    TEXT_PART_MAX_BYTES = 64 * 1024
+    # Segundos de espera de la respuesta a DONE antes de dar la conexión por perdida
+    IDLE_DONE_TIMEOUT = 30
+
     def __init__(self, host: str, port: int = 993, use_ssl: bool = True):
         self.host = host
         self.port = port
@@ -21,8 +80,68 @@ class SimpleIMAPClient:
         self.username: Optional[str] = None
         self.password: Optional[str] = None
         self.current_folder: str = "INBOX"
+        # Valores de la carpeta seleccionada (respuesta de SELECT)
+        self.uidvalidity: Optional[int] = None
+        self.uidnext: Optional[int] = None
+        # None = aún no consultado (CAPABILITY)
+        self._idle_supported: Optional[bool] = None
+        self._idle_count = 0
+        # La conexión puede compartirse entre monitores (imap_pool): los comandos
+        # se serializan y un comando de otro hilo interrumpe el IDLE en curso
+        self._lock = threading.RLock()
+        self._idle_interrupt = threading.Event()
+        # IDLE compartido: un hilo lo mantiene y los demás esperan su resultado
+        self._idle_cond = threading.Condition()
+        self._idle_thread: Optional[int] = None
+        self._idle_generation = 0
+        self._idle_result: Optional[bool] = None
+        # Reconexión con backoff exponencial (segundos)
+        self.reconnect_backoff_base = 2.0
+        self.reconnect_backoff_max = 300.0
+        self.reconnect_failures = 0
+        self._next_reconnect = 0.0
+        self._last_activity = 0.0
         self.logger = logger.bind(module="SimpleIMAPClient")
 
+    @property
+    def connected(self) -> bool:
+        """Hay una conexión abierta (su estado real lo verifica health_check)"""
+        return self.client is not None
+
+    @contextmanager
+    def _exclusive(self):
+        """
+        Toma la conexión para un comando
+
+        Si otro hilo la tiene en IDLE, se le pide terminar (DONE) y se espera;
+        la señal se repite mientras se espera por si IDLE aún no comenzaba.
+        """
+        me = threading.get_ident()
+        if not self._lock.acquire(blocking=False):
+            while True:
+                if self._idle_thread not in (None, me):
+                    self._idle_interrupt.set()
+                if self._lock.acquire(timeout=0.2):
+                    break
+        try:
+            yield
+        finally:
+            self._lock.release()
+
+    @_locked
+    def open(self, username: str, password: str, folder: str = "INBOX") -> bool:
+        """Registra credenciales y carpeta, y conecta si aún no hay conexión"""
+        self.username = username
+        self.password = password
+        self.current_folder = folder
+        return self._ensure_connected()
+
+    @_locked
+    def ensure_connected(self) -> bool:
+        """Conecta si no hay conexión (respetando el backoff de reconexión)"""
+        return self._ensure_connected()
+
+    @_locked
     def connect(self, username: str, password: str) -> bool:
         """Conecta y autentica con el servidor IMAP"""
         try:
@@ -39,39 +158,112 @@ class SimpleIMAPClient:
 
             # Login
             self.client.login(username, password)
+            self._idle_supported = None
+            self._last_activity = time.monotonic()
             self.logger.info("✅ Conexión y autenticación exitosa")
             return True
 
         except Exception as e:
             self.logger.error(f"❌ Error conectando: {e}")
+            self._drop_connection()
             return False
 
     def _ensure_connected(self) -> bool:
-        """Verifica la conexión y reconecta si es necesario"""
+        """
+        Conecta si no hay conexión activa
+
+        No se envía un NOOP por comando: una conexión caída se detecta al
+        ejecutar el comando (_uid reconecta y reintenta) o en health_check.
+        Tras un intento fallido se espera con backoff exponencial (con
+        jitter) antes del siguiente, para no generar una ráfaga de
+        handshakes TLS después de un corte de red.
+        """
+        if self.client:
+            return True
+        if not (self.username and self.password):
+            return False
+
+        wait = self._next_reconnect - time.monotonic()
+        if wait > 0:
+            self.logger.debug(f"Reconexión en espera por backoff ({wait:.0f}s)")
+            return False
+
+        if self.connect(self.username, self.password) and self.select_folder(self.current_folder):
+            self.reconnect_failures = 0
+            self._next_reconnect = 0.0
+            return True
+
+        self._drop_connection()
+        self.reconnect_failures += 1
+        delay = min(
+            self.reconnect_backoff_max,
+            self.reconnect_backoff_base * 2 ** (self.reconnect_failures - 1)
+        ) * random.uniform(0.5, 1.0)
+        self._next_reconnect = time.monotonic() + delay
+        self.logger.warning(
+            f"⚠️ Reconexión fallida ({self.reconnect_failures} seguidas), próximo intento en {delay:.0f}s"
+        )
+        return False
+
+    def _drop_connection(self):
+        """Descarta la conexión actual sin LOGOUT (estado del protocolo desconocido)"""
+        if self.client:
+            try:
+                self.client.shutdown()
+            except Exception:
+                pass
+        self.client = None
+
+    def _uid(self, command: str, *args):
+        """
+        Ejecuta UID <command>; si la conexión se cayó, reconecta y reintenta una vez
+
+        Raises:
+            imaplib.IMAP4.abort / OSError si tampoco funciona tras reconectar
+        """
+        try:
+            result = self.client.uid(command, *args)
+        except (imaplib.IMAP4.abort, OSError) as e:
+            self.logger.warning(f"⚠️ Conexión perdida en UID {command}: {e}")
+            self._drop_connection()
+            if not self._ensure_connected():
+                raise
+            self.logger.info(f"Reconexión exitosa, reintentando UID {command}")
+            result = self.client.uid(command, *args)
+
+        self._last_activity = time.monotonic()
+        return result
+
+    def health_check(self, max_idle: float) -> bool:
+        """
+        Verifica la conexión con NOOP si lleva más de max_idle segundos sin uso
+
+        Pensado para el timer de imap_pool. Una conexión ocupada (ej: en IDLE)
+        se da por sana sin interrumpirla; una caída se reconecta aquí, en
+        segundo plano, respetando el backoff.
+
+        Returns:
+            True si la conexión queda disponible
+        """
+        if not self._lock.acquire(blocking=False):
+            return True
         try:
-            # Intentar hacer un NOOP (no operation) para verificar conexión
-            if self.client:
+            if self.client is None:
+                return self._ensure_connected()
+            if time.monotonic() - self._last_activity < max_idle:
+                return True
+            try:
                 self.client.noop()
+                self._last_activity = time.monotonic()
                 return True
-            else:
-                # Cliente no existe, necesita conectarse
-                self.logger.warning("⚠️ Cliente no inicializado, conectando...")
-                if self.username and self.password:
-                    if self.connect(self.username, self.password):
-                        # Re-seleccionar la carpeta que estaba activa
-                        return self.select_folder(self.current_folder)
-                return False
-        except:
-            # Conexión perdida, intentar reconectar
-            self.logger.warning("⚠️ Conexión perdida, reconectando...")
-            # Limpiar cliente actual
-            self.client = None
-            if self.username and self.password:
-                if self.connect(self.username, self.password):
-                    # Re-seleccionar la carpeta que estaba activa
-                    return self.select_folder(self.current_folder)
-            return False
-
+            except Exception as e:
+                self.logger.warning(f"⚠️ Health check falló: {e}")
+                self._drop_connection()
+                return self._ensure_connected()
+        finally:
+            self._lock.release()
+
+    @_locked
     def disconnect(self):
         """Cierra la conexión"""
         if self.client:
@@ -79,7 +271,9 @@ class SimpleIMAPClient:
                 self.client.logout()
             except:
                 pass
+            self.client = None
 
+    @_locked
     def select_folder(self, folder: str = "INBOX") -> bool:
         """Selecciona una carpeta"""
         try:
@@ -91,7 +285,9 @@ class SimpleIMAPClient:
 
             if status == 'OK':
                 self.current_folder = folder
-                self.logger.debug(f"Carpeta '{folder}' seleccionada")
+                self.uidvalidity = self._select_response_int('UIDVALIDITY')
+                self.uidnext = self._select_response_int('UIDNEXT')
+                self.logger.debug(f"Carpeta '{folder}' seleccionada (UIDVALIDITY {self.uidvalidity})")
                 return True
             else:
                 self.logger.error(f"Error seleccionando carpeta {folder}: {response}")
@@ -101,22 +297,24 @@ class SimpleIMAPClient:
             self.logger.error(f"Error seleccionando carpeta {folder}: {e}")
             return False
 
+    def _select_response_int(self, code: str) -> Optional[int]:
+        """Valor numérico de un código de respuesta de SELECT (UIDVALIDITY, UIDNEXT)"""
+        _, values = self.client.response(code)
+        try:
+            return int(values[-1])
+        except (TypeError, ValueError, IndexError):
+            return None
+
+    @_locked
     def search_unseen(self) -> List[int]:
-        """Busca mensajes no leídos"""
+        """Busca mensajes no leídos (retorna UIDs)"""
         try:
             # Asegurar que estamos conectados
             if not self._ensure_connected():
                 self.logger.error("No se pudo establecer conexión para búsqueda")
                 return []
 
-            # Verificar que tengamos una carpeta seleccionada
-            if not self.current_folder or self.current_folder == "":
-                self.logger.debug("No hay carpeta seleccionada, seleccionando INBOX")
-                if not self.select_folder("INBOX"):
-                    self.logger.error("No se pudo seleccionar INBOX")
-                    return []
-
-            status, messages = self.client.search(None, 'UNSEEN')
+            status, messages = self._uid('SEARCH', None, 'UNSEEN')
 
             if status == 'OK':
                 message_ids = messages[0].split()
@@ -127,42 +325,56 @@ class SimpleIMAPClient:
                 self.logger.warning(f"SEARCH retornó estado no-OK: {status}")
                 return []
 
-        except imaplib.IMAP4.abort as e:
-            # Conexión abortada, intentar reconectar una vez
-            self.logger.warning(f"Conexión abortada durante búsqueda: {e}")
-            self.client = None  # Forzar reconexión
-
-            if self._ensure_connected():
-                self.logger.info("Reconexión exitosa, reintentando búsqueda...")
-                try:
-                    status, messages = self.client.search(None, 'UNSEEN')
-                    if status == 'OK':
-                        message_ids = messages[0].split()
-                        return [int(mid) for mid in message_ids]
-                    else:
-                        self.logger.error(f"Búsqueda falló después de reconectar: {status}")
-                except Exception as retry_error:
-                    self.logger.error(f"Error en reintento de búsqueda: {retry_error}")
-            else:
-                self.logger.error("No se pudo reconectar después de abort")
-
-            return []
-
         except Exception as e:
             self.logger.error(f"Error buscando mensajes: {e}")
             import traceback
             self.logger.debug(f"Stack trace: {traceback.format_exc()}")
             return []
 
-    def fetch_message(self, message_id: int) -> Optional[Dict[str, Any]]:
-        """Obtiene un mensaje completo"""
+    @_locked
+    def search_since_uid(self, start_uid: int) -> List[int]:
+        """
+        UIDs mayores o iguales a start_uid (UID SEARCH UID n:*)
+
+        Con n mayor que el último UID, el servidor igual retorna el último
+        mensaje ("*" es el UID más alto), por lo que se filtra aquí.
+        """
+        if not self._ensure_connected():
+            self.logger.error("No se pudo establecer conexión para búsqueda")
+            return []
+
+        status, messages = self._uid('SEARCH', None, f'UID {start_uid}:*')
+        if status != 'OK':
+            self.logger.warning(f"UID SEARCH retornó estado no-OK: {status}")
+            return []
+
+        return sorted(uid for uid in map(int, messages[0].split()) if uid >= start_uid)
+
+    @_locked
+    def fetch_message(self, message_id: int, max_bytes: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene un mensaje completo
+
+        Args:
+            message_id: UID del mensaje
+            max_bytes: Si el mensaje (RFC822.SIZE) lo supera, solo se descargan
+                       los encabezados y el resultado trae 'oversized': True
+
+        Returns:
+            Diccionario con encabezados, cuerpo y adjuntos, o None si falla
+        """
         try:
             # Asegurar conexión
             if not self._ensure_connected():
                 return None
 
+            if max_bytes:
+                size = self._fetch_size(message_id)
+                if size is not None and size > max_bytes:
+                    return self._fetch_headers_only(message_id, size)
+
             # Fetch del mensaje (usando PEEK para no marcarlo como leído)
-            status, data = self.client.fetch(str(message_id), '(BODY.PEEK[])')
+            status, data = self._uid('FETCH', str(message_id), '(BODY.PEEK[])')
 
             if status != 'OK':
                 self.logger.warning(f"FETCH retornó estado {status}")
@@ -186,75 +398,459 @@ class SimpleIMAPClient:
                 self.logger.error(f"FETCH retornó tipo inesperado para mensaje {message_id}: {type(raw_email)}")
                 return None
 
-            # Parsear el mensaje
-            msg = BytesParser(policy=policy.default).parsebytes(raw_email)
-
-            # Extraer información básica
-            result = {
-                'id': message_id,
-                'subject': str(msg.get('Subject', '')),
-                'from': str(msg.get('From', '')),
-                'to': str(msg.get('To', '')),
-                'date': msg.get('Date'),
-                'body_text': '',
-                'body_html': '',
-                'attachments': []
-            }
-
-            # Extraer cuerpo y adjuntos
-            if msg.is_multipart():
-                for part in msg.walk():
-                    content_type = part.get_content_type()
-                    content_disposition = str(part.get('Content-Disposition', ''))
-
-                    # Texto plano
-                    if content_type == 'text/plain' and 'attachment' not in content_disposition:
-                        try:
-                            result['body_text'] = part.get_content()
-                        except:
-                            pass
+            return self._parse_message(message_id, raw_email)
+
+        except Exception as e:
+            self.logger.error(f"Error obteniendo mensaje {message_id}: {e}")
+            import traceback
+            self.logger.debug(f"Stack trace: {traceback.format_exc()}")
+            return None
 
-                    # HTML
-                    elif content_type == 'text/html' and 'attachment' not in content_disposition:
+    def _parse_message(self, message_id: int, raw_email: bytes) -> Dict[str, Any]:
+        """Encabezados, cuerpo y adjuntos de un mensaje RFC 822"""
+        msg = BytesParser(policy=policy.default).parsebytes(raw_email)
+
+        # Extraer información básica
+        result = {
+            'id': message_id,
+            'subject': str(msg.get('Subject', '')),
+            'from': str(msg.get('From', '')),
+            'to': str(msg.get('To', '')),
+            'date': msg.get('Date'),
+            'body_text': '',
+            'body_html': '',
+            'attachments': []
+        }
+
+        # Extraer cuerpo y adjuntos
+        if msg.is_multipart():
+            for part in msg.walk():
+                content_type = part.get_content_type()
+                content_disposition = str(part.get('Content-Disposition', ''))
+
+                # Texto plano
+                if content_type == 'text/plain' and 'attachment' not in content_disposition:
+                    try:
+                        result['body_text'] = part.get_content()
+                    except:
+                        pass
+
+                # HTML
+                elif content_type == 'text/html' and 'attachment' not in content_disposition:
+                    try:
+                        result['body_html'] = part.get_content()
+                    except:
+                        pass
+
+                # Adjuntos
+                elif 'attachment' in content_disposition:
+                    filename = part.get_filename()
+                    if filename:
                         try:
-                            result['body_html'] = part.get_content()
+                            content = part.get_payload(decode=True)
+                            result['attachments'].append({
+                                'filename': filename,
+                                'content': content,
+                                'size': len(content) if content else 0
+                            })
                         except:
                             pass
+        else:
+            # Mensaje simple (no multipart)
+            content_type = msg.get_content_type()
+            if content_type == 'text/plain':
+                result['body_text'] = msg.get_content()
+            elif content_type == 'text/html':
+                result['body_html'] = msg.get_content()
+
+        return result
+
+    def fetch_many(
+        self,
+        uids: List[int],
+        parts: str = '(UID BODY.PEEK[])',
+        batch_size: Optional[int] = None
+    ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Descarga varios mensajes con un UID FETCH por lote
+
+        La conexión se toma y verifica una vez por lote, no por mensaje.
+        Cada lote se lee completo antes de entregar sus mensajes, por lo que
+        el consumidor puede usar la conexión entre un resultado y otro.
+
+        Args:
+            uids: UIDs a descargar
+            parts: Ítems de FETCH, ej: "(UID BODY.PEEK[])" o "(UID ENVELOPE)"
+            batch_size: Mensajes por comando (FETCH_BATCH_SIZE por defecto)
+
+        Yields:
+            (uid, ítems) con los ítems de parse_fetch_response ("BODY[]",
+            "ENVELOPE", ...). Los UIDs de un lote fallido o de mensajes ya
+            eliminados no se entregan.
+        """
+        uids = sorted(set(uids))
+        batch_size = batch_size or self.FETCH_BATCH_SIZE
+
+        for start in range(0, len(uids), batch_size):
+            batch = uids[start:start + batch_size]
 
-                    # Adjuntos
-                    elif 'attachment' in content_disposition:
-                        filename = part.get_filename()
-                        if filename:
-                            try:
-                                content = part.get_payload(decode=True)
-                                result['attachments'].append({
-                                    'filename': filename,
-                                    'content': content,
-                                    'size': len(content) if content else 0
-                                })
-                            except:
-                                pass
-            else:
-                # Mensaje simple (no multipart)
-                content_type = msg.get_content_type()
-                if content_type == 'text/plain':
-                    result['body_text'] = msg.get_content()
-                elif content_type == 'text/html':
-                    result['body_html'] = msg.get_content()
+            try:
+                with self._exclusive():
+                    if not self._ensure_connected():
+                        self.logger.error(f"Sin conexión: {len(uids) - start} mensajes sin descargar")
+                        return
+                    status, data = self._uid('FETCH', _uid_set(batch), parts)
+
+                if status != 'OK':
+                    self.logger.warning(f"FETCH de {len(batch)} mensajes retornó estado {status}")
+                    continue
+                results = parse_fetch_response(data)
+
+            except (imaplib.IMAP4.abort, OSError) as e:
+                # El próximo lote reconecta en _ensure_connected
+                self.logger.warning(f"Conexión abortada durante FETCH de {len(batch)} mensajes: {e}")
+                continue
+            except Exception as e:
+                self.logger.error(f"Error en FETCH de {len(batch)} mensajes: {e}")
+                continue
+
+            requested = set(batch)
+            for uid, fields in results.items():
+                if uid in requested:
+                    yield uid, fields
+
+    def fetch_messages(self, uids: List[int], batch_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Mensajes completos en lotes (ver fetch_many)
+
+        Yields:
+            Diccionarios con el mismo formato que fetch_message
+        """
+        for uid, fields in self.fetch_many(uids, '(UID BODY.PEEK[])', batch_size):
+            raw_email = fields.get('BODY[]')
+            if not isinstance(raw_email, bytes):
+                self.logger.warning(f"FETCH sin contenido para mensaje {uid}")
+                continue
+
+            try:
+                yield self._parse_message(uid, raw_email)
+            except Exception as e:
+                self.logger.error(f"Error parseando mensaje {uid}: {e}")
+
+    def fetch_pdf_parts(
+        self,
+        envelopes: Dict[int, Dict[str, Any]],
+        batch_size: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Descarga solo los adjuntos PDF y el texto plano de cada mensaje
+
+        Con las partes de BODYSTRUCTURE (fetch_envelopes) se piden únicamente
+        las secciones BODY.PEEK[n] de los PDF y la primera parte text/plain
+        si no supera TEXT_PART_MAX_BYTES; imágenes, logos y HTML no se
+        transfieren. Los mensajes con la misma estructura se agrupan en un
+        mismo UID FETCH.
+
+        Args:
+            envelopes: UID -> resultado de fetch_envelopes (con 'parts')
+
+        Yields:
+            Diccionarios con el formato de fetch_message (body_html vacío y
+            solo adjuntos PDF). Un mensaje con alguna sección faltante no se
+            entrega, igual que un FETCH fallido.
+        """
+        plans = {}
+        groups: Dict[tuple, List[int]] = {}
+        for uid, envelope in envelopes.items():
+            pdfs = [p for p in envelope['parts'] if (p['filename'] or '').lower().endswith('.pdf')]
+            text = next(
+                (p for p in envelope['parts'] if p['type'] == 'text/plain' and p['disposition'] != 'attachment'),
+                None
+            )
+            if text and (text['size'] or 0) > self.TEXT_PART_MAX_BYTES:
+                text = None
+            plans[uid] = (pdfs, text)
+            sections = tuple(p['section'] for p in pdfs + ([text] if text else []))
+            groups.setdefault(sections, []).append(uid)
+
+        for sections, uids in groups.items():
+            if not sections:
+                for uid in uids:
+                    yield self._message_from_parts(uid, envelopes[uid], {}, [], None)
+                continue
+
+            items = "(UID " + " ".join(f"BODY.PEEK[{section}]" for section in sections) + ")"
+            for uid, fields in self.fetch_many(uids, items, batch_size):
+                pdfs, text = plans[uid]
+                result = self._message_from_parts(uid, envelopes[uid], fields, pdfs, text)
+                if result:
+                    yield result
+
+    def _message_from_parts(
+        self,
+        uid: int,
+        envelope: Dict[str, Any],
+        fields: Dict[str, Any],
+        pdfs: List[Dict[str, Any]],
+        text: Optional[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """Arma el resultado de fetch_pdf_parts a partir de las secciones descargadas"""
+        result = {
+            'id': uid,
+            'subject': envelope['subject'],
+            'from': envelope['from'],
+            'to': envelope['to'],
+            'date': envelope['date'] or None,
+            'body_text': '',
+            'body_html': '',
+            'attachments': []
+        }
+
+        for part in pdfs:
+            content = _decode_part(fields.get(f"BODY[{part['section']}]"), part['encoding'])
+            if content is None:
+                self.logger.warning(f"Mensaje {uid}: sección {part['section']} ({part['filename']}) no descargada")
+                return None
+            result['attachments'].append({
+                'filename': part['filename'],
+                'content': content,
+                'size': len(content)
+            })
+
+        if text:
+            content = _decode_part(fields.get(f"BODY[{text['section']}]"), text['encoding'])
+            if content is not None:
+                try:
+                    result['body_text'] = content.decode(text['charset'] or 'utf-8', errors='replace')
+                except LookupError:  # Charset desconocido
+                    result['body_text'] = content.decode('utf-8', errors='replace')
+
+        transferred = sum(len(v) for k, v in fields.items() if k.startswith('BODY[') and isinstance(v, bytes))
+        self.logger.debug(f"Mensaje {uid}: {transferred} de {envelope['size']} bytes descargados (solo PDF y texto)")
+        return result
+
+    def fetch_envelopes(self, uids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Encabezados, tamaño y estructura MIME de varios mensajes
+
+        Primera fase de la descarga: permite descartar correos por asunto,
+        remitente o falta de adjuntos sin bajar su contenido. Un solo FETCH
+        cubre hasta ENVELOPE_BATCH_SIZE mensajes.
+
+        Returns:
+            UID -> {'subject', 'from', 'to', 'date', 'size', 'parts'}, donde
+            'parts' son las partes hoja de BODYSTRUCTURE. Los UIDs que no
+            vienen en la respuesta (o un error) deben descargarse completos.
+        """
+        envelopes = {}
+        for uid, fields in self.fetch_many(
+            uids, '(UID RFC822.SIZE ENVELOPE BODYSTRUCTURE)', self.ENVELOPE_BATCH_SIZE
+        ):
+            envelope = parse_envelope(fields.get('ENVELOPE'))
+            envelope['size'] = fields.get('RFC822.SIZE')
+            envelope['parts'] = body_parts(fields.get('BODYSTRUCTURE'))
+            envelopes[uid] = envelope
+        return envelopes
+
+    def _fetch_size(self, message_id: int) -> Optional[int]:
+        """Tamaño del mensaje según el servidor, sin descargarlo"""
+        status, data = self._uid('FETCH', str(message_id), '(RFC822.SIZE)')
+        if status != 'OK' or not data or not isinstance(data[0], bytes):
+            return None
+        match = _RFC822_SIZE_RE.search(data[0])
+        return int(match.group(1)) if match else None
+
+    def _fetch_headers_only(self, message_id: int, size: int) -> Optional[Dict[str, Any]]:
+        """Encabezados de un mensaje que excede el tamaño máximo"""
+        status, data = self._uid('FETCH', str(message_id), '(BODY.PEEK[HEADER])')
+        if status != 'OK' or not data or not isinstance(data[0], tuple):
+            return None
+
+        headers = BytesParser(policy=policy.default).parsebytes(data[0][1], headersonly=True)
+        self.logger.warning(f"Mensaje {message_id} de {size} bytes excede el máximo: solo encabezados")
+        return {
+            'id': message_id,
+            'subject': str(headers.get('Subject', '')),
+            'from': str(headers.get('From', '')),
+            'to': str(headers.get('To', '')),
+            'date': headers.get('Date'),
+            'body_text': '',
+            'body_html': '',
+            'attachments': [],
+            'oversized': True,
+            'size': size
+        }
+
+    def supports_idle(self) -> bool:
+        """Indica si el servidor anuncia IDLE (RFC 2177)"""
+        # Con el valor ya conocido no se toma la conexión (no interrumpe un IDLE en curso)
+        if self._idle_supported is None and self.client:
+            with self._exclusive():
+                self._query_idle_capability()
+        return bool(self._idle_supported)
+
+    def _query_idle_capability(self):
+        if self._idle_supported is None and self.client:
+            capabilities = set(self.client.capabilities)
+            try:
+                # Algunos servidores amplían la lista después del login
+                status, data = self.client.capability()
+                if status == 'OK' and data and data[0]:
+                    capabilities.update(data[0].decode().upper().split())
+            except Exception as e:
+                self.logger.debug(f"CAPABILITY falló: {e}")
+            self._idle_supported = 'IDLE' in capabilities
+            if not self._idle_supported:
+                self.logger.info("El servidor no soporta IDLE, se usará polling")
+
+    def idle(self, timeout: float, stop: Optional[threading.Event] = None) -> Optional[bool]:
+        """
+        Espera correo nuevo con IMAP IDLE (RFC 2177)
+
+        Bloquea hasta que el servidor anuncia un mensaje (EXISTS/RECENT),
+        se cumple el timeout, se activa `stop` u otro hilo necesita la
+        conexión; en todos los casos termina con DONE y deja la conexión
+        lista para el siguiente comando. Se lee directamente del socket con
+        timeout corto (imaplib no soporta IDLE en Python < 3.14), así las
+        interrupciones se atienden en menos de un segundo.
+
+        Si la conexión es compartida y otro hilo ya está en IDLE, se espera
+        su resultado en lugar de interrumpirlo. Un comando de otro hilo
+        solo pausa IDLE: se le cede la conexión y IDLE se retoma cuando
+        queda libre, sin despertar a quienes esperan.
+
+        Args:
+            timeout: Segundos máximos en IDLE (los servidores cortan a los ~30 min)
+            stop: Evento para salir antes (ej: cierre del sistema)
+
+        Returns:
+            True si llegó correo, False si terminó por timeout o interrupción,
+            None si IDLE no está disponible o la conexión falló
+        """
+        with self._idle_cond:
+            if self._idle_thread is not None:
+                return self._wait_shared_idle(timeout, stop)
+            self._idle_thread = threading.get_ident()
+
+        result = None
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                with self._lock:
+                    result = self._idle(deadline - time.monotonic(), stop)
+                if result is not _IDLE_YIELDED:
+                    return result
+
+                result = False
+                if not self._wait_connection_quiet(deadline, stop):
+                    return result
+        finally:
+            with self._idle_cond:
+                self._idle_thread = None
+                self._idle_generation += 1
+                self._idle_result = result
+                self._idle_cond.notify_all()
+
+    def _wait_connection_quiet(self, deadline: float, stop: Optional[threading.Event]) -> bool:
+        """
+        Espera a que los comandos de otros hilos terminen antes de retomar IDLE
+
+        Returns:
+            False si se cumplió el plazo o se activó `stop`
+        """
+        time.sleep(0.05)  # Dar tiempo al hilo que espera la conexión
+        while time.monotonic() - self._last_activity < 1.0:
+            if time.monotonic() >= deadline or (stop and stop.is_set()):
+                return False
+            time.sleep(0.2)
+        return time.monotonic() < deadline and not (stop and stop.is_set())
+
+    def _wait_shared_idle(self, timeout: float, stop: Optional[threading.Event]) -> Optional[bool]:
+        """Espera el resultado del IDLE que mantiene otro hilo (con _idle_cond tomado)"""
+        generation = self._idle_generation
+        deadline = time.monotonic() + timeout
+        while self._idle_generation == generation:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (stop and stop.is_set()):
+                return False
+            self._idle_cond.wait(min(1.0, remaining))
+        return self._idle_result
+
+    def _idle(self, timeout: float, stop: Optional[threading.Event]) -> Optional[bool]:
+        """IDLE en la conexión ya tomada (ver idle)"""
+        if not self._ensure_connected():
+            return None
+        self._query_idle_capability()
+        if not self._idle_supported:
+            return None
+
+        self._idle_interrupt.clear()
+        self._idle_count += 1
+        tag = f"IDLE{self._idle_count}".encode()
+        sock = self.client.sock
+        previous_timeout = sock.gettimeout()
+        new_mail = False
+        yielded = False
+        done_sent_at = None
+        buffer = b''
+        deadline = time.monotonic() + timeout
+
+        try:
+            self.client.send(tag + b' IDLE\r\n')
+            sock.settimeout(0.25)
+
+            while True:
+                if done_sent_at is None and (
+                    new_mail or time.monotonic() >= deadline
+                    or (stop and stop.is_set()) or self._idle_interrupt.is_set()
+                ):
+                    yielded = self._idle_interrupt.is_set() and time.monotonic() < deadline
+                    self.client.send(b'DONE\r\n')
+                    done_sent_at = time.monotonic()
+                elif done_sent_at is not None and time.monotonic() - done_sent_at > self.IDLE_DONE_TIMEOUT:
+                    raise TimeoutError("sin respuesta a DONE")
 
-            return result
+                try:
+                    chunk = sock.recv(4096)
+                except socket.timeout:
+                    continue
+                if not chunk:
+                    raise ConnectionError("el servidor cerró la conexión")
+
+                buffer += chunk
+                while b'\r\n' in buffer:
+                    line, buffer = buffer.split(b'\r\n', 1)
+                    if line.startswith(tag + b' '):
+                        if line[len(tag) + 1:].upper().startswith(b'OK'):
+                            if not new_mail and yielded and not (stop and stop.is_set()):
+                                return _IDLE_YIELDED
+                            return new_mail
+                        # NO/BAD: el servidor rechazó IDLE
+                        self.logger.warning(f"IDLE rechazado: {line.decode(errors='replace')}")
+                        self._idle_supported = False
+                        return None
+                    if _IDLE_NEW_MAIL_RE.match(line):
+                        new_mail = True
 
         except Exception as e:
-            self.logger.error(f"Error obteniendo mensaje {message_id}: {e}")
-            import traceback
-            self.logger.debug(f"Stack trace: {traceback.format_exc()}")
+            self.logger.warning(f"⚠️ IDLE interrumpido: {e}")
+            # Estado del protocolo desconocido: forzar reconexión en la próxima operación
+            self._drop_connection()
             return None
 
+        finally:
+            self._last_activity = time.monotonic()
+            try:
+                sock.settimeout(previous_timeout)
+            except OSError:
+                pass
+
+    @_locked
     def mark_as_read(self, message_id: int):
         """Marca un mensaje como leído"""
         try:
             if self._ensure_connected():
-                self.client.store(str(message_id), '+FLAGS', '\\Seen')
+                self._uid('STORE', str(message_id), '+FLAGS', '\\Seen')
         except Exception as e:
             self.logger.error(f"Error marcando mensaje {message_id} como leído: {e}")
 
@@ -0,0 +1,63 @@
+"""
+Pool de hilos para el trabajo bloqueante de los monitores
+imaplib y SQLAlchemy son síncronos: las descargas IMAP y las escrituras en
+la base de datos de cada ciclo se ejecutan aquí para que el event loop siga
+atendiendo las peticiones de FastAPI mientras se procesa un lote de correos.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from loguru import logger
+
+from config import settings
+from src.metrics import metrics_registry
+
+
+class BlockingIOPool:
+    """Ejecuta funciones bloqueantes en un ThreadPoolExecutor propio"""
+
+    def __init__(self, max_workers: int = 4, name: str = "monitor-io"):
+        """
+        Args:
+            max_workers: Número de hilos
+            name: Prefijo del nombre de los hilos
+        """
+        self.max_workers = max_workers
+        self.name = name
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.logger = logger.bind(module="BlockingIOPool")
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Crea el pool de hilos la primera vez que se necesita"""
+        if self._executor is None:
+            self.logger.info(f"Iniciando pool de E/S con {self.max_workers} hilos")
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix=self.name
+            )
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Ejecuta func(*args, **kwargs) en un hilo del pool y espera el resultado
+
+        La duración (incluida la espera por un hilo libre) se registra en la
+        etapa "io_<función>" de las métricas.
+        """
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kwargs)
+        with metrics_registry.timer(f"io_{getattr(func, '__name__', 'llamada')}"):
+            return await loop.run_in_executor(self._get_executor(), call)
+
+    def shutdown(self):
+        """Detiene el pool sin esperar las tareas en curso"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self.logger.info("Pool de E/S detenido")
+
+
+# Instancia global compartida por los monitores
+monitor_io_pool = BlockingIOPool(max_workers=settings.monitor_io_workers)
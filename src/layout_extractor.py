@@ -0,0 +1,163 @@
+"""
+Índice espacial de palabras para extracción basada en layout
+Agrupa las palabras de pdfplumber (page.extract_words) en filas según su
+posición vertical y resuelve pares etiqueta/valor leyendo, en la misma fila,
+las palabras a la derecha de la etiqueta
+"""
+from typing import Dict, List, Optional, Sequence, Tuple, Any
+
+# Tolerancia vertical (puntos) para considerar dos palabras en la misma fila
+ROW_TOLERANCE = 3.0
+
+# Etiquetas de campos clave/valor: campo -> variantes de secuencias de palabras
+LABELS: Dict[str, List[Tuple[str, ...]]] = {
+    'id_reserva': [('id:',)],
+    'loc_interno': [('loc', 'interno:')],
+    'localizador': [('localizador:',)],
+    'agencia': [('agencia:',)],
+    'fecha_emision': [('fecha', 'emision:')],
+    'telefono_hotel': [('teléfono:',)],
+    'fecha_checkin': [('check', 'in:')],
+    'fecha_checkout': [('check', 'out:')],
+    'hora_llegada': [('hora', 'llegada:')],
+    'hora_salida': [('hora', 'salida:')],
+    'numero_noches': [('noches:',)],
+    'numero_habitaciones': [('habitaciones:',)],
+    'monto_total': [
+        ('total:',),
+        ('monto', 'total:'),
+        ('monto:',),
+        ('total', 'a', 'pagar:'),
+        ('precio', 'total:'),
+    ],
+}
+
+
+# Etiquetas por su primera palabra, en el orden de LABELS: las de una sola
+# palabra se comparan por prefijo (el valor puede venir pegado) y las demás
+# por igualdad de la primera palabra
+_SINGLE_WORD_LABELS: List[Tuple[int, str, Tuple[str, ...]]] = []
+_LABELS_BY_FIRST_WORD: Dict[str, List[Tuple[int, str, Tuple[str, ...]]]] = {}
+for _order, (_field, _label) in enumerate(
+    (field, label) for field, labels in LABELS.items() for label in labels
+):
+    if len(_label) == 1:
+        _SINGLE_WORD_LABELS.append((_order, _field, _label))
+    else:
+        _LABELS_BY_FIRST_WORD.setdefault(_label[0], []).append((_order, _field, _label))
+
+
+def _candidate_labels(word: str) -> List[Tuple[int, str, Tuple[str, ...]]]:
+    """Etiquetas que pueden comenzar en una palabra (en minúsculas), en el orden de LABELS"""
+    candidates = [entry for entry in _SINGLE_WORD_LABELS if word.startswith(entry[2][0])]
+    candidates.extend(_LABELS_BY_FIRST_WORD.get(word, ()))
+    candidates.sort()
+    return candidates
+
+
+class WordIndex:
+    """Palabras de una o más páginas agrupadas en filas ordenadas"""
+
+    def __init__(self):
+        self.rows: List[List[Dict[str, Any]]] = []
+        self._hits: Optional[Dict[str, Tuple[int, int, str]]] = None
+        self._label_starts = set()
+
+    def add_page(self, words: Sequence[Dict[str, Any]]):
+        """
+        Agrega las palabras de una página (salida de page.extract_words)
+
+        Las filas se forman agrupando palabras cuyo borde inferior difiere
+        en menos de ROW_TOLERANCE; dentro de cada fila se ordenan por x0.
+        """
+        page_rows: List[List[Dict[str, Any]]] = []
+        for word in sorted(words, key=lambda w: w['bottom']):
+            if page_rows and word['bottom'] - page_rows[-1][0]['bottom'] <= ROW_TOLERANCE:
+                page_rows[-1].append(word)
+            else:
+                page_rows.append([word])
+
+        for row in page_rows:
+            row.sort(key=lambda w: w['x0'])
+            self.rows.append(row)
+
+        # Invalidar el índice de etiquetas
+        self._hits = None
+
+    def text(self) -> str:
+        """Reconstruye el texto, una fila por línea"""
+        return "".join(" ".join(w['text'] for w in row) + "\n" for row in self.rows)
+
+    def _match_label(self, row: List[Dict[str, Any]], start: int, label: Tuple[str, ...]) -> Optional[Tuple[int, str]]:
+        """
+        Verifica si la etiqueta comienza en row[start]
+
+        Returns:
+            (índice de la primera palabra del valor, resto pegado a la etiqueta)
+            o None si no coincide
+        """
+        if start + len(label) > len(row):
+            return None
+
+        for offset, token in enumerate(label[:-1]):
+            if row[start + offset]['text'].lower() != token:
+                return None
+
+        last = row[start + len(label) - 1]['text']
+        if not last.lower().startswith(label[-1]):
+            return None
+
+        # Valor pegado a la etiqueta, ej: "Teléfono:56233520700"
+        return start + len(label), last[len(label[-1]):]
+
+    def _scan(self) -> Dict[str, Tuple[int, int, str]]:
+        """
+        Recorre todas las palabras una vez y registra dónde comienza cada etiqueta
+
+        Returns:
+            campo -> (fila, índice de la primera palabra del valor, resto pegado)
+            para la primera aparición de cada campo
+        """
+        if self._hits is not None:
+            return self._hits
+
+        self._hits = {}
+        self._label_starts = set()
+        for row_idx, row in enumerate(self.rows):
+            for start, word in enumerate(row):
+                if word['text'].endswith(':'):
+                    self._label_starts.add((row_idx, start))
+                for _, field, label in _candidate_labels(word['text'].lower()):
+                    match = self._match_label(row, start, label)
+                    if match is None:
+                        continue
+                    self._label_starts.add((row_idx, start))
+                    if field not in self._hits:
+                        self._hits[field] = (row_idx, match[0], match[1])
+        return self._hits
+
+    def lookup(self, field: str) -> Optional[str]:
+        """
+        Busca el valor de un campo: palabras a la derecha de su etiqueta,
+        en la misma fila, hasta la siguiente etiqueta
+
+        Returns:
+            Texto del valor (primera aparición) o None
+        """
+        hit = self._scan().get(field)
+        if hit is None:
+            return None
+
+        row_idx, value_start, glued = hit
+        row = self.rows[row_idx]
+        parts = [glued] if glued else []
+        for i in range(value_start, len(row)):
+            if (row_idx, i) in self._label_starts:
+                break
+            parts.append(row[i]['text'])
+
+        return " ".join(parts) if parts else None
+
+    def has_fields(self, fields: Sequence[str]) -> bool:
+        """Indica si todas las etiquetas de los campos tienen valor"""
+        return all(self.lookup(field) is not None for field in fields)
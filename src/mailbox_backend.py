@@ -0,0 +1,796 @@
+"""
+Buzones de los que leen los monitores de correo
+MailboxBackend define lo que necesita EmailMonitor de un buzón: correos
+nuevos con sus adjuntos PDF, descarga de correos de la cola diferida,
+marcado como leído y espera hasta el próximo ciclo. GraphBackend (Graph API,
+por defecto) lee con messages/delta y baja solo los adjuntos PDF con
+/attachments/{id}/$value; IMAPBackend (deprecado, USE_GRAPH_API=false)
+conserva la sincronización por UID, la descarga por secciones e IDLE.
+"""
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from email.utils import formataddr, format_datetime
+from itertools import chain
+from typing import List, Optional, Dict, Any, Iterator, Set, Tuple
+
+from loguru import logger
+
+from config import settings
+from database import SincronizacionBuzon, get_db
+from src.graph_delta_sync import GraphDeltaSync
+from src.graph_email_client import GraphEmailClient
+from src.imap_parser import is_pdf_part
+from src.imap_pool import imap_pool
+from src.imap_wrapper import SimpleIMAPClient
+from src.metrics import metrics_registry
+
+
+class MailboxBackend(ABC):
+    """
+    Buzón de un monitor
+
+    El monitor aporta MONITOR_NAME (dueño del estado de sincronización),
+    is_candidate(asunto, remitente), defer(id, motivo) y la cola `deferred`.
+    Los métodos son bloqueantes: el monitor los ejecuta en monitor_io_pool
+    tomando `lock`, que serializa el uso de la conexión.
+    """
+
+    MAX_FETCH_ATTEMPTS = 3
+
+    def __init__(self, monitor: Any):
+        self.monitor = monitor
+        self.lock = asyncio.Lock()
+
+    @property
+    @abstractmethod
+    def connected(self) -> bool:
+        """Hay una conexión utilizable con el buzón"""
+
+    @abstractmethod
+    def connect(self) -> bool:
+        """Conecta el buzón; False si falla"""
+
+    @abstractmethod
+    def disconnect(self):
+        """Libera la conexión"""
+
+    @abstractmethod
+    def check_new_emails(self) -> List[Dict[str, Any]]:
+        """
+        Correos llegados desde el último ciclo que pasan is_candidate()
+
+        Returns:
+            Correos con el formato de los monitores: uid, subject, from, to,
+            date, body_text, body_html y attachments (solo PDF, con
+            filename, content y size)
+        """
+
+    @abstractmethod
+    def fetch_deferred(self, message_id: Any) -> Optional[Dict[str, Any]]:
+        """Descarga un correo de la cola diferida, sin límite de tamaño"""
+
+    @abstractmethod
+    def requeue(self, message_id: Any):
+        """
+        Vuelve a entregar un correo en un ciclo posterior
+
+        Para correos ya entregados por check_new_emails() que el monitor no
+        pudo procesar ni enviar a la cola diferida (cola llena).
+        """
+
+    @abstractmethod
+    def mark_as_read(self, message_id: Any):
+        """Marca un correo como leído"""
+
+    def mark_many_as_read(self, message_ids: List[Any]):
+        for message_id in message_ids:
+            self.mark_as_read(message_id)
+
+    def interrupt_wait(self):
+        """Libera la conexión si wait_for_mail() la tiene tomada"""
+
+    async def wait_for_mail(self, interval: int):
+        """Espera hasta el próximo ciclo de revisión"""
+        await asyncio.sleep(interval)
+
+
+class GraphBackend(MailboxBackend):
+    """
+    Buzón de Office 365 por Microsoft Graph API
+
+    Cada ciclo pide a messages/delta solo los cambios desde el ciclo
+    anterior y filtra por asunto/remitente con los metadatos del listado.
+    De los candidatos se piden, en un $batch, el cuerpo en texto y los
+    metadatos de sus adjuntos; luego, en otro $batch, el contenido de los
+    PDF con /attachments/{id}/$value. Nunca se descarga el MIME completo.
+
+    Cada candidato queda pendiente desde que llega en el delta hasta que
+    se descarga, y los pendientes (descargas fallidas, que se reintentan
+    hasta MAX_FETCH_ATTEMPTS veces, y la cola diferida) se guardan en
+    sincronizacion_graph junto con el deltaLink: tras un reinicio vuelven
+    a sus colas, igual que IMAP no avanza la marca más allá del correo
+    diferido más antiguo.
+    """
+
+    def __init__(
+        self,
+        monitor: Any,
+        mailbox_email: str,
+        folder: str = "inbox",
+        client: Optional[GraphEmailClient] = None
+    ):
+        """
+        Args:
+            monitor: Monitor dueño del buzón
+            mailbox_email: Buzón de Office 365
+            folder: Carpeta a revisar
+            client: Cliente de Graph; por defecto uno con las credenciales de AZURE_*
+        """
+        super().__init__(monitor)
+        self.mailbox_email = mailbox_email
+        self.client = client or GraphEmailClient(
+            client_id=settings.azure_client_id,
+            client_secret=settings.azure_client_secret,
+            tenant_id=settings.azure_tenant_id,
+            mailbox_email=mailbox_email
+        )
+        self.sync = GraphDeltaSync(
+            self.client, folder=folder, monitor=monitor.MONITOR_NAME, pending=self._pending_state
+        )
+        # id -> (mensaje del delta, intentos fallidos)
+        self.pending: Dict[str, Tuple[Dict[str, Any], int]] = {}
+        # Mensajes del delta entregados en el último ciclo, por si el monitor los devuelve
+        self._delivered: Dict[str, Dict[str, Any]] = {}
+        self._restored = False
+        self._connected = False
+        self.logger = logger.bind(module="GraphBackend", account=mailbox_email)
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    def connect(self) -> bool:
+        """Autentica con Azure AD y verifica el acceso al buzón"""
+        try:
+            self.client.connect()
+            self._connected = True
+            return True
+        except Exception as e:
+            self.logger.error(f"❌ Error conectando a Graph API: {e}")
+            self._connected = False
+            return False
+
+    def disconnect(self):
+        self.client.disconnect()
+        self._connected = False
+        self.logger.info("Desconectado de Graph API")
+
+    def check_new_emails(self) -> List[Dict[str, Any]]:
+        if not self.connected and not self.connect():
+            return []
+
+        try:
+            if not self._restored:
+                self._restore_pending()
+
+            # Los candidatos quedan pendientes antes de que termine la ronda, de
+            # modo que se guardan junto con el nuevo deltaLink
+            for message in self.sync.new_messages():
+                if self._is_candidate_message(message):
+                    self.pending.setdefault(message['id'], (message, 0))
+        except Exception as e:
+            self.logger.error(f"Error consultando cambios del buzón: {e}")
+
+        mensajes = {message_id: message for message_id, (message, _) in self.pending.items()}
+        if not mensajes:
+            return []
+
+        max_bytes = settings.imap_max_message_bytes or None
+        emails_data = []
+        revisados = set()
+        self._delivered = {}
+        try:
+            for message_id, email_data in self._download(list(mensajes), max_bytes):
+                revisados.add(message_id)
+                if email_data is None:
+                    self._retry_later(mensajes[message_id])
+                    continue
+
+                self.pending.pop(message_id, None)
+                if not email_data.get('oversized'):
+                    emails_data.append(email_data)
+                    self._delivered[message_id] = mensajes[message_id]
+                elif not self.monitor.defer(message_id, "mensaje"):
+                    # Cola diferida llena: se vuelve a intentar en el próximo ciclo
+                    self.pending[message_id] = (mensajes[message_id], 0)
+        except Exception as e:
+            self.logger.error(f"Error descargando correos: {e}")
+            for message_id in set(mensajes) - revisados:
+                self._retry_later(mensajes[message_id])
+        else:
+            # Los no entregados por _download no tienen PDF: no se reintentan
+            for message_id in set(mensajes) - revisados:
+                self.pending.pop(message_id, None)
+
+        self.sync.save_pending()
+        return emails_data
+
+    def _pending_state(self) -> Dict[str, Any]:
+        """Reintentos y cola diferida, en JSON, para guardarlos con el deltaLink"""
+        return {
+            'reintentos': {message_id: [message, intentos] for message_id, (message, intentos) in self.pending.items()},
+            'diferidos': [[uid, reason] for uid, reason in self.monitor.deferred],
+        }
+
+    def _restore_pending(self):
+        """Devuelve a sus colas los pendientes guardados antes de un reinicio"""
+        guardado = self.sync.saved_pending()
+        for message_id, (message, intentos) in guardado.get('reintentos', {}).items():
+            self.pending.setdefault(message_id, (message, intentos))
+        for uid, reason in guardado.get('diferidos', []):
+            if not self.monitor.defer(uid, reason):
+                self.pending.setdefault(uid, ({'id': uid}, 0))
+        if guardado.get('reintentos') or guardado.get('diferidos'):
+            self.logger.info(
+                f"Pendientes retomados: {len(guardado.get('reintentos', {}))} descargas, "
+                f"{len(guardado.get('diferidos', []))} diferidos"
+            )
+        self._restored = True
+
+    def _is_candidate_message(self, message: Dict[str, Any]) -> bool:
+        """Decide con los campos del delta si vale la pena pedir el correo"""
+        subject = message.get('subject') or ''
+        if not self.monitor.is_candidate(subject, _address(message.get('from'))):
+            metrics_registry.increment("correos_descartados", "asunto_remitente")
+            self.logger.debug(f"Correo descartado por encabezados: {subject}")
+            return False
+
+        if not message.get('hasAttachments'):
+            metrics_registry.increment("correos_descartados", "sin_pdf")
+            self.logger.debug(f"Correo sin adjuntos: {subject}")
+            return False
+
+        return True
+
+    def _retry_later(self, message: Dict[str, Any]):
+        """Registra una descarga fallida; tras MAX_FETCH_ATTEMPTS el correo se omite"""
+        _, intentos = self.pending.get(message['id'], (message, 0))
+        intentos += 1
+        if intentos >= self.MAX_FETCH_ATTEMPTS:
+            self.logger.error(f"Correo {message.get('subject')} omitido tras {intentos} intentos fallidos")
+            self.pending.pop(message['id'], None)
+            return
+        self.pending[message['id']] = (message, intentos)
+
+    def _download(
+        self,
+        message_ids: List[str],
+        max_bytes: Optional[int] = None
+    ) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        Descarga cuerpo y adjuntos PDF de varios correos
+
+        Args:
+            message_ids: Correos a descargar
+            max_bytes: Tamaño máximo de los PDF de un correo; un correo mayor
+                       se entrega con 'oversized': True sin bajar su contenido
+
+        Yields:
+            (id, datos del correo o None si la descarga falló); los correos
+            sin adjuntos PDF no se entregan
+        """
+        mensajes = self.client.get_many_messages(message_ids)
+
+        por_descargar = {}
+        for message_id in message_ids:
+            message = mensajes.get(message_id)
+            if message is None:
+                yield message_id, None
+                continue
+
+            pdfs = [att for att in message.get('attachments', []) if _is_pdf_attachment(att)]
+            if not pdfs:
+                metrics_registry.increment("correos_descartados", "sin_pdf")
+                self.logger.debug(f"Correo sin adjuntos PDF: {message.get('subject')}")
+                continue
+
+            size = sum(att.get('size') or 0 for att in pdfs)
+            if max_bytes and size > max_bytes:
+                self.logger.warning(
+                    f"Correo {message.get('subject')} con {size} bytes en PDF: se procesará en la cola diferida"
+                )
+                yield message_id, {'uid': message_id, 'subject': message.get('subject'), 'oversized': True}
+                continue
+
+            por_descargar[message_id] = (message, pdfs)
+
+        contenidos = self.client.get_many_attachment_contents([
+            (message_id, att['id']) for message_id, (_, pdfs) in por_descargar.items() for att in pdfs
+        ])
+
+        for message_id, (message, pdfs) in por_descargar.items():
+            attachments = []
+            for att in pdfs:
+                content = contenidos.get((message_id, att['id']))
+                if content is None:
+                    break
+                attachments.append({'filename': att['name'], 'content': content, 'size': len(content)})
+            else:
+                yield message_id, self._email_data(message, attachments)
+                continue
+            yield message_id, None
+
+    def _email_data(self, message: Dict[str, Any], attachments: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Datos del correo para los monitores"""
+        subject = message.get('subject') or ''
+        from_address = _address(message.get('from'))
+
+        self.logger.info(f"Procesando correo: {subject} de {from_address}")
+        for att in attachments:
+            self.logger.info(f"  📎 Adjunto PDF: {att['filename']} ({att['size']} bytes)")
+
+        body = message.get('body') or {}
+        received = message.get('receivedDateTime')
+        return {
+            'uid': message['id'],
+            'subject': subject,
+            'from': from_address,
+            'to': ", ".join(_address(r) for r in message.get('toRecipients', [])),
+            'date': format_datetime(datetime.fromisoformat(received.replace('Z', '+00:00'))) if received else None,
+            'body_text': body.get('content', '') if body.get('contentType') == 'text' else '',
+            'body_html': body.get('content', '') if body.get('contentType') == 'html' else '',
+            'attachments': attachments
+        }
+
+    def fetch_deferred(self, message_id: str) -> Optional[Dict[str, Any]]:
+        return dict(self._download([message_id])).get(message_id)
+
+    def requeue(self, message_id: str):
+        """Vuelve a dejar el correo pendiente (se guarda con el deltaLink) para el próximo ciclo"""
+        if message_id in self.pending:
+            return
+        message = self._delivered.get(message_id, {'id': message_id})
+        self.pending[message_id] = (message, 0)
+        self.logger.warning(f"Correo {message.get('subject') or message_id} devuelto por el monitor: se reintentará")
+        self.sync.save_pending()
+
+    def mark_as_read(self, message_id: str):
+        self.client.mark_as_read(message_id)
+
+    def mark_many_as_read(self, message_ids: List[str]):
+        """Un $batch cada 20 correos en lugar de un PATCH por correo"""
+        if message_ids:
+            self.client.mark_many_as_read(message_ids)
+
+
+def _address(recipient: Optional[Dict[str, Any]]) -> str:
+    """emailAddress de Graph como "Nombre <correo>" """
+    email_address = (recipient or {}).get('emailAddress') or {}
+    return formataddr((email_address.get('name') or '', email_address.get('address') or ''))
+
+
+def _is_pdf_attachment(attachment: Dict[str, Any]) -> bool:
+    """Adjunto de archivo con nombre .pdf (los adjuntos de elemento no tienen $value de archivo)"""
+    if attachment.get('@odata.type', '#microsoft.graph.fileAttachment') != '#microsoft.graph.fileAttachment':
+        return False
+    return (attachment.get('name') or '').lower().endswith('.pdf')
+
+
+class IMAPBackend(MailboxBackend):
+    """
+    Buzón IMAP (deprecado: usar Graph API)
+
+    La conexión viene de imap_pool y se comparte con otro monitor que use
+    el mismo buzón; mientras dura IDLE queda tomada en un hilo aparte.
+    """
+
+    def __init__(
+        self,
+        monitor: Any,
+        host: str,
+        port: int,
+        username: str,
+        password: str,
+        mailbox: str = "INBOX",
+        use_ssl: bool = True
+    ):
+        super().__init__(monitor)
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.mailbox = mailbox
+        self.use_ssl = use_ssl
+        self.logger = logger.bind(module="IMAPBackend", account=username)
+        self.client: Optional[SimpleIMAPClient] = None
+        # Sincronización por UID: se carga desde sincronizacion_buzones en el primer ciclo
+        self.uidvalidity: Optional[int] = None
+        self.last_uid: int = 0
+        self._sync_loaded = False
+        # UID que falló al descargarse y número de intentos (se reintenta en el siguiente ciclo)
+        self._failed_uid: Optional[int] = None
+        self._failed_attempts = 0
+        # UIDs bajo la marca devueltos por el monitor con requeue(): se vuelven a pedir
+        self._requeued: Set[int] = set()
+        # La cola diferida activa _idle_stop y espera el lock para usar la conexión
+        self._idle_stop = threading.Event()
+
+    @property
+    def connected(self) -> bool:
+        return bool(self.client and self.client.connected)
+
+    def connect(self) -> bool:
+        """
+        Obtiene la conexión IMAP del pool
+
+        La conexión es persistente y se comparte con otro monitor que use
+        el mismo buzón; si falla, el cliente reconecta con backoff.
+        """
+        try:
+            if self.client is None:
+                self.logger.info(f"Conectando a {self.host}:{self.port}")
+                self.client = imap_pool.acquire(
+                    host=self.host,
+                    port=self.port,
+                    username=self.username,
+                    password=self.password,
+                    mailbox=self.mailbox,
+                    use_ssl=self.use_ssl
+                )
+
+            if not self.client.ensure_connected():
+                return False
+
+            self.logger.info("✅ Conexión IMAP establecida")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"❌ Error conectando a IMAP: {e}")
+            import traceback
+            self.logger.debug(traceback.format_exc())
+            return False
+
+    def disconnect(self):
+        """Libera la conexión IMAP (se cierra si ningún otro monitor la usa)"""
+        self._idle_stop.set()
+        if self.client:
+            try:
+                imap_pool.release(self.client)
+                self.client = None
+                self.logger.info("Desconectado de IMAP")
+            except Exception as e:
+                self.logger.error(f"Error al desconectar: {e}")
+
+    def check_new_emails(self) -> List[Dict[str, Any]]:
+        """
+        Obtiene los correos llegados desde el último ciclo
+
+        Usa UID SEARCH UID n:* desde el último UID registrado en
+        sincronizacion_buzones, de modo que tras un reinicio solo se
+        descargan correos realmente nuevos. Sin estado previo, o si cambió
+        UIDVALIDITY, se procesan los no leídos y se parte desde UIDNEXT.
+        Los correos devueltos con requeue() se vuelven a pedir primero.
+
+        Si un correo falla al descargarse (hasta MAX_FETCH_ATTEMPTS veces) o
+        la cola diferida lo rechaza por estar llena, el ciclo se detiene en
+        él: la marca no avanza más allá y, en la sincronización inicial, esta
+        se repite completa en el próximo ciclo.
+
+        La descarga es en dos fases: ENVELOPE/BODYSTRUCTURE de todos los
+        UIDs en un solo FETCH y luego el contenido solo de los correos que
+        pasan is_candidate() y traen algún PDF, en lotes de
+        IMAP_FETCH_BATCH_SIZE mensajes por comando.
+
+        Returns:
+            Lista de diccionarios con información de correos nuevos
+        """
+        if not self.client or not self.client.connected:
+            if not self.connect():
+                return []
+
+        try:
+            if not self._sync_loaded:
+                self._load_sync_state()
+
+            validity = self.client.uidvalidity
+            inicial = self.uidvalidity is None or validity != self.uidvalidity
+            previo = (self.uidvalidity, self.last_uid)
+            if inicial:
+                if self.uidvalidity is not None:
+                    self.logger.warning(
+                        f"UIDVALIDITY cambió ({self.uidvalidity} -> {validity}): se reinicia la sincronización"
+                    )
+                messages = self.client.search_unseen()
+                self.uidvalidity = validity
+                # Los UID devueltos eran del UIDVALIDITY anterior; si siguen no leídos vienen en SEARCH UNSEEN
+                self._requeued.clear()
+                # Los no leídos ya existentes se procesan; la marca parte desde el último UID del buzón
+                self.last_uid = self.client.uidnext - 1 if self.client.uidnext else max(messages, default=0)
+                self.logger.info(f"Sincronización inicial: {len(messages)} correos no leídos, UID base {self.last_uid}")
+            else:
+                messages = self.client.search_since_uid(self.last_uid + 1)
+                self.logger.info(f"Encontrados {len(messages)} correos nuevos desde UID {self.last_uid}")
+                if self._requeued:
+                    self.logger.info(f"Reintentando {len(self._requeued)} correos devueltos por el monitor")
+                    messages = sorted(self._requeued) + [uid for uid in messages if uid not in self._requeued]
+
+            # Fase 1: encabezados y estructura de todos en un solo FETCH;
+            # fase 2: contenido solo de los correos que pasan el filtro, en lotes
+            max_bytes = settings.imap_max_message_bytes or None
+            envelopes = self.client.fetch_envelopes(messages)
+            candidatos = {uid for uid in messages if uid in envelopes and self._is_candidate_envelope(envelopes[uid])}
+            en_lote = {
+                uid for uid in candidatos
+                if not (max_bytes and envelopes[uid]['size'] and envelopes[uid]['size'] > max_bytes)
+            }
+            descargados = dict(self._fetch_emails(sorted(en_lote), envelopes))
+
+            emails_data = []
+            high_water = self.last_uid
+            detenido = False
+            for uid in messages:
+                if uid in envelopes and uid not in candidatos:
+                    self._requeued.discard(uid)
+                    high_water = max(high_water, uid)
+                    continue
+
+                if uid in descargados:
+                    email_data = descargados[uid]
+                elif uid in en_lote:
+                    email_data = None  # No vino en la respuesta del lote
+                elif uid in envelopes:
+                    # Tamaño conocido de la fase 1: a la cola diferida sin otro FETCH
+                    email_data = {'uid': uid, 'subject': envelopes[uid]['subject'], 'oversized': True}
+                    self.logger.warning(
+                        f"Correo {envelopes[uid]['subject']} de {envelopes[uid]['size']} bytes: "
+                        f"se procesará en la cola diferida"
+                    )
+                else:
+                    # Fase 1 falló para este UID: descarga individual con control de tamaño
+                    email_data = self._fetch_email(uid, max_bytes)
+
+                # No se avanza la marca más allá de un correo pendiente: se
+                # retoma desde ese UID en el próximo ciclo
+                if not email_data:
+                    if self._retry_later(uid):
+                        detenido = True
+                        break
+                elif email_data.get('oversized'):
+                    if not self.monitor.defer(uid, "mensaje"):
+                        detenido = True
+                        break
+                else:
+                    emails_data.append(email_data)
+
+                self._requeued.discard(uid)
+                high_water = max(high_water, uid)
+
+            if inicial and detenido:
+                # La marca de la sincronización inicial (UIDNEXT) ya supera a los
+                # no leídos pendientes: no se guarda y se repite en el próximo ciclo
+                self.uidvalidity, self.last_uid = previo
+                return emails_data
+
+            self._save_sync_state(high_water)
+            return emails_data
+
+        except Exception as e:
+            self.logger.error(f"Error verificando correos: {e}")
+            return []
+
+    def _is_candidate_envelope(self, envelope: Dict[str, Any]) -> bool:
+        """Decide con ENVELOPE/BODYSTRUCTURE si vale la pena descargar el correo"""
+        if not self.monitor.is_candidate(envelope['subject'], envelope['from']):
+            metrics_registry.increment("correos_descartados", "asunto_remitente")
+            self.logger.debug(f"Correo descartado por encabezados: {envelope['subject']}")
+            return False
+
+        if envelope['parts'] and not any(is_pdf_part(part) for part in envelope['parts']):
+            metrics_registry.increment("correos_descartados", "sin_pdf")
+            self.logger.debug(f"Correo sin adjuntos PDF: {envelope['subject']}")
+            return False
+
+        return True
+
+    def _retry_later(self, uid: int) -> bool:
+        """
+        Registra una descarga fallida
+
+        Returns:
+            True si el UID debe reintentarse en el próximo ciclo; tras
+            MAX_FETCH_ATTEMPTS fallos seguidos se omite para no bloquear el buzón
+        """
+        if uid != self._failed_uid:
+            self._failed_uid = uid
+            self._failed_attempts = 0
+        self._failed_attempts += 1
+
+        if self._failed_attempts >= self.MAX_FETCH_ATTEMPTS:
+            self.logger.error(f"Correo UID {uid} omitido tras {self._failed_attempts} intentos fallidos")
+            self._failed_uid = None
+            return False
+        return True
+
+    def _load_sync_state(self):
+        """Carga UIDVALIDITY y último UID del buzón desde la base de datos"""
+        db = next(get_db())
+        try:
+            estado = db.query(SincronizacionBuzon).filter_by(
+                host=self.host, usuario=self.username, carpeta=self.mailbox,
+                monitor=self.monitor.MONITOR_NAME
+            ).first()
+            if estado:
+                self.uidvalidity = estado.uidvalidity
+                self.last_uid = estado.ultimo_uid
+                self.logger.info(f"Sincronización retomada desde UID {self.last_uid}")
+            self._sync_loaded = True
+        finally:
+            db.close()
+
+    def _save_sync_state(self, last_uid: int):
+        """
+        Registra el último UID procesado
+
+        En la base de datos se guarda como máximo el UID anterior al correo
+        más antiguo de la cola diferida o de los devueltos con requeue(),
+        que viven en memoria: tras un reinicio esos correos se vuelven a
+        descargar.
+        """
+        self.last_uid = last_uid
+        if self.uidvalidity is None:
+            return
+
+        persistido = last_uid
+        pendientes = self._requeued.union(uid for uid, _ in self.monitor.deferred)
+        if pendientes:
+            persistido = min(last_uid, min(pendientes) - 1)
+
+        monitor_name = self.monitor.MONITOR_NAME
+        db = next(get_db())
+        try:
+            estado = db.query(SincronizacionBuzon).filter_by(
+                host=self.host, usuario=self.username, carpeta=self.mailbox, monitor=monitor_name
+            ).first()
+            if estado is None:
+                estado = SincronizacionBuzon(
+                    host=self.host, usuario=self.username, carpeta=self.mailbox, monitor=monitor_name
+                )
+                db.add(estado)
+            elif estado.uidvalidity == self.uidvalidity and estado.ultimo_uid == persistido:
+                return
+
+            estado.uidvalidity = self.uidvalidity
+            estado.ultimo_uid = persistido
+            db.commit()
+        finally:
+            db.close()
+
+    def _fetch_email(self, uid: int, max_bytes: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene los datos completos de un correo
+
+        Args:
+            uid: UID del mensaje
+            max_bytes: Tamaño máximo a descargar; un correo mayor retorna solo
+                       encabezados con 'oversized': True
+
+        Returns:
+            Diccionario con datos del correo y adjuntos
+        """
+        try:
+            # Usar el wrapper simple
+            email_data = self.client.fetch_message(uid, max_bytes)
+
+            if not email_data:
+                return None
+
+            if email_data.get('oversized'):
+                self.logger.warning(
+                    f"Correo {email_data['subject']} de {email_data['size']} bytes: se procesará en la cola diferida"
+                )
+                return {'uid': uid, 'subject': email_data['subject'], 'oversized': True}
+
+            return self._email_data(uid, email_data)
+
+        except Exception as e:
+            self.logger.error(f"Error obteniendo correo UID {uid}: {e}")
+            return None
+
+    def _fetch_emails(self, uids: List[int], envelopes: Dict[int, Dict[str, Any]]) -> Iterator[tuple]:
+        """
+        Descarga varios correos con UID FETCH por lotes (IMAP_FETCH_BATCH_SIZE)
+
+        Con BODYSTRUCTURE conocido se bajan solo las secciones PDF y el texto
+        plano; sin estructura, el mensaje completo.
+
+        Yields:
+            (uid, datos del correo); los UIDs que fallan no se entregan
+        """
+        batch_size = settings.imap_fetch_batch_size
+        parciales = {uid: envelopes[uid] for uid in uids if envelopes.get(uid, {}).get('parts')}
+        completos = [uid for uid in uids if uid not in parciales]
+
+        for email_data in chain(
+            self.client.fetch_pdf_parts(parciales, batch_size),
+            self.client.fetch_messages(completos, batch_size)
+        ):
+            yield email_data['id'], self._email_data(email_data['id'], email_data)
+
+    def _email_data(self, uid: int, email_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Datos del correo para los monitores, solo con adjuntos PDF"""
+        subject = email_data['subject']
+        from_address = email_data['from']
+
+        self.logger.info(f"Procesando correo: {subject} de {from_address}")
+
+        # Filtrar solo adjuntos PDF
+        pdf_attachments = []
+        for att in email_data.get('attachments', []):
+            if att['filename'].lower().endswith('.pdf'):
+                pdf_attachments.append(att)
+                self.logger.info(f"  📎 Adjunto PDF: {att['filename']} ({att['size']} bytes)")
+
+        return {
+            'uid': uid,
+            'subject': subject,
+            'from': from_address,
+            'to': email_data.get('to', ''),
+            'date': email_data.get('date'),
+            'body_text': email_data.get('body_text', ''),
+            'body_html': email_data.get('body_html', ''),
+            'attachments': pdf_attachments
+        }
+
+    def fetch_deferred(self, uid: int) -> Optional[Dict[str, Any]]:
+        """Descarga los PDF de un correo de la cola diferida (solo esas secciones)"""
+        envelopes = self.client.fetch_envelopes([uid])
+        return dict(self._fetch_emails([uid], envelopes)).get(uid)
+
+    def requeue(self, uid: int):
+        """Vuelve a pedir el UID en el próximo ciclo; la marca guardada queda por debajo de él"""
+        if uid in self._requeued:
+            return
+        self._requeued.add(uid)
+        self.logger.warning(f"Correo UID {uid} devuelto por el monitor: se reintentará en el próximo ciclo")
+        self._save_sync_state(self.last_uid)
+
+    def mark_as_read(self, uid: int):
+        """Marca un correo como leído"""
+        try:
+            self.client.mark_as_read(uid)
+        except Exception as e:
+            self.logger.error(f"Error marcando correo {uid} como leído: {e}")
+
+    def interrupt_wait(self):
+        self._idle_stop.set()
+
+    async def wait_for_mail(self, interval: int):
+        """
+        Espera hasta el próximo ciclo de revisión
+
+        Con IDLE el monitor despierta apenas el servidor anuncia un correo.
+        IDLE se renueva cada IMAP_IDLE_TIMEOUT segundos y cada renovación
+        también ejecuta un ciclo, como respaldo ante notificaciones perdidas.
+        Si el servidor no soporta IDLE o la conexión falla, espera `interval`.
+        """
+        if settings.imap_idle_enabled and self.client and self.client.supports_idle():
+            self._idle_stop.clear()
+            async with self.lock:
+                # IDLE es una espera larga: va al pool por defecto de asyncio y
+                # no ocupa los hilos de monitor_io_pool
+                new_mail = await asyncio.to_thread(
+                    self.client.idle, settings.imap_idle_timeout, self._idle_stop
+                )
+
+            if new_mail is not None:
+                metrics_registry.increment("imap_idle", "correo" if new_mail else "renovacion")
+                if new_mail:
+                    self.logger.debug("📬 IDLE: correo nuevo")
+                return
+
+            metrics_registry.increment("imap_idle", "polling")
+            self.logger.warning(f"⚠️ IDLE no disponible, próximo ciclo en {interval}s")
+
+        await asyncio.sleep(interval)
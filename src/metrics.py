@@ -0,0 +1,121 @@
+"""
+Registro de métricas en proceso
+Acumula duraciones por etapa y contadores etiquetados (ej: qué patrón de
+monto coincidió, qué campos faltaron) para exponerlos en /api/metrics.
+Los procesos del pool de extracción vacían su registro con drain() y el
+proceso principal lo incorpora con merge().
+"""
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Tuple
+
+# Cantidad de documentos más lentos que se conservan
+SLOWEST_DOCUMENTS = 10
+
+
+class MetricsRegistry:
+    """Duraciones por etapa, contadores por etiqueta y documentos más lentos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # etapa -> [cantidad, total_segundos, máximo_segundos]
+        self._timings: Dict[str, List[float]] = {}
+        # contador -> etiqueta -> valor
+        self._counters: Dict[str, Dict[str, int]] = {}
+        # (segundos, documento), ordenados de mayor a menor
+        self._slowest: List[Tuple[float, str]] = []
+
+    @contextmanager
+    def timer(self, stage: str):
+        """Mide la duración del bloque y la registra en la etapa indicada"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe(self, stage: str, seconds: float):
+        """Registra una duración para una etapa"""
+        with self._lock:
+            self._observe(stage, 1, seconds, seconds)
+
+    def _observe(self, stage: str, count: int, total: float, maximum: float):
+        stats = self._timings.setdefault(stage, [0, 0.0, 0.0])
+        stats[0] += count
+        stats[1] += total
+        stats[2] = max(stats[2], maximum)
+
+    def increment(self, name: str, label: str, amount: int = 1):
+        """Incrementa el contador name{label}"""
+        with self._lock:
+            counter = self._counters.setdefault(name, {})
+            counter[label] = counter.get(label, 0) + amount
+
+    def observe_document(self, document: str, seconds: float):
+        """Registra la duración total de un documento para el ranking de lentos"""
+        with self._lock:
+            self._add_slowest([(seconds, document)])
+
+    def _add_slowest(self, entries: List[Tuple[float, str]]):
+        self._slowest = sorted(self._slowest + list(entries), reverse=True)[:SLOWEST_DOCUMENTS]
+
+    def export(self) -> Dict[str, Any]:
+        """Copia cruda del registro, apta para enviar entre procesos"""
+        with self._lock:
+            return {
+                "timings": {stage: list(stats) for stage, stats in self._timings.items()},
+                "counters": {name: dict(counter) for name, counter in self._counters.items()},
+                "slowest": list(self._slowest),
+            }
+
+    def drain(self) -> Dict[str, Any]:
+        """Exporta el registro y lo deja vacío"""
+        with self._lock:
+            raw = {
+                "timings": self._timings,
+                "counters": self._counters,
+                "slowest": self._slowest,
+            }
+            self._timings, self._counters, self._slowest = {}, {}, []
+            return raw
+
+    def merge(self, raw: Dict[str, Any]):
+        """Incorpora un registro exportado por export() o drain()"""
+        with self._lock:
+            for stage, (count, total, maximum) in raw.get("timings", {}).items():
+                self._observe(stage, count, total, maximum)
+            for name, counter in raw.get("counters", {}).items():
+                target = self._counters.setdefault(name, {})
+                for label, value in counter.items():
+                    target[label] = target.get(label, 0) + value
+            if raw.get("slowest"):
+                self._add_slowest(tuple(entry) for entry in raw["slowest"])
+
+    def reset(self):
+        """Elimina todas las métricas acumuladas"""
+        self.drain()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Resumen legible: duraciones en milisegundos y contadores"""
+        raw = self.export()
+        return {
+            "duraciones_ms": {
+                stage: {
+                    "cantidad": count,
+                    "total": round(total * 1000, 3),
+                    "promedio": round(total / count * 1000, 3) if count else 0.0,
+                    "maximo": round(maximum * 1000, 3),
+                }
+                for stage, (count, total, maximum) in sorted(raw["timings"].items())
+            },
+            "contadores": raw["counters"],
+            "documentos_lentos": [
+                {"documento": document, "ms": round(seconds * 1000, 3)}
+                for seconds, document in raw["slowest"]
+            ],
+        }
+
+
+# Instancia global
+metrics_registry = MetricsRegistry()
@@ -0,0 +1,157 @@
+"""
+Procesador de documentos de orden de compra (OC)
+Guarda el PDF adjunto en almacenamiento direccionado por contenido
+(SHA-256) y extrae el número de OC y el monto total para cruzarlo con
+el monto de la reserva
+"""
+import io
+import os
+import re
+import hashlib
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+import pdfplumber
+import PyPDF2
+from loguru import logger
+
+from config import settings
+from src.amount_parser import parse_amount
+from src.metrics import metrics_registry
+
+# Número de OC, en orden de prioridad. El valor debe contener al menos un
+# dígito para no capturar la palabra siguiente ("Orden de Compra\nFecha").
+_NUMERO_OC_PATTERNS = [
+    re.compile(p, re.IGNORECASE) for p in (
+        r'\bOrden\s+de\s+Compra\s*(?:N[°º]\.?|Nro\.?|N[uú]mero|#)?\s*:?\s*((?=[A-Z0-9\-/]*\d)[A-Z0-9][A-Z0-9\-/]{2,})',
+        r'\bO\.?C\.?\s*(?:N[°º]\.?|Nro\.?|#|:)\s*:?\s*((?=[A-Z0-9\-/]*\d)[A-Z0-9][A-Z0-9\-/]{2,})',
+        r'\bPurchase\s+Order\s*(?:No\.?|Number|#)?\s*:?\s*((?=[A-Z0-9\-/]*\d)[A-Z0-9][A-Z0-9\-/]{2,})',
+    )
+]
+
+# Líneas de total: "Total: $ 528.701", "Total General CLP 528.701,00".
+# Se descartan los subtotales (Neto) y se usa la última coincidencia,
+# que en las OC corresponde al total final.
+_TOTAL_RE = re.compile(
+    r'\b(Sub\s*total|Total(?:\s+(?:General|a\s+Pagar|Neto|OC|Orden))?)\s*:?\s*(?:CLP)?\s*\$?\s*(\d[\d.,]*\d|\d)',
+    re.IGNORECASE
+)
+
+
+class OCProcessor:
+    """Almacena y extrae datos de los PDF de orden de compra"""
+
+    def __init__(self, storage_path: str, max_pages: int = 3):
+        """
+        Args:
+            storage_path: Directorio raíz del almacenamiento de OC
+            max_pages: Páginas a leer para buscar número y monto
+        """
+        self.storage_path = Path(storage_path)
+        self.max_pages = max_pages
+        self.logger = logger.bind(module="OCProcessor")
+
+    def store(self, pdf_bytes: bytes) -> str:
+        """
+        Guarda el PDF en <storage>/<sha[:2]>/<sha>.pdf
+
+        Un mismo archivo recibido dos veces se almacena una sola vez.
+
+        Returns:
+            Ruta del archivo almacenado
+        """
+        sha = hashlib.sha256(pdf_bytes).hexdigest()
+        destino = self.storage_path / sha[:2] / f"{sha}.pdf"
+
+        if not destino.exists():
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            # Escritura atómica: otro proceso nunca ve un archivo a medio escribir
+            tmp = destino.with_suffix(f".{os.getpid()}.tmp")
+            try:
+                tmp.write_bytes(pdf_bytes)
+                os.replace(tmp, destino)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+
+        return str(destino)
+
+    def _extract_text(self, pdf_bytes: bytes) -> str:
+        """Texto de las primeras páginas, con PyPDF2 como fallback"""
+        try:
+            with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+                return "\n".join(
+                    page.extract_text() or "" for page in pdf.pages[:self.max_pages]
+                )
+        except Exception as e:
+            self.logger.warning(f"pdfplumber falló con la OC, intentando con PyPDF2: {e}")
+            reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+            return "\n".join(
+                page.extract_text() or "" for page in reader.pages[:self.max_pages]
+            )
+
+    def parse(self, text: str) -> Dict[str, Any]:
+        """Extrae número de OC y monto total del texto"""
+        data: Dict[str, Any] = {'numero_oc': None, 'monto_oc': None}
+
+        for pattern in _NUMERO_OC_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                data['numero_oc'] = match.group(1)
+                break
+
+        totales: List[float] = [
+            monto for etiqueta, valor in _TOTAL_RE.findall(text)
+            if 'neto' not in etiqueta.lower() and 'sub' not in etiqueta.lower()
+            for monto in [parse_amount(valor)] if monto is not None
+        ]
+        if totales:
+            data['monto_oc'] = totales[-1]
+
+        return data
+
+    def process(self, pdf_bytes: bytes, filename: str = "oc.pdf") -> Optional[Dict[str, Any]]:
+        """
+        Almacena el PDF y extrae sus datos
+
+        Returns:
+            {'archivo_ruta', 'numero_oc', 'monto_oc'} o None si no se pudo guardar
+        """
+        try:
+            with metrics_registry.timer("oc_almacenamiento"):
+                ruta = self.store(pdf_bytes)
+        except Exception as e:
+            self.logger.error(f"Error guardando OC {filename}: {e}")
+            return None
+
+        data: Dict[str, Any] = {'archivo_ruta': ruta, 'numero_oc': None, 'monto_oc': None}
+        try:
+            with metrics_registry.timer("oc_extraccion"):
+                data.update(self.parse(self._extract_text(pdf_bytes)))
+        except Exception as e:
+            self.logger.error(f"Error extrayendo datos de OC {filename}: {e}")
+
+        for campo in ('numero_oc', 'monto_oc'):
+            if data[campo] is None:
+                metrics_registry.increment("oc_campo_no_encontrado", campo)
+
+        self.logger.info(
+            f"📄 OC {filename}: número={data['numero_oc']}, monto={data['monto_oc']}, ruta={ruta}"
+        )
+        return data
+
+    @staticmethod
+    def amounts_match(monto_oc: Optional[float], monto_reserva: Optional[float], tolerance_pct: float) -> Optional[bool]:
+        """
+        Compara el monto de la OC con el de la reserva
+
+        Returns:
+            True/False según la diferencia relativa, o None si falta algún monto
+        """
+        if monto_oc is None or not monto_reserva:
+            return None
+        return abs(monto_oc - monto_reserva) <= abs(monto_reserva) * tolerance_pct / 100
+
+
+# Instancia global
+oc_processor = OCProcessor(settings.oc_storage_path)
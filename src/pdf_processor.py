@@ -2,22 +2,234 @@
 Procesador de PDF para extraer información de reservas
 Extrae datos estructurados del PDF de resumen de servicios
 """
+import io
 import re
 import json
+import time
 from datetime import datetime
-from typing import Dict, Optional, List, Any
+from typing import BinaryIO, Dict, Iterable, Optional, List, Any
 from pathlib import Path
 import pdfplumber
 import PyPDF2
 from loguru import logger
 
+from config import settings
+from src.extraction_cache import ExtractionCache
+from src.layout_extractor import WordIndex
+from src.date_parser import parse_spanish_date
+from src.amount_parser import parse_amount
+from src.extraction_profiles import ExtractionProfile, extraction_profiles
+from src.metrics import metrics_registry
+
+# Versión de las reglas de extracción. Incrementar al modificar _parse_text
+# para invalidar los resultados almacenados en la caché de extracción.
+PARSER_VERSION = "7"
+
+# Primera versión que convierte bien los montos con coma decimal: antes
+# "528.701,00" se leía como 52870100
+MONTO_PARSER_VERSION = 7
+
+# Modos de extracción: "text" (texto plano + patrones) o "layout" (coordenadas de palabras)
+EXTRACTION_MODES = ("text", "layout")
+
+
+def amount_is_reliable(version_parser: Optional[str]) -> bool:
+    """El monto de una reserva leída con esta versión del parser sirve para cruzarlo con la OC"""
+    return bool(version_parser and version_parser.isdigit() and int(version_parser) >= MONTO_PARSER_VERSION)
+
+
+# Patrones de extracción, compilados una sola vez al importar el módulo
+_ID_RE = re.compile(r'ID:\s*(\d+)', re.IGNORECASE)
+_LOC_INTERNO_RE = re.compile(r'LOC\s+Interno:\s*([A-Z0-9]+)', re.IGNORECASE)
+_LOCALIZADOR_RE = re.compile(r'Localizador:\s*(\d+)', re.IGNORECASE)
+_AGENCIA_RE = re.compile(r'Agencia:\s*([^\n]+)', re.IGNORECASE)
+_FECHA_EMISION_RE = re.compile(r'Fecha\s+Emision:\s*([^\n]+)', re.IGNORECASE)
+_DIRECCION_RE = re.compile(r'Av\.\s+[^\n]+|[^\n]+,\s+\d+\s+[A-Za-z\s]+,')
+_TELEFONO_RE = re.compile(r'Teléfono:\s*(\d+)', re.IGNORECASE)
+_CHECKIN_RE = re.compile(
+    r'Check\s+In:\s*([a-záéíóú]+)\s+(\d+),\s+([a-záéíóú]+)\.?\s+(\d{4})',
+    re.IGNORECASE
+)
+_CHECKOUT_RE = re.compile(
+    r'Check\s+Out:\s*([a-záéíóú]+)\s+(\d+),\s+([a-záéíóú]+)\.?\s+(\d{4})',
+    re.IGNORECASE
+)
+_HORA_LLEGADA_RE = re.compile(r'Hora\s+Llegada:\s*(\d+:\d+\s*[AP]M)', re.IGNORECASE)
+_HORA_SALIDA_RE = re.compile(r'Hora\s+Salida:\s*(\d+:\d+\s*[AP]M)', re.IGNORECASE)
+_NOCHES_RE = re.compile(r'Noches:\s*(\d+)', re.IGNORECASE)
+_HABITACIONES_RE = re.compile(r'Habitaciones:\s*(\d+)', re.IGNORECASE)
+_OBSERVACIONES_RE = re.compile(
+    r'Observaciones\s*\n\s*([^\n]*)\s*Sin\s+notas\s+de\s+hotel\s+informadas\.\s*([^\n]*)',
+    re.IGNORECASE
+)
+_NOTAS_ASESOR_RE = re.compile(
+    r'Notas\s+del\s+asesor\s*\n\s*([^\n]*)\s*Sin\s+notas\s+del\s+asesor\s+informadas\.\s*([^\n]*)',
+    re.IGNORECASE
+)
+_HABITACION_RE = re.compile(
+    r'Habitación\s+(\d+)\s*‐\s*Categoría\s*‐\s*([^\‐]+)\‐\s*ADT/CHD:\s*(\d+)/(\d+)\s*‐\s*Plan\s+Alimentación:\s*([^\n]+)',
+    re.IGNORECASE
+)
+
+# Huéspedes listados bajo cada habitación: "ADT UNO PRUEBA" (tipo, nombre, apellidos)
+_HUESPED_RE = re.compile(r'^(ADT|CHD|INF)\s+(\S+)(?:[ \t]+([^\n]+))?$', re.MULTILINE)
+
+# Nombre del hotel: primera línea que contiene "Hotel", hasta el fin de línea o "Total:".
+# La búsqueda completa se ancla al inicio de la línea de la primera aparición de
+# "hotel" (ninguna posición anterior puede coincidir) para evitar probar el
+# prefijo perezoso desde cada carácter del documento.
+_HOTEL_KEYWORD_RE = re.compile(r'Hotel', re.IGNORECASE)
+_HOTEL_RE = re.compile(r'(.*?Hotel.*?)(?=\n|Total:)', re.IGNORECASE)
+
+# Límite de cancelación: "lunes, 24 de noviembre de 2025". Equivale a
+# '([a-záéíóú]+),\s+(\d+)...' pero la búsqueda parte desde la coma (prefijo
+# literal) y verifica el día de la semana con un lookbehind, en vez de
+# intentar la clase de caracteres desde cada posición.
+_CANCELACION_RE = re.compile(
+    r'(?<=[a-záéíóú]),\s+(\d+)\s+de\s+([a-záéíóú]+)\s+de\s+(\d{4})',
+    re.IGNORECASE
+)
+
+# Monto total - MÚLTIPLES FORMATOS SOPORTADOS, en orden de prioridad
+_MONTO_PATTERNS = [
+    re.compile(p, re.IGNORECASE) for p in (
+        r'Total:\s*CLP\s*\$?\s*([\d,.]+)',           # Total: CLP 123456 o Total: CLP $123.456
+        r'Total:\s*\$\s*([\d,.]+)',                  # Total: $123.456
+        r'Monto\s+Total:\s*CLP\s*\$?\s*([\d,.]+)',   # Monto Total: CLP 123456
+        r'Monto\s+Total:\s*\$\s*([\d,.]+)',          # Monto Total: $123.456
+        r'Monto:\s*CLP\s*\$?\s*([\d,.]+)',           # Monto: CLP 123456
+        r'Monto:\s*\$\s*([\d,.]+)',                  # Monto: $123.456
+        r'Total\s+a\s+Pagar:\s*CLP\s*\$?\s*([\d,.]+)',  # Total a Pagar: CLP 123456
+        r'Total\s+a\s+Pagar:\s*\$\s*([\d,.]+)',      # Total a Pagar: $123.456
+        r'Precio\s+Total:\s*CLP\s*\$?\s*([\d,.]+)',  # Precio Total: CLP 123456
+        r'Precio\s+Total:\s*\$\s*([\d,.]+)',         # Precio Total: $123.456
+        r'CLP\s*\$?\s*([\d,.]+)\s*(?:Total|Monto)',  # CLP 123456 Total
+        r'Total.*?CLP\s*\$?\s*([\d,.]+)',            # Total ... CLP 123456
+        r'(?:Total|Monto).*?\$\s*([\d,.]+)',         # Total/Monto ... $123.456
+    )
+]
+_MONTO_FALLBACK_RE = re.compile(r'(?:CLP|\$)\s*\$?\s*([\d,.]{5,})', re.IGNORECASE)
+
+# Patrones base por campo. 'monto_total' es la cascada completa en orden de
+# prioridad; los perfiles por remitente reemplazan solo lo que necesitan.
+# Se exige "ID:" explícito para que la lectura parcial no cambie id_reserva.
+_DEFAULT_PATTERNS = {
+    'id_reserva': _ID_RE,
+    'loc_interno': _LOC_INTERNO_RE,
+    'localizador': _LOCALIZADOR_RE,
+    'agencia': _AGENCIA_RE,
+    'fecha_emision': _FECHA_EMISION_RE,
+    'direccion_hotel': _DIRECCION_RE,
+    'telefono_hotel': _TELEFONO_RE,
+    'fecha_checkin': _CHECKIN_RE,
+    'fecha_checkout': _CHECKOUT_RE,
+    'hora_llegada': _HORA_LLEGADA_RE,
+    'hora_salida': _HORA_SALIDA_RE,
+    'numero_noches': _NOCHES_RE,
+    'numero_habitaciones': _HABITACIONES_RE,
+    'observaciones_hotel': _OBSERVACIONES_RE,
+    'notas_asesor': _NOTAS_ASESOR_RE,
+    'habitacion': _HABITACION_RE,
+    'huesped': _HUESPED_RE,
+    'hotel_keyword': _HOTEL_KEYWORD_RE,
+    'nombre_hotel': _HOTEL_RE,
+    'fecha_limite_cancelacion': _CANCELACION_RE,
+    'monto_total': _MONTO_PATTERNS,
+    'monto_fallback': _MONTO_FALLBACK_RE,
+}
+
+# Perfil genérico: cascada completa, para remitentes sin perfil propio
+GENERIC_PROFILE = ExtractionProfile("generico", _DEFAULT_PATTERNS)
+
+# hotelsales.cl siempre emite "Total: CLP 528.701,00" (o "Total: $..."):
+# no necesita los otros 11 formatos de monto
+HOTELSALES_PROFILE = GENERIC_PROFILE.derive(
+    "hotelsales",
+    domains=("hotelsales.cl",),
+    monto_total=_MONTO_PATTERNS[:2]
+)
+
+extraction_profiles.register(GENERIC_PROFILE, default=True)
+extraction_profiles.register(HOTELSALES_PROFILE)
+
+_REQUIRED_LAYOUT_FIELDS = ('id_reserva', 'loc_interno', 'agencia', 'monto_total')
+
+# Campos que se esperan en un resumen completo; los ausentes se contabilizan
+# en la métrica campo_no_encontrado
+_EXPECTED_FIELDS = (
+    'id_reserva', 'loc_interno', 'localizador', 'agencia', 'fecha_emision',
+    'nombre_hotel', 'direccion_hotel', 'telefono_hotel', 'monto_total',
+    'fecha_checkin', 'fecha_checkout', 'hora_llegada', 'hora_salida',
+    'numero_noches', 'numero_habitaciones', 'detalles_habitaciones',
+    'fecha_limite_cancelacion', 'observaciones_hotel', 'notas_asesor',
+)
+
+class _PyPDF2Pages:
+    """Lector PyPDF2 perezoso: solo parsea el PDF si se le pide una página"""
+
+    def __init__(self, pdf_bytes: bytes):
+        self._pdf_bytes = pdf_bytes
+        self._reader: Optional[PyPDF2.PdfReader] = None
+
+    def _get_reader(self) -> PyPDF2.PdfReader:
+        if self._reader is None:
+            self._reader = PyPDF2.PdfReader(io.BytesIO(self._pdf_bytes))
+        return self._reader
+
+    def count(self) -> int:
+        return len(self._get_reader().pages)
+
+    def extract_text(self, index: int) -> str:
+        return self._get_reader().pages[index].extract_text() or ""
+
 
 class PDFProcessor:
     """Procesa PDFs de resumen de servicios y extrae datos de reserva"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        cache: Optional[ExtractionCache] = None,
+        max_pages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        max_page_count: Optional[int] = None
+    ):
+        """
+        Args:
+            cache: Caché de resultados por contenido (opcional)
+            max_pages: Máximo de páginas a leer por documento (None = sin límite)
+            max_bytes: Tamaño máximo aceptado en el procesamiento normal (ver check_limits)
+            max_page_count: Páginas totales máximas aceptadas en el procesamiento normal
+        """
+        self.cache = cache
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.max_page_count = max_page_count
         self.logger = logger.bind(module="PDFProcessor")
 
+    def check_limits(self, pdf_bytes: bytes) -> Optional[str]:
+        """
+        Verifica tamaño y número de páginas antes del parseo completo
+
+        El conteo de páginas solo recorre el árbol de páginas con PyPDF2,
+        sin leer el contenido. Un PDF que no se puede abrir no se rechaza
+        aquí: el parseo normal registra el error.
+
+        Returns:
+            Motivo ("tamano" o "paginas") si el documento excede algún límite, o None
+        """
+        if self.max_bytes and len(pdf_bytes) > self.max_bytes:
+            return "tamano"
+
+        if self.max_page_count:
+            try:
+                paginas = _PyPDF2Pages(pdf_bytes).count()
+            except Exception:
+                return None
+            if paginas > self.max_page_count:
+                return "paginas"
+
+        return None
+
     def extract_from_file(self, pdf_path: str) -> Optional[Dict[str, Any]]:
         """
         Extrae datos de un archivo PDF
@@ -31,89 +243,350 @@ class PDFProcessor:
         try:
             self.logger.info(f"Procesando PDF: {pdf_path}")
 
-            # Intentar con pdfplumber primero (mejor para texto estructurado)
-            try:
-                return self._extract_with_pdfplumber(pdf_path)
-            except Exception as e:
-                self.logger.warning(f"pdfplumber falló, intentando con PyPDF2: {e}")
-                return self._extract_with_pypdf2(pdf_path)
+            with open(pdf_path, 'rb') as file:
+                return self._extract_from_stream(file)
 
         except Exception as e:
             self.logger.error(f"Error procesando PDF {pdf_path}: {e}")
             return None
 
-    def extract_from_bytes(self, pdf_bytes: bytes, filename: str = "documento.pdf") -> Optional[Dict[str, Any]]:
+    def extract_from_bytes(
+        self,
+        pdf_bytes: bytes,
+        filename: str = "documento.pdf",
+        mode: str = "text",
+        profile: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Extrae datos de bytes de PDF (útil para archivos adjuntos de correo)
 
+        El PDF se procesa en memoria: pdfplumber y PyPDF2 leen directamente
+        de un BytesIO sobre los bytes del adjunto, sin archivo temporal.
+        Si hay caché configurada, un PDF ya procesado (mismo SHA-256) se
+        resuelve sin volver a parsearlo.
+
         Args:
             pdf_bytes: Contenido del PDF en bytes
             filename: Nombre del archivo (para logging)
+            mode: Modo de extracción ("text" o "layout")
+            profile: Nombre del perfil de extracción (ver src/extraction_profiles.py);
+                     None usa el perfil genérico
 
         Returns:
             Diccionario con datos extraídos o None si falla
         """
         try:
             self.logger.info(f"Procesando PDF desde bytes: {filename}")
-
-            # Guardar temporalmente
-            import tempfile
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                tmp.write(pdf_bytes)
-                tmp_path = tmp.name
-
-            # Procesar
-            result = self.extract_from_file(tmp_path)
-
-            # Limpiar archivo temporal
-            Path(tmp_path).unlink()
+            perfil = extraction_profiles.get(profile)
+
+            cache_key = None
+            if self.cache is not None:
+                cache_key = f"{perfil.name}:{mode}:{self.cache.key_for(pdf_bytes)}"
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    metrics_registry.increment("cache", "hit")
+                    self.logger.info(f"♻️  Resultado obtenido de caché para {filename}")
+                    return cached
+                metrics_registry.increment("cache", "miss")
+
+            # BytesIO sobre bytes inmutables comparte el buffer (no copia)
+            inicio = time.perf_counter()
+            result = self._extract_from_stream(io.BytesIO(pdf_bytes), mode, perfil)
+            duracion = time.perf_counter() - inicio
+            metrics_registry.observe("total", duracion)
+            metrics_registry.observe_document(filename, duracion)
+
+            if cache_key is not None and result:
+                self.cache.put(cache_key, result)
 
             return result
 
         except Exception as e:
+            metrics_registry.increment("documentos", "error")
             self.logger.error(f"Error procesando PDF desde bytes {filename}: {e}")
             return None
 
-    def _extract_with_pdfplumber(self, pdf_path: str) -> Dict[str, Any]:
-        """Extrae texto usando pdfplumber"""
-        with pdfplumber.open(pdf_path) as pdf:
-            # Extraer texto de todas las páginas
-            full_text = ""
-            for page in pdf.pages:
-                full_text += page.extract_text() + "\n"
+    def _extract_from_stream(
+        self,
+        stream: BinaryIO,
+        mode: str = "text",
+        profile: ExtractionProfile = GENERIC_PROFILE
+    ) -> Dict[str, Any]:
+        """Extrae datos de un stream binario, con PyPDF2 como fallback"""
+        if mode not in EXTRACTION_MODES:
+            raise ValueError(f"Modo de extracción desconocido: {mode}")
 
-            return self._parse_text(full_text)
+        metrics_registry.increment("perfil", profile.name)
 
-    def _extract_with_pypdf2(self, pdf_path: str) -> Dict[str, Any]:
-        """Extrae texto usando PyPDF2 (fallback)"""
-        with open(pdf_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
+        if mode == "layout":
+            try:
+                return self._extract_with_layout(stream, profile)
+            except Exception as e:
+                self.logger.warning(f"Extracción por layout falló, usando modo texto: {e}")
+                stream.seek(0)
 
-            full_text = ""
-            for page in pdf_reader.pages:
-                full_text += page.extract_text() + "\n"
+        return self._extract_hybrid(stream, profile)
 
-            return self._parse_text(full_text)
+    def _extract_hybrid(self, stream: BinaryIO, profile: ExtractionProfile = GENERIC_PROFILE) -> Dict[str, Any]:
+        """
+        Extrae texto página a página con pdfplumber y PyPDF2 como fallback
 
-    def _parse_text(self, text: str) -> Dict[str, Any]:
+        El PDF se lee una sola vez a memoria y ambos motores abren su propio
+        BytesIO sobre esos mismos bytes (sin copia). PyPDF2 solo se inicializa
+        si alguna página falla con pdfplumber, y solo se usa para esas
+        páginas. El motor usado en cada página queda en 'motores_pagina'.
+        """
+        pdf_bytes = stream.read()
+        engines: List[str] = []
+        fallback = _PyPDF2Pages(pdf_bytes)
+
+        plumber = None
+        plumber_pages = None
+        try:
+            with metrics_registry.timer("apertura"):
+                plumber = pdfplumber.open(io.BytesIO(pdf_bytes))
+                plumber_pages = plumber.pages
+        except Exception as e:
+            self.logger.warning(f"pdfplumber no pudo abrir el PDF, usando PyPDF2: {e}")
+
+        try:
+            total = len(plumber_pages) if plumber_pages is not None else fallback.count()
+            page_texts = (
+                self._extract_page_text(i, plumber_pages, fallback, engines)
+                for i in range(total)
+            )
+            with metrics_registry.timer("extraccion_texto"):
+                text = self._collect_text(page_texts, profile)
+        finally:
+            if plumber is not None:
+                plumber.close()
+
+        for engine in engines:
+            metrics_registry.increment("motor_pagina", engine)
+
+        with metrics_registry.timer("parseo"):
+            data = self._parse_text(text, profile)
+        self._record_missing_fields(data)
+        data['motores_pagina'] = engines
+        return data
+
+    def _extract_page_text(
+        self,
+        index: int,
+        plumber_pages: Optional[List[Any]],
+        fallback: "_PyPDF2Pages",
+        engines: List[str]
+    ) -> str:
+        """Extrae el texto de una página, recurriendo a PyPDF2 si pdfplumber falla"""
+        if plumber_pages is not None:
+            try:
+                text = plumber_pages[index].extract_text() or ""
+                engines.append("pdfplumber")
+                return text
+            except Exception as e:
+                self.logger.warning(f"pdfplumber falló en la página {index + 1}, usando PyPDF2: {e}")
+
+        try:
+            text = fallback.extract_text(index)
+            engines.append("pypdf2")
+            return text
+        except Exception as e:
+            self.logger.error(f"❌ Página {index + 1} ilegible con ambos motores: {e}")
+            engines.append("fallida")
+            return ""
+
+    def _extract_with_layout(self, stream: BinaryIO, profile: ExtractionProfile = GENERIC_PROFILE) -> Dict[str, Any]:
+        """Extrae datos usando las coordenadas de palabras de pdfplumber"""
+        index = WordIndex()
+        paginas = 0
+        with metrics_registry.timer("apertura"):
+            pdf = pdfplumber.open(stream)
+
+        try:
+            with metrics_registry.timer("extraccion_texto"):
+                for numero, page in enumerate(pdf.pages, 1):
+                    index.add_page(page.extract_words())
+                    paginas = numero
+
+                    # Mismo criterio de corte que el modo texto
+                    if index.has_fields(_REQUIRED_LAYOUT_FIELDS):
+                        break
+                    if self.max_pages is not None and numero >= self.max_pages:
+                        break
+        finally:
+            pdf.close()
+
+        metrics_registry.increment("motor_pagina", "pdfplumber", paginas)
+
+        with metrics_registry.timer("parseo"):
+            data = self._parse_layout(index, profile)
+        self._record_missing_fields(data)
+        data['motores_pagina'] = ["pdfplumber"] * paginas
+        return data
+
+    def _record_missing_fields(self, data: Dict[str, Any]):
+        """Contabiliza los campos esperados que no se pudieron extraer"""
+        metrics_registry.increment("documentos", "procesado")
+        for field in _EXPECTED_FIELDS:
+            if field not in data:
+                metrics_registry.increment("campo_no_encontrado", field)
+
+    def _parse_layout(self, index: WordIndex, profile: ExtractionProfile = GENERIC_PROFILE) -> Dict[str, Any]:
+        """
+        Construye el diccionario de datos a partir del índice de palabras
+
+        Los campos etiqueta/valor se leen por posición; los bloques de texto
+        libre (hotel, dirección, habitaciones, cancelación, observaciones) se
+        extraen del texto reconstruido por filas. Si falta algún campo
+        obligatorio se recurre al parseo de texto sobre ese mismo texto.
+        """
+        if not index.has_fields(_REQUIRED_LAYOUT_FIELDS):
+            self.logger.info("Layout sin todos los campos obligatorios, usando parseo de texto")
+            return self._parse_text(index.text(), profile)
+
+        data = {}
+        data['id_reserva'] = index.lookup('id_reserva').split()[0]
+        data['loc_interno'] = index.lookup('loc_interno').split()[0]
+
+        localizador = index.lookup('localizador')
+        if localizador:
+            data['localizador'] = localizador.split()[0]
+
+        data['agencia'] = index.lookup('agencia').strip()
+
+        fecha_emision = index.lookup('fecha_emision')
+        if fecha_emision:
+            if fecha_emision.upper() == "INMEDIATO":
+                data['fecha_emision'] = None
+            else:
+                data['fecha_emision'] = self._parse_spanish_date(fecha_emision)
+
+        telefono = index.lookup('telefono_hotel')
+        if telefono and telefono.split()[0].isdigit():
+            data['telefono_hotel'] = telefono.split()[0]
+
+        monto = index.lookup('monto_total')
+        numero = next(
+            (t for t in monto.split() if t.upper() not in ('CLP', '$') and any(c.isdigit() for c in t)),
+            None
+        )
+        if numero:
+            monto_total = parse_amount(numero)
+            if monto_total is not None:
+                data['monto_total'] = monto_total
+                data['moneda'] = 'CLP'
+                metrics_registry.increment("monto_patron", "layout")
+            else:
+                self.logger.warning(f"No se pudo convertir monto: {monto}")
+
+        for campo in ('fecha_checkin', 'fecha_checkout'):
+            # "jueves 27, nov. 2025" -> "27 nov 2025"
+            partes = (index.lookup(campo) or "").replace(',', '').split()
+            if len(partes) >= 4:
+                data[campo] = self._parse_spanish_date(" ".join(partes[1:4]))
+
+        for campo in ('hora_llegada', 'hora_salida'):
+            valor = index.lookup(campo)
+            if valor:
+                data[campo] = valor
+
+        for campo in ('numero_noches', 'numero_habitaciones'):
+            valor = index.lookup(campo)
+            if valor and valor.split()[0].isdigit():
+                data[campo] = int(valor.split()[0])
+
+        # Bloques de texto libre
+        text = index.text()
+
+        hotel_keyword = profile.patterns['hotel_keyword'].search(text)
+        if hotel_keyword:
+            inicio_linea = text.rfind('\n', 0, hotel_keyword.start()) + 1
+            hotel_match = profile.patterns['nombre_hotel'].search(text, inicio_linea)
+            if hotel_match:
+                data['nombre_hotel'] = hotel_match.group(1).strip()
+
+        direccion_match = profile.patterns['direccion_hotel'].search(text)
+        if direccion_match:
+            data['direccion_hotel'] = direccion_match.group(0).strip()
+
+        cancelacion_match = profile.patterns['fecha_limite_cancelacion'].search(text)
+        if cancelacion_match:
+            data['fecha_limite_cancelacion'] = self._parse_spanish_date(" ".join(cancelacion_match.groups()))
+
+        data['detalles_habitaciones'] = self._extract_room_details(text, profile)
+
+        observaciones_match = profile.patterns['observaciones_hotel'].search(text)
+        if observaciones_match and observaciones_match.group(1).strip():
+            data['observaciones_hotel'] = observaciones_match.group(1).strip()
+
+        notas_match = profile.patterns['notas_asesor'].search(text)
+        if notas_match and notas_match.group(1).strip():
+            data['notas_asesor'] = notas_match.group(1).strip()
+
+        self.logger.info(f"Datos extraídos (layout): ID={data.get('id_reserva')}, Agencia={data.get('agencia')}")
+
+        return data
+
+    def _collect_text(self, page_texts: Iterable[str], profile: ExtractionProfile = GENERIC_PROFILE) -> str:
+        """
+        Concatena el texto de las páginas de forma perezosa
+
+        Deja de extraer páginas en cuanto aparecen todos los campos
+        obligatorios (en el resumen de hotelsales están en la primera
+        página) o al alcanzar max_pages.
+
+        Args:
+            page_texts: Iterador que extrae el texto de cada página al consumirse
+            profile: Perfil cuyos patrones determinan los campos obligatorios
+
+        Returns:
+            Texto de las páginas leídas, una por línea
+        """
+        partes = []
+        requeridos = profile.required_patterns
+        pendientes = set(requeridos)
+
+        for numero, page_text in enumerate(page_texts, 1):
+            partes.append(page_text + "\n")
+
+            pendientes = {
+                campo for campo in pendientes
+                if not any(p.search(page_text) for p in requeridos[campo])
+            }
+            if not pendientes:
+                self.logger.debug(f"Campos obligatorios completos en la página {numero}")
+                break
+
+            if self.max_pages is not None and numero >= self.max_pages:
+                self.logger.warning(
+                    f"⚠️  Límite de {self.max_pages} páginas alcanzado; "
+                    f"campos sin encontrar: {', '.join(sorted(pendientes))}"
+                )
+                break
+
+        return "".join(partes)
+
+    def _parse_text(self, text: str, profile: ExtractionProfile = GENERIC_PROFILE) -> Dict[str, Any]:
         """
         Parsea el texto extraído y estructura los datos
 
         Args:
             text: Texto extraído del PDF
+            profile: Perfil de extracción con los patrones a aplicar
 
         Returns:
             Diccionario con datos estructurados
         """
         data = {}
+        patterns = profile.patterns
 
         # Extraer ID de reserva
-        id_match = re.search(r'ID:\s*(\d+)', text, re.IGNORECASE)
+        id_match = patterns['id_reserva'].search(text)
         if id_match:
             data['id_reserva'] = id_match.group(1)
 
         # Extraer LOC Interno
-        loc_interno_match = re.search(r'LOC\s+Interno:\s*([A-Z0-9]+)', text, re.IGNORECASE)
+        loc_interno_match = patterns['loc_interno'].search(text)
         if loc_interno_match:
             data['loc_interno'] = loc_interno_match.group(1)
             # Si no hay ID, usar LOC Interno como id_reserva
@@ -121,17 +594,17 @@ class PDFProcessor:
                 data['id_reserva'] = loc_interno_match.group(1)
 
         # Extraer Localizador
-        localizador_match = re.search(r'Localizador:\s*(\d+)', text, re.IGNORECASE)
+        localizador_match = patterns['localizador'].search(text)
         if localizador_match:
             data['localizador'] = localizador_match.group(1)
 
         # Extraer Agencia
-        agencia_match = re.search(r'Agencia:\s*([^\n]+)', text, re.IGNORECASE)
+        agencia_match = patterns['agencia'].search(text)
         if agencia_match:
             data['agencia'] = agencia_match.group(1).strip()
 
         # Extraer Fecha de Emisión
-        fecha_emision_match = re.search(r'Fecha\s+Emision:\s*([^\n]+)', text, re.IGNORECASE)
+        fecha_emision_match = patterns['fecha_emision'].search(text)
         if fecha_emision_match:
             fecha_emision_str = fecha_emision_match.group(1).strip()
             # Si dice "INMEDIATO" o está vacío, usar None (se usará fecha del correo como fallback)
@@ -147,134 +620,100 @@ class PDFProcessor:
                     self.logger.warning(f"⚠️  No se pudo parsear fecha emisión: {fecha_emision_str}")
 
         # Extraer Nombre del Hotel
-        hotel_match = re.search(r'(.*?Hotel.*?)(?=\n|Total:)', text, re.IGNORECASE)
+        hotel_match = None
+        hotel_keyword = patterns['hotel_keyword'].search(text)
+        if hotel_keyword:
+            inicio_linea = text.rfind('\n', 0, hotel_keyword.start()) + 1
+            hotel_match = patterns['nombre_hotel'].search(text, inicio_linea)
         if hotel_match:
             data['nombre_hotel'] = hotel_match.group(1).strip()
 
         # Extraer Dirección
-        direccion_match = re.search(r'Av\.\s+[^\n]+|[^\n]+,\s+\d+\s+[A-Za-z\s]+,', text)
+        direccion_match = patterns['direccion_hotel'].search(text)
         if direccion_match:
             data['direccion_hotel'] = direccion_match.group(0).strip()
 
         # Extraer Teléfono
-        telefono_match = re.search(r'Teléfono:\s*(\d+)', text, re.IGNORECASE)
+        telefono_match = patterns['telefono_hotel'].search(text)
         if telefono_match:
             data['telefono_hotel'] = telefono_match.group(1)
 
         # Extraer Total (monto) - MÚLTIPLES FORMATOS SOPORTADOS
-        # Patrones para detectar el monto total en diferentes formatos
-        monto_patterns = [
-            r'Total:\s*CLP\s*\$?\s*([\d,.]+)',           # Total: CLP 123456 o Total: CLP $123.456
-            r'Total:\s*\$\s*([\d,.]+)',                  # Total: $123.456
-            r'Monto\s+Total:\s*CLP\s*\$?\s*([\d,.]+)',   # Monto Total: CLP 123456
-            r'Monto\s+Total:\s*\$\s*([\d,.]+)',          # Monto Total: $123.456
-            r'Monto:\s*CLP\s*\$?\s*([\d,.]+)',           # Monto: CLP 123456
-            r'Monto:\s*\$\s*([\d,.]+)',                  # Monto: $123.456
-            r'Total\s+a\s+Pagar:\s*CLP\s*\$?\s*([\d,.]+)',  # Total a Pagar: CLP 123456
-            r'Total\s+a\s+Pagar:\s*\$\s*([\d,.]+)',      # Total a Pagar: $123.456
-            r'Precio\s+Total:\s*CLP\s*\$?\s*([\d,.]+)',  # Precio Total: CLP 123456
-            r'Precio\s+Total:\s*\$\s*([\d,.]+)',         # Precio Total: $123.456
-            r'CLP\s*\$?\s*([\d,.]+)\s*(?:Total|Monto)',  # CLP 123456 Total
-            r'Total.*?CLP\s*\$?\s*([\d,.]+)',            # Total ... CLP 123456
-            r'(?:Total|Monto).*?\$\s*([\d,.]+)',         # Total/Monto ... $123.456
-        ]
-
-        for pattern in monto_patterns:
-            total_match = re.search(pattern, text, re.IGNORECASE)
+        # Los patrones se prueban en orden de prioridad (ver _MONTO_PATTERNS y el perfil)
+        for pattern in patterns['monto_total']:
+            total_match = pattern.search(text)
             if total_match:
-                monto_str = total_match.group(1).replace(',', '').replace('.', '')
-                try:
-                    # Convertir el monto
-                    # Si el formato original tenía punto como separador de miles (ej: 123.456)
-                    # se eliminó y quedó 123456, lo cual es correcto
-                    data['monto_total'] = float(monto_str)
+                # Convertir el monto distinguiendo miles y decimales:
+                # "528.701,00" -> 528701.0 (ver src/amount_parser.py)
+                monto_total = parse_amount(total_match.group(1))
+                if monto_total is not None:
+                    data['monto_total'] = monto_total
                     data['moneda'] = 'CLP'
-                    self.logger.info(f"💰 Monto extraído: CLP {data['monto_total']} (patrón: {pattern[:30]}...)")
+                    metrics_registry.increment("monto_patron", pattern.pattern)
+                    self.logger.info(f"💰 Monto extraído: CLP {data['monto_total']} (patrón: {pattern.pattern[:30]}...)")
                     break  # Salir del loop si encontramos un monto válido
-                except ValueError:
-                    self.logger.warning(f"No se pudo convertir monto: {total_match.group(1)}")
-                    continue  # Intentar con el siguiente patrón
+
+                self.logger.warning(f"No se pudo convertir monto: {total_match.group(1)}")
 
         # Si no se encontró con ningún patrón, intentar buscar cualquier número grande precedido de CLP o $
-        if 'monto_total' not in data:
-            fallback_match = re.search(r'(?:CLP|\$)\s*\$?\s*([\d,.]{5,})', text, re.IGNORECASE)
+        if 'monto_total' not in data and patterns['monto_fallback'] is not None:
+            fallback_match = patterns['monto_fallback'].search(text)
             if fallback_match:
-                monto_str = fallback_match.group(1).replace(',', '').replace('.', '')
-                try:
-                    data['monto_total'] = float(monto_str)
+                monto_total = parse_amount(fallback_match.group(1))
+                if monto_total is not None:
+                    data['monto_total'] = monto_total
                     data['moneda'] = 'CLP'
+                    metrics_registry.increment("monto_patron", "fallback")
                     self.logger.info(f"💰 Monto extraído (fallback): CLP {data['monto_total']}")
-                except ValueError:
-                    pass
 
         # Extraer Check-in
-        checkin_match = re.search(
-            r'Check\s+In:\s*([a-záéíóú]+)\s+(\d+),\s+([a-záéíóú]+)\.?\s+(\d{4})',
-            text,
-            re.IGNORECASE
-        )
+        checkin_match = patterns['fecha_checkin'].search(text)
         if checkin_match:
             fecha_str = f"{checkin_match.group(2)} {checkin_match.group(3)} {checkin_match.group(4)}"
             data['fecha_checkin'] = self._parse_spanish_date(fecha_str)
 
         # Extraer Check-out
-        checkout_match = re.search(
-            r'Check\s+Out:\s*([a-záéíóú]+)\s+(\d+),\s+([a-záéíóú]+)\.?\s+(\d{4})',
-            text,
-            re.IGNORECASE
-        )
+        checkout_match = patterns['fecha_checkout'].search(text)
         if checkout_match:
             fecha_str = f"{checkout_match.group(2)} {checkout_match.group(3)} {checkout_match.group(4)}"
             data['fecha_checkout'] = self._parse_spanish_date(fecha_str)
 
         # Extraer Hora de Llegada
-        hora_llegada_match = re.search(r'Hora\s+Llegada:\s*(\d+:\d+\s*[AP]M)', text, re.IGNORECASE)
+        hora_llegada_match = patterns['hora_llegada'].search(text)
         if hora_llegada_match:
             data['hora_llegada'] = hora_llegada_match.group(1)
 
         # Extraer Hora de Salida
-        hora_salida_match = re.search(r'Hora\s+Salida:\s*(\d+:\d+\s*[AP]M)', text, re.IGNORECASE)
+        hora_salida_match = patterns['hora_salida'].search(text)
         if hora_salida_match:
             data['hora_salida'] = hora_salida_match.group(1)
 
         # Extraer Número de Noches
-        noches_match = re.search(r'Noches:\s*(\d+)', text, re.IGNORECASE)
+        noches_match = patterns['numero_noches'].search(text)
         if noches_match:
             data['numero_noches'] = int(noches_match.group(1))
 
         # Extraer Número de Habitaciones
-        habitaciones_match = re.search(r'Habitaciones:\s*(\d+)', text, re.IGNORECASE)
+        habitaciones_match = patterns['numero_habitaciones'].search(text)
         if habitaciones_match:
             data['numero_habitaciones'] = int(habitaciones_match.group(1))
 
         # Extraer Límite de Cancelación
-        cancelacion_match = re.search(
-            r'([a-záéíóú]+),\s+(\d+)\s+de\s+([a-záéíóú]+)\s+de\s+(\d{4})',
-            text,
-            re.IGNORECASE
-        )
+        cancelacion_match = patterns['fecha_limite_cancelacion'].search(text)
         if cancelacion_match:
-            fecha_str = f"{cancelacion_match.group(2)} {cancelacion_match.group(3)} {cancelacion_match.group(4)}"
+            fecha_str = f"{cancelacion_match.group(1)} {cancelacion_match.group(2)} {cancelacion_match.group(3)}"
             data['fecha_limite_cancelacion'] = self._parse_spanish_date(fecha_str)
 
         # Extraer detalles de habitaciones
-        data['detalles_habitaciones'] = self._extract_room_details(text)
+        data['detalles_habitaciones'] = self._extract_room_details(text, profile)
 
         # Extraer Observaciones
-        observaciones_match = re.search(
-            r'Observaciones\s*\n\s*([^\n]*)\s*Sin\s+notas\s+de\s+hotel\s+informadas\.\s*([^\n]*)',
-            text,
-            re.IGNORECASE
-        )
+        observaciones_match = patterns['observaciones_hotel'].search(text)
         if observaciones_match and observaciones_match.group(1).strip():
             data['observaciones_hotel'] = observaciones_match.group(1).strip()
 
         # Extraer Notas del Asesor
-        notas_match = re.search(
-            r'Notas\s+del\s+asesor\s*\n\s*([^\n]*)\s*Sin\s+notas\s+del\s+asesor\s+informadas\.\s*([^\n]*)',
-            text,
-            re.IGNORECASE
-        )
+        notas_match = patterns['notas_asesor'].search(text)
         if notas_match and notas_match.group(1).strip():
             data['notas_asesor'] = notas_match.group(1).strip()
 
@@ -282,28 +721,32 @@ class PDFProcessor:
 
         return data
 
-    def _extract_room_details(self, text: str) -> str:
+    def _extract_room_details(self, text: str, profile: ExtractionProfile = GENERIC_PROFILE) -> str:
         """Extrae detalles de las habitaciones y los serializa a JSON"""
         habitaciones = []
 
         # Buscar patrones de habitaciones
-        habitacion_pattern = re.compile(
-            r'Habitación\s+(\d+)\s*‐\s*Categoría\s*‐\s*([^\‐]+)\‐\s*ADT/CHD:\s*(\d+)/(\d+)\s*‐\s*Plan\s+Alimentación:\s*([^\n]+)',
-            re.IGNORECASE
-        )
+        matches = list(profile.patterns['habitacion'].finditer(text))
+        for i, match in enumerate(matches):
+            # Los huéspedes de la habitación están entre su encabezado y el siguiente
+            fin = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+            huespedes = [
+                {
+                    'tipo': h.group(1).upper(),
+                    'nombre': h.group(2),
+                    'apellidos': (h.group(3) or '').strip()
+                }
+                for h in profile.patterns['huesped'].finditer(text, match.end(), fin)
+            ]
 
-        for match in habitacion_pattern.finditer(text):
             habitacion = {
                 'numero': int(match.group(1)),
                 'categoria': match.group(2).strip(),
                 'adultos': int(match.group(3)),
                 'ninos': int(match.group(4)),
                 'plan_alimentacion': match.group(5).strip(),
-                'huespedes': []
+                'huespedes': huespedes
             }
-
-            # Buscar huéspedes de esta habitación
-            # (esto es más complejo y puede requerir ajustes según el formato exacto)
             habitaciones.append(habitacion)
 
         return json.dumps(habitaciones, ensure_ascii=False) if habitaciones else None
@@ -311,43 +754,9 @@ class PDFProcessor:
     def _parse_spanish_date(self, fecha_str: str) -> Optional[datetime]:
         """
         Convierte fecha en español a datetime
-        Ej: "27 nov. 2025" -> datetime
+        Ej: "27 nov. 2025" -> datetime (ver src/date_parser.py)
         """
-        meses = {
-            'ene': 1, 'enero': 1,
-            'feb': 2, 'febrero': 2,
-            'mar': 3, 'marzo': 3,
-            'abr': 4, 'abril': 4,
-            'may': 5, 'mayo': 5,
-            'jun': 6, 'junio': 6,
-            'jul': 7, 'julio': 7,
-            'ago': 8, 'agosto': 8,
-            'sep': 9, 'septiembre': 9,
-            'oct': 10, 'octubre': 10,
-            'nov': 11, 'noviembre': 11,
-            'dic': 12, 'diciembre': 12
-        }
-
-        try:
-            # Normalizar
-            fecha_str = fecha_str.lower().strip().replace('.', '')
-
-            # Extraer partes
-            parts = fecha_str.split()
-            if len(parts) >= 3:
-                dia = int(parts[0])
-                mes_str = parts[1]
-                anio = int(parts[2])
-
-                # Buscar mes
-                mes = meses.get(mes_str)
-                if mes:
-                    return datetime(anio, mes, dia)
-
-        except Exception as e:
-            self.logger.warning(f"Error parseando fecha '{fecha_str}': {e}")
-
-        return None
+        return parse_spanish_date(fecha_str)
 
     def validate_data(self, data: Dict[str, Any]) -> tuple[bool, List[str]]:
         """
@@ -356,29 +765,38 @@ class PDFProcessor:
         Returns:
             (es_valido, lista_de_errores)
         """
-        errors = []
+        with metrics_registry.timer("validacion"):
+            errors = []
+            invalid_fields = []
 
-        # Campos obligatorios
-        required_fields = ['id_reserva', 'loc_interno', 'agencia', 'monto_total']
+            # Campos obligatorios
+            required_fields = ['id_reserva', 'loc_interno', 'agencia', 'monto_total']
 
-        for field in required_fields:
-            if field not in data or not data[field]:
-                errors.append(f"Campo obligatorio faltante: {field}")
+            for field in required_fields:
+                if field not in data or not data[field]:
+                    errors.append(f"Campo obligatorio faltante: {field}")
+                    invalid_fields.append(field)
 
-        # Validaciones de tipo
-        if 'monto_total' in data:
-            try:
-                float(data['monto_total'])
-            except (ValueError, TypeError):
-                errors.append("Monto total no es un número válido")
+            # Validaciones de tipo
+            if 'monto_total' in data:
+                try:
+                    float(data['monto_total'])
+                except (ValueError, TypeError):
+                    errors.append("Monto total no es un número válido")
+                    invalid_fields.append('monto_total')
+
+            if 'fecha_checkin' in data and data['fecha_checkin']:
+                if not isinstance(data['fecha_checkin'], datetime):
+                    errors.append("fecha_checkin no es un datetime válido")
+                    invalid_fields.append('fecha_checkin')
 
-        if 'fecha_checkin' in data and data['fecha_checkin']:
-            if not isinstance(data['fecha_checkin'], datetime):
-                errors.append("fecha_checkin no es un datetime válido")
+            if 'fecha_checkout' in data and data['fecha_checkout']:
+                if not isinstance(data['fecha_checkout'], datetime):
+                    errors.append("fecha_checkout no es un datetime válido")
+                    invalid_fields.append('fecha_checkout')
 
-        if 'fecha_checkout' in data and data['fecha_checkout']:
-            if not isinstance(data['fecha_checkout'], datetime):
-                errors.append("fecha_checkout no es un datetime válido")
+        for field in invalid_fields:
+            metrics_registry.increment("validacion_fallida", field)
 
         is_valid = len(errors) == 0
 
@@ -391,7 +809,16 @@ class PDFProcessor:
 
 
 # Instancia global
-pdf_processor = PDFProcessor()
+pdf_processor = PDFProcessor(
+    cache=ExtractionCache(
+        settings.pdf_cache_path,
+        max_entries=settings.pdf_cache_max_entries,
+        parser_version=PARSER_VERSION
+    ) if settings.pdf_cache_enabled else None,
+    max_pages=settings.pdf_max_pages or None,
+    max_bytes=settings.pdf_max_bytes or None,
+    max_page_count=settings.pdf_max_page_count or None
+)
 
 
 if __name__ == "__main__":
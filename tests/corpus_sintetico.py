@@ -0,0 +1,260 @@
+"""
+Corpus sintético de PDFs de confirmación estilo hotelsales
+Genera PDFs en memoria, sin dependencias externas, junto con los valores
+esperados de cada campo (verdad de referencia). Las variantes cubren los
+distintos formatos de monto, reservas con varias páginas y campos ausentes.
+
+Lo usan tests/test_corpus_pdf.py y scripts/testing/benchmark_corpus.py.
+"""
+import json
+import random
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Tuple
+
+# Texto formateado y valor esperado para cada formato de monto
+FORMATOS_MONTO = {
+    "clp_miles_decimales": lambda m: (f"Total: CLP {_miles(m)},00", float(m)),
+    "clp_miles": lambda m: (f"Total: CLP {_miles(m)}", float(m)),
+    "clp_sin_separador": lambda m: (f"Total: CLP {m}", float(m)),
+    "clp_signo_peso": lambda m: (f"Total: CLP ${_miles(m)}", float(m)),
+    "signo_peso": lambda m: (f"Total: $ {_miles(m)}", float(m)),
+    "clp_centavos": lambda m: (f"Total: CLP {_miles(m)},50", m + 0.5),
+}
+
+# Campos opcionales que una variante puede omitir
+CAMPOS_OMITIBLES = ("localizador", "telefono_hotel", "hora_llegada", "fecha_limite_cancelacion")
+
+# Campos comparados contra la verdad de referencia
+CAMPOS_VERIFICADOS = (
+    "id_reserva", "loc_interno", "localizador", "agencia", "monto_total",
+    "nombre_hotel", "telefono_hotel", "fecha_checkin", "fecha_checkout",
+    "hora_llegada", "hora_salida", "numero_noches", "numero_habitaciones",
+    "fecha_limite_cancelacion", "habitaciones",
+)
+
+_DIAS = ("lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo")
+_MESES = ("ene", "feb", "mar", "abr", "may", "jun", "jul", "ago", "sep", "oct", "nov", "dic")
+_MESES_LARGOS = (
+    "enero", "febrero", "marzo", "abril", "mayo", "junio", "julio",
+    "agosto", "septiembre", "octubre", "noviembre", "diciembre",
+)
+_AGENCIAS = ("WALVIS S.A.", "Turismo Global S.A.", "Viajes Andinos Ltda.", "Kontrol Travel SpA")
+_HOTELES = (
+    "Hampton by Hilton Santiago Las Condes", "Hotel Plaza Santiago",
+    "Hotel Cumbres Vitacura", "Novotel Providencia Hotel",
+)
+_CATEGORIAS = ("Twin", "Doble", "Single", "Suite Junior")
+_PLANES = ("Breakfast Included", "Room Only", "Media Pensión")
+_NOMBRES = ("ANA", "LUIS", "MARTA", "PEDRO", "SOFIA", "DIEGO")
+_APELLIDOS = ("SOTO", "ROJAS", "MUÑOZ", "PEREZ", "DIAZ")
+
+# Guion de hotelsales (U+2010): no existe en WinAnsiEncoding, se mapea al
+# código 127 con /Differences para que el texto extraído lo conserve.
+_GUION = "‐"
+_CODIGO_GUION = 127
+
+HABITACIONES_POR_PAGINA = 2
+
+
+def _miles(monto: int) -> str:
+    """528701 -> '528.701'"""
+    return f"{monto:,}".replace(",", ".")
+
+
+def _fecha_corta(fecha: datetime) -> str:
+    """'jueves 27, nov. 2025' (formato Check In/Check Out)"""
+    return f"{_DIAS[fecha.weekday()]} {fecha.day}, {_MESES[fecha.month - 1]}. {fecha.year}"
+
+
+def _fecha_larga(fecha: datetime) -> str:
+    """'lunes, 24 de noviembre de 2025' (formato límite de cancelación)"""
+    return f"{_DIAS[fecha.weekday()]}, {fecha.day} de {_MESES_LARGOS[fecha.month - 1]} de {fecha.year}"
+
+
+def escribir_pdf(paginas: List[List[str]]) -> bytes:
+    """
+    Escribe un PDF mínimo con una línea de texto Helvetica por elemento
+
+    Args:
+        paginas: Lista de páginas, cada una una lista de líneas
+
+    Returns:
+        Bytes del PDF
+    """
+    objetos: List[bytes] = []
+
+    def agregar(contenido: bytes) -> int:
+        objetos.append(contenido)
+        return len(objetos)
+
+    fuente = agregar(
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding "
+        b"<< /BaseEncoding /WinAnsiEncoding /Differences [%d /uni2010] >> >>" % _CODIGO_GUION
+    )
+    id_paginas = agregar(b"")  # se completa cuando se conocen las páginas
+
+    hijos = []
+    for lineas in paginas:
+        operaciones = ["BT /F1 10 Tf 12 TL 50 800 Td"]
+        for linea in lineas:
+            escapada = linea.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            operaciones.append(f"({escapada}) Tj T*")
+        operaciones.append("ET")
+        flujo = "\n".join(operaciones).replace(_GUION, chr(_CODIGO_GUION)).encode("cp1252")
+
+        contenido = agregar(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(flujo), flujo))
+        hijos.append(agregar(
+            f"<< /Type /Page /Parent {id_paginas} 0 R /MediaBox [0 0 612 842] "
+            f"/Contents {contenido} 0 R /Resources << /Font << /F1 {fuente} 0 R >> >> >>".encode()
+        ))
+
+    referencias = " ".join(f"{h} 0 R" for h in hijos)
+    objetos[id_paginas - 1] = f"<< /Type /Pages /Kids [{referencias}] /Count {len(hijos)} >>".encode()
+    catalogo = agregar(f"<< /Type /Catalog /Pages {id_paginas} 0 R >>".encode())
+
+    salida = bytearray(b"%PDF-1.4\n")
+    posiciones = []
+    for numero, contenido in enumerate(objetos, 1):
+        posiciones.append(len(salida))
+        salida += f"{numero} 0 obj\n".encode() + contenido + b"\nendobj\n"
+
+    inicio_xref = len(salida)
+    salida += f"xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n".encode()
+    for posicion in posiciones:
+        salida += f"{posicion:010d} 00000 n \n".encode()
+    salida += (
+        f"trailer\n<< /Size {len(objetos) + 1} /Root {catalogo} 0 R >>\n"
+        f"startxref\n{inicio_xref}\n%%EOF\n"
+    ).encode()
+    return bytes(salida)
+
+
+def generar_documento(rng: random.Random, indice: int) -> Tuple[str, bytes, Dict[str, Any]]:
+    """
+    Genera un PDF de confirmación con variantes aleatorias
+
+    Returns:
+        (nombre de archivo, bytes del PDF, valores esperados por campo)
+    """
+    formato = list(FORMATOS_MONTO)[indice % len(FORMATOS_MONTO)]
+    texto_monto, monto = FORMATOS_MONTO[formato](rng.randint(45_000, 9_800_000))
+
+    omitidos = {c for c in CAMPOS_OMITIBLES if rng.random() < 0.15}
+    sin_id = rng.random() < 0.05
+
+    checkin = datetime(2025, 1, 1) + timedelta(days=rng.randint(0, 700))
+    noches = rng.randint(1, 14)
+    checkout = checkin + timedelta(days=noches)
+    limite = checkin - timedelta(days=rng.randint(1, 10))
+
+    loc_interno = "".join(rng.choice("ABCDEFGHJKLMNPQRSTUVWXYZ") for _ in range(7))
+    esperado: Dict[str, Any] = {
+        # Sin "ID:" el parser usa LOC Interno como id_reserva
+        "id_reserva": loc_interno if sin_id else str(45_000_000 + indice),
+        "loc_interno": loc_interno,
+        "localizador": None if "localizador" in omitidos else str(rng.randint(100_000, 999_999)),
+        "agencia": rng.choice(_AGENCIAS),
+        "monto_total": monto,
+        "nombre_hotel": rng.choice(_HOTELES),
+        "telefono_hotel": None if "telefono_hotel" in omitidos else f"562{rng.randint(10_000_000, 99_999_999)}",
+        "fecha_checkin": checkin,
+        "fecha_checkout": checkout,
+        "hora_llegada": None if "hora_llegada" in omitidos else f"{rng.randint(1, 4)}:00 PM",
+        "hora_salida": f"{rng.randint(10, 12)}:00 AM",
+        "numero_noches": noches,
+        "numero_habitaciones": rng.randint(1, 6),
+        "fecha_limite_cancelacion": None if "fecha_limite_cancelacion" in omitidos else limite,
+    }
+
+    llegada = f" Hora Llegada: {esperado['hora_llegada']}" if esperado["hora_llegada"] else ""
+    telefono = f"Teléfono:{esperado['telefono_hotel']}" if esperado["telefono_hotel"] else "Teléfono: no informado"
+
+    cabecera = [
+        "Resumen de servicios",
+        f"LOC Interno: {esperado['loc_interno']}",
+        f"Agencia: {esperado['agencia']}",
+    ]
+    if esperado["localizador"]:
+        cabecera.append(f"Localizador: {esperado['localizador']}")
+    cabecera += [
+        "Fecha Emision: INMEDIATO",
+        "Estado: Reservado",
+        "Hoteles",
+        texto_monto,
+        esperado["nombre_hotel"],
+        "Av. Manquehue Nte. 255, 7560832 Las Condes, Región Metropolitana, Chile",
+        f"Check In: {_fecha_corta(checkin)} Check Out: {_fecha_corta(checkout)}",
+        f"{telefono}{llegada} Hora Salida: {esperado['hora_salida']}",
+        f"Noches: {noches} Habitaciones: {esperado['numero_habitaciones']}",
+    ]
+
+    habitaciones = []
+    bloques = []
+    for numero in range(1, esperado["numero_habitaciones"] + 1):
+        categoria = rng.choice(_CATEGORIAS)
+        adultos = rng.randint(1, 3)
+        ninos = rng.randint(0, 1)
+        plan = rng.choice(_PLANES)
+        huespedes = [
+            {"tipo": tipo, "nombre": rng.choice(_NOMBRES), "apellidos": rng.choice(_APELLIDOS)}
+            for tipo in ["ADT"] * adultos + ["CHD"] * ninos
+        ]
+        habitaciones.append({"categoria": categoria, "adultos": adultos, "ninos": ninos, "plan": plan})
+        bloques.append(
+            [f"Habitación {numero} {_GUION} Categoría {_GUION} {categoria} {_GUION} "
+             f"ADT/CHD: {adultos}/{ninos} {_GUION} Plan Alimentación: {plan}",
+             "Tipo Nombre Apellidos"]
+            + [f"{h['tipo']} {h['nombre']} {h['apellidos']}" for h in huespedes]
+        )
+    esperado["habitaciones"] = habitaciones
+
+    pie = []
+    if esperado["fecha_limite_cancelacion"]:
+        pie += ["Límite Cancelación Reserva", _fecha_larga(limite)]
+    pie += [
+        "Observaciones", "Sin notas de hotel informadas.",
+        "Notas del asesor", "Sin notas del asesor informadas.",
+        "Campos Gerenciales", "Datos Adicionales",
+    ]
+    if not sin_id:
+        pie.append(f"ID: {esperado['id_reserva']}")
+
+    # Las habitaciones se reparten en páginas: una reserva grande ocupa varias
+    paginas = [cabecera]
+    for inicio in range(0, len(bloques), HABITACIONES_POR_PAGINA):
+        grupo = [linea for bloque in bloques[inicio:inicio + HABITACIONES_POR_PAGINA] for linea in bloque]
+        if inicio == 0:
+            paginas[0] = paginas[0] + grupo
+        else:
+            paginas.append(grupo)
+    paginas[-1] = paginas[-1] + pie
+
+    nombre = f"sintetico_{indice:05d}_{formato}_{len(paginas)}p.pdf"
+    return nombre, escribir_pdf(paginas), esperado
+
+
+def generar_corpus(cantidad: int, semilla: int = 42) -> List[Tuple[str, bytes, Dict[str, Any]]]:
+    """Genera un corpus reproducible de `cantidad` documentos"""
+    rng = random.Random(semilla)
+    return [generar_documento(rng, i) for i in range(cantidad)]
+
+
+def valores_extraidos(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Normaliza el resultado de extract_from_bytes a la forma de la verdad de referencia"""
+    habitaciones = None
+    if data.get("detalles_habitaciones"):
+        habitaciones = [
+            {"categoria": h.get("categoria"), "adultos": h.get("adultos"),
+             "ninos": h.get("ninos"), "plan": h.get("plan_alimentacion")}
+            for h in json.loads(data["detalles_habitaciones"])
+        ]
+
+    valores = {campo: data.get(campo) for campo in CAMPOS_VERIFICADOS}
+    valores["habitaciones"] = habitaciones
+    return valores
+
+
+def comparar(esperado: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, bool]:
+    """Campo -> True si el valor extraído coincide con el esperado"""
+    extraido = valores_extraidos(data or {})
+    return {campo: extraido[campo] == esperado[campo] for campo in CAMPOS_VERIFICADOS}
@@ -0,0 +1,229 @@
+"""
+Servidor local que imita Microsoft Graph API para pruebas sin red
+Implementa lo que usa GraphEmailClient: verificación del buzón, delta de la
+bandeja de entrada, adjuntos (metadatos y contenido con $value), detalles y
+marcado como leído de mensajes, y JSON batching ($batch) con el límite de
+20 sub-solicitudes, respuestas desordenadas y limitación (429).
+
+Lo usan tests/test_graph_batch.py y tests/test_mailbox_backend.py junto con
+StubCredential, que reemplaza la autenticación con Azure AD.
+"""
+import base64
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple, Union
+from urllib.parse import urlsplit, parse_qs
+
+
+class GraphStub:
+    """Buzón en memoria servido por HTTP en 127.0.0.1"""
+
+    def __init__(self, mailbox: str = "reservas@empresa.cl", port: int = 0):
+        self.mailbox = mailbox
+        # id -> mensaje (con 'attachments')
+        self.messages: Dict[str, Dict[str, Any]] = {}
+        # Sub-solicitudes que responden 429 antes de atenderse
+        self.throttle_remaining = 0
+        # Valor de Retry-After de las respuestas 429 (segundos o fecha HTTP)
+        self.retry_after = '0'
+        # Mensajes cuyos adjuntos responden 500 en $value
+        self.failing_values: set = set()
+        # Registro de llamadas HTTP: (método, ruta)
+        self.calls: List[Tuple[str, str]] = []
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._handle(self, "GET")
+
+            def do_POST(self):
+                stub._handle(self, "POST")
+
+            def do_PATCH(self):
+                stub._handle(self, "PATCH")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1.0"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self) -> "GraphStub":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def add_message(
+        self,
+        message_id: str,
+        subject: str,
+        attachments: Optional[List[Dict[str, Any]]] = None,
+        sender: str = "reservasonline@hotelsales.cl",
+        body: str = ""
+    ):
+        """Agrega un mensaje no leído; los adjuntos llevan 'name' y 'contentBytes' (base64)"""
+        attachments = [
+            {
+                '@odata.type': '#microsoft.graph.fileAttachment',
+                'id': f"{message_id}-a{i}",
+                'contentType': 'application/pdf',
+                'size': len(base64.b64decode(att['contentBytes'])),
+                **att,
+            }
+            for i, att in enumerate(attachments or [])
+        ]
+        self.messages[message_id] = {
+            'id': message_id,
+            'subject': subject,
+            'from': {'emailAddress': {'name': 'Remitente', 'address': sender}},
+            'toRecipients': [{'emailAddress': {'name': '', 'address': self.mailbox}}],
+            'receivedDateTime': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'isRead': False,
+            'hasAttachments': bool(attachments),
+            'body': {'contentType': 'text', 'content': body},
+            'attachments': attachments,
+        }
+
+    def value_calls(self) -> int:
+        """Descargas de contenido ($value) directas o dentro de $batch"""
+        return sum(1 for _, path in self.calls if path.endswith("/$value"))
+
+    def batch_calls(self) -> int:
+        return sum(1 for method, path in self.calls if method == "POST" and path.endswith("/$batch"))
+
+    # ---- Despacho ----
+
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str):
+        length = int(handler.headers.get('Content-Length') or 0)
+        body = json.loads(handler.rfile.read(length)) if length else None
+        path = urlsplit(handler.path).path
+        with self._lock:
+            self.calls.append((method, path))
+            if method == "POST" and path == "/v1.0/$batch":
+                self.calls.extend((r['method'], urlsplit(r['url']).path) for r in (body or {}).get('requests', []))
+
+        if not handler.headers.get('Authorization', '').startswith('Bearer '):
+            status, payload = 401, {'error': {'code': 'InvalidAuthenticationToken'}}
+        elif method == "POST" and path == "/v1.0/$batch":
+            status, payload = self._batch(body or {})
+        else:
+            status, payload = self._route(method, handler.path[len("/v1.0"):], body)
+
+        if isinstance(payload, bytes):
+            data, content_type = payload, 'application/octet-stream'
+        else:
+            data, content_type = json.dumps(payload).encode() if payload is not None else b'', 'application/json'
+        handler.send_response(status)
+        handler.send_header('Content-Type', content_type)
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _batch(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        requests = body.get('requests', [])
+        if len(requests) > 20:
+            return 400, {'error': {'code': 'BadRequest', 'message': 'Maximum of 20 requests per batch'}}
+
+        responses = []
+        for request in requests:
+            with self._lock:
+                throttled = self.throttle_remaining > 0
+                if throttled:
+                    self.throttle_remaining -= 1
+            if throttled:
+                responses.append({'id': request['id'], 'status': 429, 'headers': {'Retry-After': self.retry_after},
+                                  'body': {'error': {'code': 'TooManyRequests'}}})
+                continue
+
+            status, payload = self._route(request['method'], request['url'], request.get('body'))
+            if isinstance(payload, bytes):
+                # Dentro de $batch los cuerpos binarios van en base64
+                responses.append({'id': request['id'], 'status': status,
+                                  'headers': {'Content-Type': 'application/octet-stream'},
+                                  'body': base64.b64encode(payload).decode()})
+                continue
+            responses.append({'id': request['id'], 'status': status,
+                              'headers': {'Content-Type': 'application/json'}, 'body': payload})
+
+        # Graph no garantiza el orden de las respuestas
+        random.shuffle(responses)
+        return 200, {'responses': responses}
+
+    def _route(
+        self,
+        method: str,
+        url: str,
+        body: Optional[Dict[str, Any]]
+    ) -> Tuple[int, Union[Dict[str, Any], bytes, None]]:
+        """Atiende una solicitud con URL relativa a la versión (/users/...)"""
+        parts = urlsplit(url)
+        segments = [s for s in parts.path.split('/') if s]
+        query = parse_qs(parts.query)
+
+        if len(segments) < 2 or segments[0] != 'users' or segments[1] != self.mailbox:
+            return 404, {'error': {'code': 'ResourceNotFound'}}
+        if len(segments) == 2 and method == "GET":
+            return 200, {'displayName': 'Buzón de prueba', 'mail': self.mailbox}
+        if segments[2:] == ['mailFolders', 'inbox', 'messages', 'delta'] and method == "GET":
+            return 200, self._delta(int(query.get('$deltatoken', ['0'])[0]))
+        if len(segments) < 4 or segments[2] != 'messages' or segments[3] not in self.messages:
+            return 404, {'error': {'code': 'ErrorItemNotFound'}}
+
+        message = self.messages[segments[3]]
+        if len(segments) == 4 and method == "PATCH":
+            message.update(body or {})
+            return 200, {k: v for k, v in message.items() if k != 'attachments'}
+        if len(segments) == 4 and method == "GET":
+            expand = query.get('$expand', [''])[0]
+            if not expand.startswith('attachments'):
+                return 200, {k: v for k, v in message.items() if k != 'attachments'}
+            if '$select' in expand:
+                # attachments($select=...): solo metadatos, sin contentBytes
+                return 200, {**message, 'attachments': [
+                    {k: v for k, v in att.items() if k != 'contentBytes'} for att in message['attachments']
+                ]}
+            return 200, message
+        if len(segments) == 5 and segments[4] == 'attachments' and method == "GET":
+            return 200, {'value': message['attachments']}
+        if len(segments) == 7 and segments[4] == 'attachments' and segments[6] == '$value' and method == "GET":
+            if segments[3] in self.failing_values:
+                return 500, {'error': {'code': 'InternalServerError'}}
+            for att in message['attachments']:
+                if att['id'] == segments[5]:
+                    return 200, base64.b64decode(att['contentBytes'])
+            return 404, {'error': {'code': 'ErrorItemNotFound'}}
+        return 405, {'error': {'code': 'MethodNotAllowed'}}
+
+    def _delta(self, token: int) -> Dict[str, Any]:
+        """
+        Delta de la bandeja de entrada en una sola página: los mensajes
+        agregados desde el token (posición en el orden de llegada)
+        """
+        messages = list(self.messages.values())
+        fields = ('id', 'subject', 'from', 'receivedDateTime', 'hasAttachments', 'isRead')
+        return {
+            'value': [{k: m[k] for k in fields} for m in messages[token:]],
+            '@odata.deltaLink': f"{self.base_url}/users/{self.mailbox}/mailFolders/inbox/messages/delta"
+                                f"?$deltatoken={len(messages)}",
+        }
+
+
+class StubCredential:
+    """Credencial con la interfaz de azure-identity que no contacta a Azure AD"""
+
+    class _Token:
+        token = "token-de-prueba"
+        expires_on = 2 ** 31
+
+    def get_token(self, *scopes):
+        return self._Token()
+
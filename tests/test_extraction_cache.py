@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la caché de extracción de PDF
+Verifica serialización de fechas, expulsión LRU e invalidación por versión
+"""
+import sys
+import time
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.extraction_cache import ExtractionCache
+
+
+def _nueva_cache(directorio: str, **kwargs) -> ExtractionCache:
+    return ExtractionCache(str(Path(directorio) / "cache.db"), **kwargs)
+
+
+def test_guarda_y_recupera_fechas():
+    """Los datetimes del resultado sobreviven a la serialización"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = _nueva_cache(tmp)
+        datos = {'id_reserva': '45215412', 'monto_total': 528701.0, 'fecha_checkin': datetime(2025, 11, 27)}
+        clave = cache.key_for(b"%PDF-1.4 contenido")
+
+        assert cache.get(clave) is None
+        cache.put(clave, datos)
+        assert cache.get(clave) == datos
+
+
+def test_expulsion_lru():
+    """Al superar el límite se descarta la entrada usada hace más tiempo"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = _nueva_cache(tmp, max_entries=2)
+        cache.put("a", {'id_reserva': 'a'})
+        time.sleep(0.01)
+        cache.put("b", {'id_reserva': 'b'})
+        time.sleep(0.01)
+        cache.get("a")  # "a" pasa a ser la más reciente
+        time.sleep(0.01)
+        cache.put("c", {'id_reserva': 'c'})
+
+        assert len(cache) == 2
+        assert cache.get("b") is None
+        assert cache.get("a") == {'id_reserva': 'a'}
+        assert cache.get("c") == {'id_reserva': 'c'}
+
+
+def test_invalidacion_por_version():
+    """Un cambio de versión del parser descarta los resultados anteriores"""
+    with tempfile.TemporaryDirectory() as tmp:
+        _nueva_cache(tmp, parser_version="1").put("a", {'id_reserva': 'a'})
+
+        cache_nueva = _nueva_cache(tmp, parser_version="2")
+        assert cache_nueva.get("a") is None
+        assert len(cache_nueva) == 0
+
+
+if __name__ == "__main__":
+    for test in (test_guarda_y_recupera_fechas, test_expulsion_lru, test_invalidacion_por_version):
+        test()
+        print(f"✅ {test.__name__}")
+    print("✅ Tests de caché completados exitosamente")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Pruebas de JSON batching de Graph API contra un servidor local (tests/graph_stub.py)
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.graph_email_client import GraphEmailClient
+from tests.graph_stub import GraphStub, StubCredential
+
+BUZON = "reservas@empresa.cl"
+
+
+def crear_cliente(stub: GraphStub) -> GraphEmailClient:
+    client = GraphEmailClient("id", "secreto", "tenant", BUZON, base_url=stub.base_url, credential=StubCredential())
+    client.connect()
+    return client
+
+
+def test_marcar_leidos_en_lotes():
+    """45 mensajes se marcan en 3 llamadas $batch en lugar de 45 PATCH"""
+    stub = GraphStub(BUZON).start()
+    try:
+        for i in range(45):
+            stub.add_message(f"m{i}", f"Confirmación {i}")
+        client = crear_cliente(stub)
+
+        marcados = client.mark_many_as_read([f"m{i}" for i in range(45)] + ["inexistente"])
+
+        assert stub.batch_calls() == 3
+        assert all(marcados[f"m{i}"] for i in range(45))
+        assert marcados["inexistente"] is False
+        assert all(m['isRead'] for m in stub.messages.values())
+    finally:
+        stub.stop()
+
+
+def test_respuestas_desordenadas():
+    """Cada respuesta se asocia a su solicitud aunque lleguen en otro orden"""
+    stub = GraphStub(BUZON).start()
+    try:
+        for i in range(20):
+            stub.add_message(f"m{i}", f"OC {i}", attachments=[{'name': f"oc_{i}.pdf", 'contentBytes': 'JVBERi0='}])
+        client = crear_cliente(stub)
+        ids = [f"m{i}" for i in range(20)]
+
+        adjuntos = client.get_many_attachments(ids)
+        detalles = client.get_many_message_details(ids)
+
+        assert stub.batch_calls() == 2
+        assert [adjuntos[m][0]['name'] for m in ids] == [f"oc_{i}.pdf" for i in range(20)]
+        assert [detalles[m]['subject'] for m in ids] == [f"OC {i}" for i in range(20)]
+        assert detalles["m3"]['attachments'][0]['name'] == "oc_3.pdf"
+    finally:
+        stub.stop()
+
+
+def test_reintento_limitadas():
+    """Las sub-solicitudes con 429 se reenvían en un lote posterior"""
+    stub = GraphStub(BUZON).start()
+    try:
+        for i in range(5):
+            stub.add_message(f"m{i}", f"Confirmación {i}")
+        stub.throttle_remaining = 2
+        client = crear_cliente(stub)
+
+        marcados = client.mark_many_as_read([f"m{i}" for i in range(5)])
+
+        assert all(marcados.values())
+        assert stub.batch_calls() == 2
+    finally:
+        stub.stop()
+
+
+def test_retry_after_como_fecha():
+    """Retry-After con fecha HTTP (o inválido) no aborta el lote"""
+    for retry_after in ("Wed, 21 Oct 2015 07:28:00 GMT", "no-es-un-valor"):
+        stub = GraphStub(BUZON).start()
+        try:
+            stub.add_message("m1", "Confirmación 1")
+            stub.throttle_remaining = 1
+            stub.retry_after = retry_after
+            client = crear_cliente(stub)
+
+            assert client.mark_many_as_read(["m1"]) == {"m1": True}
+            assert stub.batch_calls() == 2
+        finally:
+            stub.stop()
+
+
+if __name__ == "__main__":
+    test_marcar_leidos_en_lotes()
+    test_respuestas_desordenadas()
+    test_reintento_limitadas()
+    test_retry_after_como_fecha()
+    print("✅ Pruebas de $batch completadas")
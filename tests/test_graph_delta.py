@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la sincronización delta de Graph API (GraphDeltaSync)
+La sesión HTTP se reemplaza por respuestas fijas con la forma de messages/delta
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import init_db
+from src.graph_email_client import GraphEmailClient
+from src.graph_delta_sync import GraphDeltaSync
+
+
+class RespuestaFalsa:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self._data = data or {}
+        self.text = str(self._data)
+
+    def json(self):
+        return self._data
+
+
+class SesionFalsa:
+    """Responde por URL y registra las URLs pedidas"""
+
+    def __init__(self, respuestas):
+        self.respuestas = respuestas
+        self.pedidas = []
+
+    def get(self, url, params=None, headers=None):
+        self.pedidas.append(url)
+        return self.respuestas[url]
+
+
+def mensaje(message_id, recibido, leido=False):
+    return {'id': message_id, 'subject': f"Reserva {message_id}", 'receivedDateTime': recibido, 'isRead': leido}
+
+
+def crear_sync(respuestas):
+    client = GraphEmailClient("id", "secreto", "tenant", "reservas@empresa.cl")
+    client._graph_client = SesionFalsa(respuestas)
+    return GraphDeltaSync(client, monitor="reservas"), client._graph_client
+
+
+INICIAL = "/users/reservas@empresa.cl/mailFolders/inbox/messages/delta"
+
+
+def test_paginas_y_delta_link():
+    """Sigue nextLink, entrega los no leídos y retoma desde el deltaLink guardado"""
+    init_db("sqlite://")
+    sync, sesion = crear_sync({
+        INICIAL: RespuestaFalsa(200, {
+            'value': [mensaje('a', '2025-10-06T10:00:00Z'), mensaje('b', '2025-10-06T10:05:00Z', leido=True)],
+            '@odata.nextLink': 'https://graph/next1',
+        }),
+        'https://graph/next1': RespuestaFalsa(200, {
+            'value': [mensaje('c', '2025-10-06T10:10:00Z')],
+            '@odata.deltaLink': 'https://graph/delta1',
+        }),
+        'https://graph/delta1': RespuestaFalsa(200, {
+            'value': [
+                mensaje('a', '2025-10-06T10:00:00Z', leido=True),  # Marcado como leído: no es nuevo
+                {'id': 'c', '@removed': {'reason': 'deleted'}},
+                mensaje('d', '2025-10-06T11:00:00Z', leido=True),  # Nuevo aunque ya esté leído
+                mensaje('viejo', '2025-09-01T08:00:00Z'),  # Movido desde otra carpeta
+            ],
+            '@odata.deltaLink': 'https://graph/delta2',
+        }),
+    })
+
+    assert [m['id'] for m in sync.new_messages()] == ['a', 'c']
+    assert sesion.pedidas == [INICIAL, 'https://graph/next1']
+
+    # Nueva instancia (reinicio): el estado viene de la base de datos
+    sync, sesion = crear_sync(sesion.respuestas)
+    assert [m['id'] for m in sync.new_messages()] == ['d']
+    assert sesion.pedidas == ['https://graph/delta1']
+    assert sync.delta_link == 'https://graph/delta2'
+
+
+def test_delta_link_expirado():
+    """410 Gone reinicia la ronda sin deltaLink y no repite los ya entregados"""
+    init_db("sqlite://")
+    sync, sesion = crear_sync({
+        INICIAL: RespuestaFalsa(200, {
+            'value': [mensaje('a', '2025-10-06T10:00:00Z')],
+            '@odata.deltaLink': 'https://graph/delta1',
+        }),
+    })
+    assert [m['id'] for m in sync.new_messages()] == ['a']
+
+    sesion.respuestas = {
+        'https://graph/delta1': RespuestaFalsa(410, {'error': {'code': 'syncStateNotFound'}}),
+        INICIAL: RespuestaFalsa(200, {
+            'value': [mensaje('a', '2025-10-06T10:00:00Z'), mensaje('b', '2025-10-06T12:00:00Z')],
+            '@odata.deltaLink': 'https://graph/delta2',
+        }),
+    }
+    assert [m['id'] for m in sync.new_messages()] == ['b']
+    assert sync.delta_link == 'https://graph/delta2'
+
+
+def test_ronda_interrumpida_no_guarda():
+    """Si el consumidor no termina la ronda, el deltaLink no avanza"""
+    init_db("sqlite://")
+    sync, _ = crear_sync({
+        INICIAL: RespuestaFalsa(200, {
+            'value': [mensaje('a', '2025-10-06T10:00:00Z'), mensaje('b', '2025-10-06T10:01:00Z')],
+            '@odata.deltaLink': 'https://graph/delta1',
+        }),
+    })
+    ronda = sync.new_messages()
+    next(ronda)
+    ronda.close()
+    assert sync.delta_link is None
+
+
+if __name__ == "__main__":
+    test_paginas_y_delta_link()
+    test_delta_link_expirado()
+    test_ronda_interrumpida_no_guarda()
+    print("✅ Pruebas de sincronización delta completadas")
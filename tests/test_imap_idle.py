@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Pruebas de IMAP IDLE en SimpleIMAPClient
+El servidor es el otro extremo de un socketpair: responde IDLE y DONE como
+un servidor real y anuncia correo nuevo con EXISTS cuando la prueba lo pide.
+"""
+import sys
+import socket
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.imap_wrapper import SimpleIMAPClient
+
+
+class ServidorIDLE:
+    """Extremo del servidor: registra las líneas recibidas y contesta IDLE/DONE"""
+
+    def __init__(self, responder_done: bool = True):
+        self.sock_cliente, self.sock = socket.socketpair()
+        self.responder_done = responder_done
+        self.lineas = []
+        self.en_idle = threading.Event()
+        self.tag = None
+        self.hilo = threading.Thread(target=self._atender, daemon=True)
+        self.hilo.start()
+
+    def _atender(self):
+        buffer = b''
+        while True:
+            try:
+                data = self.sock.recv(4096)
+            except OSError:
+                return
+            if not data:
+                return
+            buffer += data
+            while b'\r\n' in buffer:
+                line, buffer = buffer.split(b'\r\n', 1)
+                self.lineas.append(line)
+                if line.endswith(b' IDLE'):
+                    self.tag = line.split()[0]
+                    self.en_idle.set()
+                    self.sock.sendall(b'+ idling\r\n')
+                elif line == b'DONE':
+                    self.en_idle.clear()
+                    if self.responder_done:
+                        self.sock.sendall(self.tag + b' OK IDLE terminated\r\n')
+
+    def anunciar_correo(self, cantidad: int):
+        self.sock.sendall(b'* %d EXISTS\r\n' % cantidad)
+
+    def comandos_idle(self) -> int:
+        return sum(1 for line in self.lineas if line.endswith(b' IDLE'))
+
+    def cerrar(self):
+        for sock in (self.sock, self.sock_cliente):
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+
+class ConexionIDLE:
+    """Lo que SimpleIMAPClient usa de imaplib durante IDLE, sobre el socketpair"""
+
+    capabilities = ('IMAP4REV1', 'IDLE')
+
+    def __init__(self, servidor: ServidorIDLE):
+        self.servidor = servidor
+        self.sock = servidor.sock_cliente
+        # (comando, ¿el servidor seguía en IDLE?)
+        self.comandos_uid = []
+
+    def send(self, data: bytes):
+        self.sock.sendall(data)
+
+    def capability(self):
+        return 'OK', [b'IMAP4REV1 IDLE']
+
+    def uid(self, command, *args):
+        self.comandos_uid.append((command, self.servidor.en_idle.is_set()))
+        return 'OK', [b'']
+
+    def shutdown(self):
+        self.sock.close()
+
+    def logout(self):
+        return 'BYE', [b'']
+
+
+def crear_cliente(servidor: ServidorIDLE) -> SimpleIMAPClient:
+    client = SimpleIMAPClient("imap.test", 143, use_ssl=False)
+    client.username, client.password = "reservas@empresa.cl", "secreto"
+    client.client = ConexionIDLE(servidor)
+    return client
+
+
+def en_hilo(funcion, *args) -> dict:
+    """Ejecuta funcion en otro hilo; el resultado queda en ['resultado'] al terminar ['hilo']"""
+    salida = {}
+
+    def ejecutar():
+        salida['resultado'] = funcion(*args)
+
+    salida['hilo'] = threading.Thread(target=ejecutar, daemon=True)
+    salida['hilo'].start()
+    return salida
+
+
+def test_correo_nuevo():
+    """EXISTS termina IDLE con DONE y devuelve True"""
+    servidor = ServidorIDLE()
+    try:
+        client = crear_cliente(servidor)
+        idle = en_hilo(client.idle, 10)
+
+        assert servidor.en_idle.wait(2)
+        servidor.anunciar_correo(4)
+        idle['hilo'].join(3)
+
+        assert idle['resultado'] is True
+        assert servidor.lineas[-1] == b'DONE'
+        assert client.connected
+    finally:
+        servidor.cerrar()
+
+
+def test_timeout():
+    """Sin correo, IDLE termina con DONE al cumplirse el plazo y devuelve False"""
+    servidor = ServidorIDLE()
+    try:
+        client = crear_cliente(servidor)
+        inicio = time.monotonic()
+
+        assert client.idle(0.3) is False
+        assert 0.3 <= time.monotonic() - inicio < 2
+        assert servidor.lineas[-1] == b'DONE'
+        assert client.connected
+    finally:
+        servidor.cerrar()
+
+
+def test_comando_de_otro_hilo_pausa_idle():
+    """Un comando de otro hilo corre fuera de IDLE; luego IDLE se retoma sin despertar a nadie"""
+    servidor = ServidorIDLE()
+    try:
+        client = crear_cliente(servidor)
+        idle = en_hilo(client.idle, 10)
+        assert servidor.en_idle.wait(2)
+
+        client.mark_as_read(5)
+        assert client.client.comandos_uid == [('STORE', False)]
+        assert idle['hilo'].is_alive()
+
+        # IDLE se retoma una vez que la conexión queda sin uso
+        limite = time.monotonic() + 3
+        while servidor.comandos_idle() < 2 and time.monotonic() < limite:
+            time.sleep(0.05)
+        assert servidor.comandos_idle() == 2
+        assert servidor.en_idle.wait(2)
+
+        servidor.anunciar_correo(6)
+        idle['hilo'].join(3)
+        assert idle['resultado'] is True
+    finally:
+        servidor.cerrar()
+
+
+def test_segundo_idle_recibe_el_resultado_del_primero():
+    """Con la conexión compartida, un segundo IDLE espera el del primer hilo sin enviar otro"""
+    servidor = ServidorIDLE()
+    try:
+        client = crear_cliente(servidor)
+        primero = en_hilo(client.idle, 10)
+        assert servidor.en_idle.wait(2)
+        segundo = en_hilo(client.idle, 10)
+        time.sleep(0.3)
+
+        servidor.anunciar_correo(4)
+        primero['hilo'].join(3)
+        segundo['hilo'].join(3)
+
+        assert primero['resultado'] is True
+        assert segundo['resultado'] is True
+        assert servidor.comandos_idle() == 1
+    finally:
+        servidor.cerrar()
+
+
+def test_sin_respuesta_a_done():
+    """Si el servidor no responde a DONE la conexión se descarta"""
+    servidor = ServidorIDLE(responder_done=False)
+    try:
+        client = crear_cliente(servidor)
+        client.IDLE_DONE_TIMEOUT = 0.3
+
+        assert client.idle(0.2) is None
+        assert not client.connected
+    finally:
+        servidor.cerrar()
+
+
+if __name__ == "__main__":
+    test_correo_nuevo()
+    test_timeout()
+    test_comando_de_otro_hilo_pausa_idle()
+    test_segundo_idle_recibe_el_resultado_del_primero()
+    test_sin_respuesta_a_done()
+    print("✅ Pruebas de IMAP IDLE completadas")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Pruebas del parser de respuestas FETCH (ENVELOPE y BODYSTRUCTURE)
+Los datos replican la forma en que imaplib entrega líneas y literales
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.imap_parser import parse_fetch_response, parse_envelope, body_parts, is_pdf_part
+
+SUBJECT = '=?utf-8?q?Confirmaci=C3=B3n_reserva?='.encode()
+
+RESPUESTA = [
+    (b'1 (UID 11 RFC822.SIZE 52341 ENVELOPE ("Mon, 6 Oct 2025 10:00:00 -0300" {%d}' % len(SUBJECT), SUBJECT),
+    b' (("Hotel \\"Sales\\"" NIL "reservasonline" "hotelsales.cl")) NIL NIL (("Ops" NIL "ops" "kontrol.cl"))'
+    b' NIL NIL NIL "<a@b>") BODYSTRUCTURE (("text" "plain" ("charset" "utf-8") NIL NIL "quoted-printable" 120 4'
+    b' NIL NIL NIL NIL)("application" "pdf" ("name" "conf.pdf") NIL NIL "base64" 50000 NIL ("attachment"'
+    b' ("filename" "Confirmacion 123.pdf")) NIL NIL) "mixed" ("boundary" "xx") NIL NIL NIL))',
+    b'2 (UID 12 RFC822.SIZE 900 ENVELOPE (NIL "Newsletter" (("News" NIL "news" "x.com")) NIL NIL NIL NIL NIL NIL'
+    b' NIL) BODYSTRUCTURE ("text" "html" ("charset" "utf-8") NIL NIL "7bit" 800 20 NIL NIL NIL NIL))',
+]
+
+
+def test_envelope_con_literal():
+    """Asunto en literal RFC 2047 y direcciones con comillas escapadas"""
+    respuesta = parse_fetch_response(RESPUESTA)
+    assert sorted(respuesta) == [11, 12]
+    assert respuesta[11]['RFC822.SIZE'] == 52341
+
+    envelope = parse_envelope(respuesta[11]['ENVELOPE'])
+    assert envelope['subject'] == 'Confirmación reserva'
+    assert envelope['from'] == 'Hotel "Sales" <reservasonline@hotelsales.cl>'
+    assert envelope['to'] == 'Ops <ops@kontrol.cl>'
+
+
+def test_bodystructure_secciones():
+    """Secciones y nombre de archivo de las partes hoja"""
+    respuesta = parse_fetch_response(RESPUESTA)
+
+    partes = body_parts(respuesta[11]['BODYSTRUCTURE'])
+    assert [(p['section'], p['type']) for p in partes] == [('1', 'text/plain'), ('2', 'application/pdf')]
+    assert partes[1]['filename'] == 'Confirmacion 123.pdf'
+    assert [is_pdf_part(p) for p in partes] == [False, True]
+
+    partes = body_parts(respuesta[12]['BODYSTRUCTURE'])
+    assert [(p['section'], p['charset']) for p in partes] == [('1', 'utf-8')]
+
+
+def test_bodystructure_mensaje_adjunto():
+    """Las partes de un message/rfc822 se numeran dentro de su sección"""
+    estructura = parse_fetch_response([
+        b'3 (UID 13 BODYSTRUCTURE (("text" "plain" NIL NIL NIL "7bit" 1 1)("message" "rfc822" NIL NIL NIL "7bit" 500'
+        b' (NIL "inner" NIL NIL NIL NIL NIL NIL NIL NIL) ("application" "pdf" NIL NIL NIL "base64" 400 NIL NIL NIL NIL)'
+        b' 10) "mixed"))'
+    ])[13]['BODYSTRUCTURE']
+
+    assert [p['section'] for p in body_parts(estructura)] == ['1', '2.1']
+
+
+if __name__ == "__main__":
+    test_envelope_con_literal()
+    test_bodystructure_secciones()
+    test_bodystructure_mensaje_adjunto()
+    print("✅ Pruebas del parser IMAP completadas")
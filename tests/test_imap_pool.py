@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Pruebas del pool de conexiones IMAP compartidas
+Verifica el conteo de referencias, la reconexión con backoff exponencial y
+el health check periódico. Las conexiones al servidor se simulan: el pool
+usa un SimpleIMAPClient falso o uno real sobre un imaplib.IMAP4 falso.
+"""
+import sys
+import time
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.imap_pool import IMAPConnectionPool
+from src.imap_wrapper import SimpleIMAPClient
+
+
+class ClienteFalso:
+    """Lo que el pool usa de SimpleIMAPClient"""
+
+    def __init__(self, host, port=993, use_ssl=True):
+        self.host = host
+        self.aperturas = []
+        self.desconexiones = 0
+        self.connected = False
+        self.reconnect_failures = 0
+
+    def open(self, username, password, folder="INBOX"):
+        self.aperturas.append((username, folder))
+        self.connected = True
+        return True
+
+    def disconnect(self):
+        self.desconexiones += 1
+        self.connected = False
+
+
+class ConexionFalsa:
+    """Conexión de imaplib ya autenticada"""
+
+    capabilities = ('IMAP4REV1',)
+
+    def __init__(self):
+        self.noops = 0
+
+    def login(self, username, password):
+        return 'OK', [b'LOGIN completado']
+
+    def select(self, folder):
+        return 'OK', [b'3']
+
+    def response(self, code):
+        return code, [b'7']
+
+    def noop(self):
+        self.noops += 1
+        return 'OK', [b'NOOP completado']
+
+    def logout(self):
+        return 'BYE', [b'']
+
+    def shutdown(self):
+        pass
+
+
+class ServidorFalso:
+    """Reemplaza a imaplib.IMAP4: entrega conexiones o rechaza el handshake"""
+
+    def __init__(self):
+        self.disponible = True
+        self.intentos = 0
+        self.conexiones = []
+
+    def __call__(self, host, port):
+        self.intentos += 1
+        if not self.disponible:
+            raise ConnectionRefusedError("servidor no disponible")
+        conexion = ConexionFalsa()
+        self.conexiones.append(conexion)
+        return conexion
+
+
+def esperar(condicion, timeout: float = 3.0) -> bool:
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if condicion():
+            return True
+        time.sleep(0.02)
+    return condicion()
+
+
+def test_conexion_compartida():
+    """Dos monitores del mismo buzón comparten la conexión; se cierra con la última liberación"""
+    pool = IMAPConnectionPool(health_check_interval=3600)
+    with mock.patch("src.imap_pool.SimpleIMAPClient", ClienteFalso):
+        reservas = pool.acquire("imap.test", 993, "reservas@empresa.cl", "secreto", "INBOX")
+        oc = pool.acquire("imap.test", 993, "reservas@empresa.cl", "secreto", "INBOX")
+        otra_carpeta = pool.acquire("imap.test", 993, "reservas@empresa.cl", "secreto", "OC")
+
+    try:
+        assert reservas is oc
+        assert otra_carpeta is not reservas
+        assert reservas.aperturas == [("reservas@empresa.cl", "INBOX")] * 2
+        assert {s['carpeta']: s['monitores'] for s in pool.stats()} == {"INBOX": 2, "OC": 1}
+
+        pool.release(reservas)
+        assert reservas.desconexiones == 0
+        assert {s['carpeta']: s['monitores'] for s in pool.stats()} == {"INBOX": 1, "OC": 1}
+
+        pool.release(oc)
+        assert reservas.desconexiones == 1
+        assert [s['carpeta'] for s in pool.stats()] == ["OC"]
+
+        # Liberar de nuevo un cliente ya cerrado no hace nada
+        pool.release(reservas)
+        assert reservas.desconexiones == 1
+    finally:
+        pool.close_all()
+
+    assert otra_carpeta.desconexiones == 1
+    assert pool.stats() == []
+
+
+def test_backoff_reconexion():
+    """Cada reconexión fallida duplica la espera, con tope en backoff_max"""
+    servidor = ServidorFalso()
+    servidor.disponible = False
+    pool = IMAPConnectionPool(health_check_interval=3600, backoff_max=5)
+    with mock.patch("src.imap_wrapper.imaplib.IMAP4", servidor), \
+            mock.patch("src.imap_wrapper.random.uniform", return_value=1.0):
+        try:
+            # El cliente se entrega aunque la conexión inicial falle
+            client = pool.acquire("imap.test", 143, "reservas@empresa.cl", "secreto", use_ssl=False)
+            assert isinstance(client, SimpleIMAPClient)
+            assert not client.connected
+            assert client.reconnect_backoff_max == 5
+
+            for fallos, espera in ((1, 2.0), (2, 4.0), (3, 5.0), (4, 5.0)):
+                assert client.reconnect_failures == fallos
+                restante = client._next_reconnect - time.monotonic()
+                assert espera - 0.5 < restante <= espera
+
+                # Durante la espera no se intenta otro handshake
+                intentos = servidor.intentos
+                assert client.ensure_connected() is False
+                assert servidor.intentos == intentos
+
+                # Cumplido el plazo se vuelve a intentar
+                client._next_reconnect = 0.0
+                assert client.ensure_connected() is False
+
+            servidor.disponible = True
+            client._next_reconnect = 0.0
+            assert client.ensure_connected() is True
+            assert client.reconnect_failures == 0
+            assert client.uidvalidity == 7
+        finally:
+            pool.close_all()
+
+
+def test_health_check_periodico():
+    """El timer reconecta una conexión caída y envía NOOP solo a las inactivas"""
+    servidor = ServidorFalso()
+    pool = IMAPConnectionPool(health_check_interval=0.1)
+    with mock.patch("src.imap_wrapper.imaplib.IMAP4", servidor):
+        try:
+            client = pool.acquire("imap.test", 143, "reservas@empresa.cl", "secreto", use_ssl=False)
+            assert client.connected
+            conexion = servidor.conexiones[0]
+
+            # Inactiva más que el intervalo: NOOP
+            assert esperar(lambda: conexion.noops > 0)
+
+            # Con la conexión tomada (ej: IDLE) no se interrumpe
+            with client._exclusive():
+                noops = conexion.noops
+                time.sleep(0.3)
+                assert conexion.noops == noops
+
+            # Conexión perdida: el timer reconecta sin esperar un comando
+            client._drop_connection()
+            assert esperar(lambda: client.connected and len(servidor.conexiones) == 2)
+        finally:
+            pool.close_all()
+
+    pool._thread.join(1)
+    assert not pool._thread.is_alive()
+    assert not client.connected
+
+
+if __name__ == "__main__":
+    test_conexion_compartida()
+    test_backoff_reconexion()
+    test_health_check_periodico()
+    print("✅ Pruebas del pool IMAP completadas")
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la sincronización por UID de IMAPBackend (marca del último UID)
+El cliente IMAP se reemplaza por un buzón en memoria con la interfaz de
+SimpleIMAPClient que usa el backend
+"""
+import sys
+from collections import deque
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import settings
+from database import init_db, get_db, SincronizacionBuzon
+from src.email_monitor import ReservaMonitor
+from src.extraction_pool import DeferredExtraction
+from src.mailbox_backend import IMAPBackend
+
+PARTES_PDF = [{'section': '1', 'type': 'text/plain'}, {'section': '2', 'type': 'application/pdf', 'filename': 'r.pdf'}]
+
+
+class ClienteIMAPFalso:
+    """Buzón en memoria; los UIDs de `fallan` no vienen en la descarga"""
+
+    connected = True
+
+    def __init__(self, uidvalidity: int = 1):
+        self.uidvalidity = uidvalidity
+        self.mensajes = {}
+        self.fallan = set()
+
+    @property
+    def uidnext(self):
+        return max(self.mensajes, default=0) + 1
+
+    def agregar(self, subject: str, size: int = 1000, leido: bool = False) -> int:
+        uid = self.uidnext
+        self.mensajes[uid] = {'subject': subject, 'size': size, 'leido': leido}
+        return uid
+
+    def search_unseen(self):
+        return [uid for uid, m in sorted(self.mensajes.items()) if not m['leido']]
+
+    def search_since_uid(self, start_uid):
+        return [uid for uid in sorted(self.mensajes) if uid >= start_uid]
+
+    def fetch_envelopes(self, uids):
+        return {
+            uid: {'subject': self.mensajes[uid]['subject'], 'from': 'Hotel <reservas@hotel.cl>',
+                  'size': self.mensajes[uid]['size'], 'parts': PARTES_PDF}
+            for uid in uids
+        }
+
+    def fetch_pdf_parts(self, parciales, batch_size):
+        for uid in parciales:
+            if uid not in self.fallan:
+                yield {'id': uid, 'subject': self.mensajes[uid]['subject'], 'from': 'Hotel <reservas@hotel.cl>',
+                       'attachments': [{'filename': 'r.pdf', 'content': b'%PDF', 'size': 4}]}
+
+    def fetch_messages(self, uids, batch_size):
+        return iter([])
+
+
+class MonitorFalso:
+    """Lo que IMAPBackend usa del monitor, con cola diferida de capacidad fija"""
+
+    MONITOR_NAME = "reservas"
+
+    def __init__(self, capacidad: int = 10):
+        self.deferred = deque()
+        self.capacidad = capacidad
+
+    def is_candidate(self, subject, from_address):
+        return True
+
+    def defer(self, uid, reason):
+        if len(self.deferred) >= self.capacidad:
+            return False
+        self.deferred.append((uid, reason))
+        return True
+
+
+def crear_backend(cliente: ClienteIMAPFalso, monitor: MonitorFalso = None) -> IMAPBackend:
+    backend = IMAPBackend(monitor or MonitorFalso(), "imap.test", 993, "reservas@empresa.cl", "secreto")
+    backend.client = cliente
+    return backend
+
+
+def uids(correos):
+    return [correo['uid'] for correo in correos]
+
+
+def marca_guardada():
+    db = next(get_db())
+    try:
+        return db.query(SincronizacionBuzon).filter_by(monitor="reservas").one().ultimo_uid
+    finally:
+        db.close()
+
+
+def test_reanuda_tras_reinicio():
+    """Sin estado se procesan los no leídos; tras un reinicio, solo lo nuevo"""
+    init_db("sqlite://")
+    cliente = ClienteIMAPFalso()
+    cliente.agregar("Reserva 1")
+    cliente.agregar("Reserva 2", leido=True)
+    cliente.agregar("Reserva 3")
+
+    assert uids(crear_backend(cliente).check_new_emails()) == [1, 3]
+    assert marca_guardada() == 3
+
+    cliente.agregar("Reserva 4")
+    backend = crear_backend(cliente)
+    assert uids(backend.check_new_emails()) == [4]
+    assert backend.last_uid == 4
+
+
+def test_cambio_uidvalidity():
+    """Con otro UIDVALIDITY los UIDs guardados no valen: se vuelve a los no leídos"""
+    init_db("sqlite://")
+    cliente = ClienteIMAPFalso(uidvalidity=1)
+    cliente.agregar("Reserva 1")
+    backend = crear_backend(cliente)
+    assert uids(backend.check_new_emails()) == [1]
+
+    cliente = ClienteIMAPFalso(uidvalidity=2)
+    cliente.agregar("Reserva antigua", leido=True)
+    cliente.agregar("Reserva no leída")
+    backend.client = cliente
+
+    assert uids(backend.check_new_emails()) == [2]
+    assert backend.uidvalidity == 2
+
+
+def test_reintento_descarga_fallida():
+    """La marca se detiene en el correo que falla y lo omite tras MAX_FETCH_ATTEMPTS"""
+    init_db("sqlite://")
+    cliente = ClienteIMAPFalso()
+    backend = crear_backend(cliente)
+    assert backend.check_new_emails() == []
+
+    for i in range(3):
+        cliente.agregar(f"Reserva {i + 1}")
+    cliente.fallan = {2}
+
+    assert uids(backend.check_new_emails()) == [1]
+    assert backend.last_uid == 1
+    for _ in range(backend.MAX_FETCH_ATTEMPTS - 2):
+        assert backend.check_new_emails() == []
+        assert backend.last_uid == 1
+
+    assert uids(backend.check_new_emails()) == [3]
+    assert backend.last_uid == 3
+
+
+def test_sincronizacion_inicial_se_repite():
+    """Un no leído que falla o no cabe en la cola diferida no queda bajo la marca inicial"""
+    init_db("sqlite://")
+    limite = settings.imap_max_message_bytes
+    settings.imap_max_message_bytes = 5000
+    try:
+        cliente = ClienteIMAPFalso()
+        cliente.agregar("Reserva 1")
+        cliente.agregar("Reserva grande", size=10_000)
+        cliente.agregar("Reserva 3")
+        cliente.fallan = {1}
+        monitor = MonitorFalso(capacidad=0)
+        backend = crear_backend(cliente, monitor)
+
+        assert backend.check_new_emails() == []
+        assert backend.uidvalidity is None
+
+        cliente.fallan = set()
+        assert uids(backend.check_new_emails()) == [1]
+        assert backend.uidvalidity is None
+
+        monitor.capacidad = 1
+        assert uids(backend.check_new_emails()) == [1, 3]
+        assert list(monitor.deferred) == [(2, "mensaje")]
+        assert backend.uidvalidity == 1
+    finally:
+        settings.imap_max_message_bytes = limite
+
+
+def test_marca_limitada_por_diferidos():
+    """En la base de datos la marca no pasa del correo diferido más antiguo"""
+    init_db("sqlite://")
+    limite = settings.imap_max_message_bytes
+    settings.imap_max_message_bytes = 5000
+    try:
+        cliente = ClienteIMAPFalso()
+        monitor = MonitorFalso()
+        backend = crear_backend(cliente, monitor)
+        backend.check_new_emails()
+
+        cliente.agregar("Reserva 1")
+        cliente.agregar("Reserva grande", size=10_000)
+        cliente.agregar("Reserva 3")
+
+        assert uids(backend.check_new_emails()) == [1, 3]
+        assert list(monitor.deferred) == [(2, "mensaje")]
+        assert backend.last_uid == 3
+        assert marca_guardada() == 1
+
+        # Procesado el diferido, el ciclo siguiente guarda la marca real
+        monitor.deferred.clear()
+        assert backend.check_new_emails() == []
+        assert marca_guardada() == 3
+    finally:
+        settings.imap_max_message_bytes = limite
+
+
+def test_pdf_diferido_con_cola_llena():
+    """Un PDF que excede los límites con la cola diferida llena vuelve en el ciclo siguiente"""
+    init_db("sqlite://")
+    originales = (settings.use_graph_api, settings.pdf_deferred_queue_size, settings.allowed_confirmation_senders)
+    settings.use_graph_api = False
+    settings.pdf_deferred_queue_size = 0
+    settings.allowed_confirmation_senders = "reservas@hotel.cl"
+    db = next(get_db())
+    try:
+        monitor = ReservaMonitor()
+        backend = monitor.backend
+        cliente = ClienteIMAPFalso()
+        backend.client = cliente
+        backend.check_new_emails()
+
+        cliente.agregar("Reserva 1")
+        cliente.agregar("Reserva 2")
+        correos = backend.check_new_emails()
+        assert uids(correos) == [1, 2]
+        assert marca_guardada() == 2
+
+        # El PDF del correo 1 excede los límites y la cola diferida lo rechaza
+        monitor._save_reservations(db, [(correos[0], correos[0]['attachments'][0])], [DeferredExtraction("tamano")])
+        assert list(monitor.deferred) == []
+        assert marca_guardada() == 0
+
+        # Se vuelve a entregar aunque ya esté bajo la marca; luego la marca se guarda completa
+        assert uids(backend.check_new_emails()) == [1]
+        assert backend.last_uid == 2
+        assert marca_guardada() == 2
+        assert backend.check_new_emails() == []
+    finally:
+        db.close()
+        settings.use_graph_api, settings.pdf_deferred_queue_size, settings.allowed_confirmation_senders = originales
+
+
+if __name__ == "__main__":
+    test_reanuda_tras_reinicio()
+    test_cambio_uidvalidity()
+    test_reintento_descarga_fallida()
+    test_sincronizacion_inicial_se_repite()
+    test_marca_limitada_por_diferidos()
+    test_pdf_diferido_con_cola_llena()
+    print("✅ Pruebas de sincronización IMAP completadas")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Pruebas del buzón de Graph API de los monitores (GraphBackend) contra un
+servidor local (tests/graph_stub.py)
+"""
+import base64
+import sys
+from collections import deque
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import settings
+from database import init_db
+from src.graph_email_client import GraphEmailClient
+from src.mailbox_backend import GraphBackend
+from tests.graph_stub import GraphStub, StubCredential
+
+BUZON = "reservas@empresa.cl"
+PDF = b"%PDF-1.4 reserva de prueba"
+
+
+class MonitorFalso:
+    """Lo que GraphBackend usa del monitor"""
+
+    MONITOR_NAME = "reservas"
+
+    def __init__(self):
+        self.deferred = deque()
+
+    def is_candidate(self, subject, from_address):
+        return 'reserva' in subject.lower()
+
+    def defer(self, uid, reason):
+        self.deferred.append((uid, reason))
+        return True
+
+
+def crear_backend(stub: GraphStub) -> GraphBackend:
+    client = GraphEmailClient("id", "secreto", "tenant", BUZON, base_url=stub.base_url, credential=StubCredential())
+    return GraphBackend(MonitorFalso(), BUZON, client=client)
+
+
+def adjunto(nombre: str, contenido: bytes) -> dict:
+    return {'name': nombre, 'contentBytes': base64.b64encode(contenido).decode()}
+
+
+def test_descarga_solo_adjuntos_pdf():
+    """Solo el contenido de los PDF de los candidatos, con $value y sin el MIME completo"""
+    init_db("sqlite://")
+    stub = GraphStub(BUZON).start()
+    try:
+        stub.add_message("m1", "Confirmación de reserva 123", body="LOC: ABC123",
+                         attachments=[adjunto("reserva.pdf", PDF), adjunto("logo.png", b"\x89PNG" * 1000)])
+        stub.add_message("m2", "Boletín mensual", attachments=[adjunto("boletin.pdf", PDF)])
+        stub.add_message("m3", "Reserva sin adjuntos")
+        backend = crear_backend(stub)
+
+        correos = backend.check_new_emails()
+
+        assert [c['uid'] for c in correos] == ["m1"]
+        correo = correos[0]
+        assert correo['attachments'] == [{'filename': "reserva.pdf", 'content': PDF, 'size': len(PDF)}]
+        assert correo['body_text'] == "LOC: ABC123"
+        assert correo['from'] == "Remitente <reservasonline@hotelsales.cl>"
+        assert parsedate_to_datetime(correo['date']).tzinfo is not None
+        assert stub.value_calls() == 1
+        assert ("GET", f"/users/{BUZON}/messages/m1/$value") not in stub.calls
+
+        # El ciclo siguiente solo trae lo nuevo
+        stub.add_message("m4", "Reserva 456", attachments=[adjunto("r456.pdf", PDF)])
+        assert [c['uid'] for c in backend.check_new_emails()] == ["m4"]
+
+        backend.mark_many_as_read(["m1", "m4"])
+        assert stub.messages["m1"]['isRead'] and stub.messages["m4"]['isRead']
+    finally:
+        stub.stop()
+
+
+def test_correo_grande_a_cola_diferida():
+    """Con PDF sobre IMAP_MAX_MESSAGE_BYTES no se baja contenido hasta la cola diferida"""
+    init_db("sqlite://")
+    stub = GraphStub(BUZON).start()
+    limite = settings.imap_max_message_bytes
+    settings.imap_max_message_bytes = 10
+    try:
+        stub.add_message("m1", "Reserva grande", attachments=[adjunto("grande.pdf", PDF)])
+        backend = crear_backend(stub)
+
+        assert backend.check_new_emails() == []
+        assert list(backend.monitor.deferred) == [("m1", "mensaje")]
+        assert stub.value_calls() == 0
+
+        correo = backend.fetch_deferred("m1")
+        assert correo['attachments'][0]['content'] == PDF
+    finally:
+        settings.imap_max_message_bytes = limite
+        stub.stop()
+
+
+def test_pendientes_sobreviven_reinicio():
+    """Diferidos y descargas fallidas se guardan con el deltaLink y vuelven tras un reinicio"""
+    init_db("sqlite://")
+    stub = GraphStub(BUZON).start()
+    limite = settings.imap_max_message_bytes
+    settings.imap_max_message_bytes = 100
+    try:
+        stub.add_message("m1", "Reserva grande", attachments=[adjunto("grande.pdf", PDF * 10)])
+        stub.add_message("m2", "Reserva 2", attachments=[adjunto("r2.pdf", PDF)])
+        stub.failing_values.add("m2")
+        backend = crear_backend(stub)
+
+        assert backend.check_new_emails() == []
+        assert list(backend.monitor.deferred) == [("m1", "mensaje")]
+        assert backend.pending["m2"][1] == 1
+
+        # Reinicio: nueva instancia con el estado de la base de datos
+        stub.failing_values.clear()
+        backend = crear_backend(stub)
+        correos = backend.check_new_emails()
+
+        assert [c['uid'] for c in correos] == ["m2"]
+        assert list(backend.monitor.deferred) == [("m1", "mensaje")]
+        assert backend.pending == {}
+    finally:
+        settings.imap_max_message_bytes = limite
+        stub.stop()
+
+
+def test_correo_devuelto_por_el_monitor():
+    """requeue() deja pendiente un correo ya entregado, también tras un reinicio"""
+    init_db("sqlite://")
+    stub = GraphStub(BUZON).start()
+    try:
+        stub.add_message("m1", "Reserva 1", attachments=[adjunto("r1.pdf", PDF)])
+        backend = crear_backend(stub)
+        assert [c['uid'] for c in backend.check_new_emails()] == ["m1"]
+
+        # La cola diferida rechazó su PDF: el monitor lo devuelve
+        backend.requeue("m1")
+        assert crear_backend(stub).sync.saved_pending()['reintentos']["m1"][0]['subject'] == "Reserva 1"
+
+        assert [c['uid'] for c in backend.check_new_emails()] == ["m1"]
+        assert backend.check_new_emails() == []
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    test_descarga_solo_adjuntos_pdf()
+    test_correo_grande_a_cola_diferida()
+    test_pendientes_sobreviven_reinicio()
+    test_correo_devuelto_por_el_monitor()
+    print("✅ Pruebas del buzón de Graph API completadas")
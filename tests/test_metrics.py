@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Pruebas del registro de métricas
+Verifica acumulación de duraciones y contadores, y el traspaso entre procesos
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.metrics import MetricsRegistry
+
+
+def test_acumula_duraciones_y_contadores():
+    """Las duraciones se agregan por etapa y los contadores por etiqueta"""
+    registro = MetricsRegistry()
+    registro.observe("parseo", 0.002)
+    registro.observe("parseo", 0.004)
+    registro.increment("monto_patron", "fallback")
+    registro.increment("monto_patron", "fallback")
+
+    resumen = registro.snapshot()
+    assert resumen["duraciones_ms"]["parseo"] == {"cantidad": 2, "total": 6.0, "promedio": 3.0, "maximo": 4.0}
+    assert resumen["contadores"]["monto_patron"] == {"fallback": 2}
+
+
+def test_drain_y_merge():
+    """Las métricas de un proceso hijo se suman al registro principal"""
+    hijo = MetricsRegistry()
+    hijo.observe("total", 0.5)
+    hijo.increment("campo_no_encontrado", "agencia")
+    hijo.observe_document("lento.pdf", 0.5)
+
+    principal = MetricsRegistry()
+    principal.observe("total", 0.1)
+    principal.merge(hijo.drain())
+
+    resumen = principal.snapshot()
+    assert resumen["duraciones_ms"]["total"]["cantidad"] == 2
+    assert resumen["duraciones_ms"]["total"]["maximo"] == 500.0
+    assert resumen["contadores"]["campo_no_encontrado"] == {"agencia": 1}
+    assert resumen["documentos_lentos"] == [{"documento": "lento.pdf", "ms": 500.0}]
+    assert hijo.snapshot()["duraciones_ms"] == {}
+
+
+if __name__ == "__main__":
+    for test in (test_acumula_duraciones_y_contadores, test_drain_y_merge):
+        test()
+        print(f"✅ {test.__name__}")
+    print("✅ Tests de métricas completados exitosamente")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Pruebas del procesador de órdenes de compra
+Verifica la extracción de número y monto de OC, el almacenamiento por
+contenido, la tolerancia del cruce de montos y que no se crucen montos de
+reservas leídas con un parser anterior
+"""
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import settings
+from database import init_db, get_db, Reserva, OrdenCompra
+from src.email_monitor import OCMonitor
+from src.oc_processor import OCProcessor
+from src.pdf_processor import PARSER_VERSION
+from tests.corpus_sintetico import escribir_pdf
+
+OC_PDF = escribir_pdf([[
+    "ORDEN DE COMPRA",
+    "Orden de Compra N° 4500123456",
+    "Proveedor: Hotel de prueba",
+    "Neto: 444.287",
+    "IVA: 84.414",
+    "Total: $ 528.701",
+]])
+
+
+def test_numero_y_total():
+    """Número de OC con distintos rótulos y el total final, sin neto ni subtotal"""
+    processor = OCProcessor("/nonexistent")
+
+    data = processor.parse("Orden de Compra N° 4500123456\nSubtotal: 444.287\nTotal General CLP 528.701,00.")
+    assert data == {'numero_oc': "4500123456", 'monto_oc': 528701.0}
+
+    data = processor.parse("O.C. Nro: OC-2025/77\nTotal Neto: 1.000\nTotal: 1.190\nTotal a Pagar: $ 1.250")
+    assert data == {'numero_oc': "OC-2025/77", 'monto_oc': 1250.0}
+
+    assert processor.parse("Purchase Order # PO12345\nTotal: 1,234,567.89")['monto_oc'] == 1234567.89
+
+    # El rótulo sin número no captura la palabra siguiente
+    assert processor.parse("Orden de Compra\nFecha: 24/11/2025") == {'numero_oc': None, 'monto_oc': None}
+
+
+def test_almacenamiento_por_contenido():
+    """Un mismo PDF se guarda una vez, en <sha[:2]>/<sha>.pdf"""
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = OCProcessor(tmp)
+
+        ruta = processor.store(b"%PDF-1.4 oc")
+        assert processor.store(b"%PDF-1.4 oc") == ruta
+        assert Path(ruta).read_bytes() == b"%PDF-1.4 oc"
+        assert Path(ruta).parent.name == Path(ruta).stem[:2]
+
+        otra = processor.store(b"%PDF-1.4 otra oc")
+        assert otra != ruta
+        assert sorted(p.name for p in Path(tmp).rglob("*") if p.is_file()) == sorted([Path(ruta).name, Path(otra).name])
+
+
+def test_escritura_atomica():
+    """Si la escritura no termina no queda un archivo a medio escribir en el destino"""
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = OCProcessor(tmp)
+
+        with mock.patch("src.oc_processor.os.replace", side_effect=OSError("disco lleno")):
+            try:
+                processor.store(b"%PDF-1.4 oc")
+                assert False, "store() debió fallar"
+            except OSError:
+                pass
+        assert not [p for p in Path(tmp).rglob("*") if p.is_file()]
+
+        # El reintento completa el archivo
+        ruta = processor.store(b"%PDF-1.4 oc")
+        assert Path(ruta).read_bytes() == b"%PDF-1.4 oc"
+
+
+def test_process_pdf():
+    """process() guarda el PDF y extrae número y monto de su texto"""
+    with tempfile.TemporaryDirectory() as tmp:
+        data = OCProcessor(tmp).process(OC_PDF, "oc.pdf")
+
+        assert data['numero_oc'] == "4500123456"
+        assert data['monto_oc'] == 528701.0
+        assert Path(data['archivo_ruta']).read_bytes() == OC_PDF
+
+
+def test_tolerancia_de_montos():
+    """La diferencia relativa se compara con el porcentaje de tolerancia"""
+    assert OCProcessor.amounts_match(528701.0, 528701.0, 1.0) is True
+    assert OCProcessor.amounts_match(101.0, 100.0, 1.0) is True
+    assert OCProcessor.amounts_match(98.9, 100.0, 1.0) is False
+    assert OCProcessor.amounts_match(52870100.0, 528701.0, 1.0) is False
+    assert OCProcessor.amounts_match(None, 100.0, 1.0) is None
+    assert OCProcessor.amounts_match(100.0, None, 1.0) is None
+    assert OCProcessor.amounts_match(100.0, 0.0, 1.0) is None
+
+
+def _reserva(db, id_reserva: str, monto_total: float, version_parser):
+    reserva = Reserva(
+        id_reserva=id_reserva, loc_interno=f"LOC{id_reserva}", agencia="Agencia",
+        monto_total=monto_total, requiere_oc=True, version_parser=version_parser
+    )
+    db.add(reserva)
+    db.commit()
+    return reserva
+
+
+def test_cruce_omitido_para_reservas_antiguas():
+    """Los montos de reservas leídas antes de MONTO_PARSER_VERSION no se cruzan con la OC"""
+    init_db("sqlite://")
+    use_graph_api = settings.use_graph_api
+    settings.use_graph_api = False
+    db = next(get_db())
+    try:
+        monitor = OCMonitor()
+        monitor.mark_many_as_read = lambda uids: None
+
+        # Monto inflado por el parser anterior ("528.701,00" -> 52870100)
+        antigua = _reserva(db, "1", 52870100.0, None)
+        nueva = _reserva(db, "2", 600000.0, PARSER_VERSION)
+        correo = {'uid': 1, 'from': "oc@agencia.cl", 'subject': "Orden de compra", 'date': None}
+        adjunto = {'filename': "oc.pdf", 'size': 10}
+        oc_data = {'archivo_ruta': None, 'numero_oc': "4500123456", 'monto_oc': 528701.0}
+
+        assert monitor._save_ocs(db, [(correo, antigua, adjunto), (correo, nueva, adjunto)], [oc_data, oc_data]) == 2
+
+        assert db.query(OrdenCompra).filter_by(reserva_id=antigua.id).one().monto_coincide is None
+        oc_nueva = db.query(OrdenCompra).filter_by(reserva_id=nueva.id).one()
+        assert oc_nueva.monto_coincide is False
+        assert "difiere" in oc_nueva.observaciones
+    finally:
+        db.close()
+        settings.use_graph_api = use_graph_api
+
+
+if __name__ == "__main__":
+    test_numero_y_total()
+    test_almacenamiento_por_contenido()
+    test_escritura_atomica()
+    test_process_pdf()
+    test_tolerancia_de_montos()
+    test_cruce_omitido_para_reservas_antiguas()
+    print("✅ Pruebas del procesador de OC completadas")